@@ -0,0 +1,198 @@
+"""
+Async facade over reschanger. Blocking display calls run on a bounded set of
+worker lanes, one single-thread lane per adapter, so a slow driver on one
+adapter neither stalls the event loop nor the other adapters.
+"""
+
+import asyncio
+import concurrent.futures
+import functools
+import logging
+import threading
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import reschanger
+from reschanger import DISP_RESULTS
+
+DEFAULT_MAX_LANES = 8
+
+Mode = Sequence[int]  # (width, height, freq), e.g. a ScreenSettings
+
+
+class AsyncDisplay:
+    """
+    Lanes are created on first use. Past `max_lanes` adapters share lanes
+    (by hash), which keeps the thread count bounded on large fleets. Calls
+    that are not tied to one adapter (the global apply, enumerations) use a
+    separate global lane.
+
+    close() stops new commits and waits for the running ones, so a caller can
+    own the registry (e.g. to restore it at session end) without a stage or
+    apply running alongside.
+    """
+
+    def __init__(self, max_lanes: int = DEFAULT_MAX_LANES):
+        self.max_lanes = max_lanes
+        self._lanes: Dict[bytes, concurrent.futures.ThreadPoolExecutor] = {}
+        self._shared: List[concurrent.futures.ThreadPoolExecutor] = []
+        self._global: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.closed = False
+        self._commits = 0  # commit_modes calls in flight (loop thread only)
+        self._idle: List[asyncio.Future] = []
+        self._abandons: Set[asyncio.Future] = set()
+
+    def _lane(self, adapter_name: Optional[bytes]):
+        with self._lock:
+            if adapter_name is None:
+                if self._global is None:
+                    self._global = _executor("srr-display-global")
+                return self._global
+            lane = self._lanes.get(adapter_name)
+            if lane is not None:
+                return lane
+            if len(self._shared) < self.max_lanes:
+                lane = _executor(f"srr-display-{len(self._shared)}")
+                self._shared.append(lane)
+            else:
+                lane = self._shared[hash(adapter_name) % self.max_lanes]
+            self._lanes[adapter_name] = lane
+            return lane
+
+    async def call(self, adapter_name: Optional[bytes], func, *args, **kwargs):
+        """Run func(*args, **kwargs) on adapter_name's lane (None: global lane)."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._lane(adapter_name), functools.partial(func, *args, **kwargs)
+        )
+
+    async def has_modes(self, changes: List[Tuple[Mode, bytes]]) -> List[bool]:
+        """has_mode for every (mode, adapter), walking mode tables concurrently."""
+        return await asyncio.gather(
+            *(
+                self.call(adapter, reschanger.has_mode, adapter, *mode)
+                for mode, adapter in changes
+            )
+        )
+
+    async def commit_modes(
+        self, changes: List[Tuple[Mode, bytes]]
+    ) -> Tuple[int, List[bytes], Dict[bytes, int]]:
+        """
+        Stage every (mode, adapter) change on its adapter's lane concurrently,
+        then apply the ones that staged with a single ModeTransaction commit.
+        Returns (commit result, adapters worth retrying, per-adapter result).
+        Only DISP_CHANGE_SUCCESSFUL in the last means the mode is in effect: a
+        mode missing from the adapter's table (DISP_CHANGE_BADPARAM) is left
+        out of the commit without counting as failed.
+
+        If the caller is cancelled (or a stage raises) before the commit, the
+        adapters staged so far are rolled back, so the next commit's global
+        apply cannot pick up a mode that is no longer wanted. After close(),
+        nothing is staged and every adapter is reported as failed.
+        """
+        if self.closed:
+            logging.info("display commits are closed, not switching")
+            adapters = [a for _, a in changes]
+            res = DISP_RESULTS.DISP_CHANGE_FAILED
+            return res, adapters, dict.fromkeys(adapters, res)
+        self._commits += 1
+        try:
+            return await self._commit(changes)
+        finally:
+            self._commits -= 1
+            if not self._commits:
+                for waiter in self._idle:
+                    if not waiter.done():
+                        waiter.set_result(None)
+                self._idle.clear()
+
+    async def _commit(
+        self, changes: List[Tuple[Mode, bytes]]
+    ) -> Tuple[int, List[bytes], Dict[bytes, int]]:
+        tx = reschanger.ModeTransaction()
+        try:
+            results = await asyncio.gather(
+                *(
+                    self.call(adapter, tx.stage, *mode, adapter)
+                    for mode, adapter in changes
+                ),
+                return_exceptions=True,
+            )
+            errors = [r for r in results if isinstance(r, BaseException)]
+            if errors:
+                raise errors[0]
+            failed = tx.exclude_failed()
+            if failed:
+                logging.warning(f"staging failed for {failed!r}: {tx.results}")
+            res = await self.call(None, tx.commit)
+        except BaseException:
+            abandon = asyncio.ensure_future(
+                self._abandon(tx, [a for _, a in changes])
+            )
+            self._abandons.add(abandon)  # close() waits for it too
+            abandon.add_done_callback(self._abandons.discard)
+            await asyncio.shield(abandon)
+            raise
+        if res != DISP_RESULTS.DISP_CHANGE_SUCCESSFUL:
+            adapters = [adapter for _, adapter in changes]
+            return res, adapters, dict.fromkeys(adapters, res)
+        return res, failed, {adapter: tx.results[adapter] for _, adapter in changes}
+
+    async def _abandon(
+        self, tx: reschanger.ModeTransaction, adapters: List[bytes]
+    ) -> None:
+        """
+        Roll tx back once nothing can still stage into it. Cancelling the
+        awaiting task does not stop a stage already running on a lane, so
+        wait for every lane involved to drain first (lanes run in order).
+        """
+        await asyncio.gather(
+            *(self.call(adapter, _drained) for adapter in set(adapters)),
+            return_exceptions=True,
+        )
+        await self.call(None, _roll_back, tx)
+
+    async def close(self) -> None:
+        """
+        Refuse new commit_modes() calls and wait until the running ones have
+        applied or rolled back. call() keeps working; reopen() undoes this.
+        """
+        self.closed = True
+        loop = asyncio.get_running_loop()
+        while self._commits or self._abandons:
+            if self._abandons:
+                await asyncio.gather(*self._abandons, return_exceptions=True)
+                continue
+            waiter = loop.create_future()
+            self._idle.append(waiter)
+            await waiter
+
+    def reopen(self) -> None:
+        self.closed = False
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executors = list(self._shared)
+            if self._global is not None:
+                executors.append(self._global)
+            self._lanes.clear()
+            self._shared.clear()
+            self._global = None
+        for ex in executors:
+            ex.shutdown(wait=False, cancel_futures=True)
+
+
+def _drained() -> None:
+    """Runs on a lane after every call queued on it before."""
+
+
+def _roll_back(tx: reschanger.ModeTransaction) -> None:
+    # on the global lane, so after a commit that was already running
+    if tx.staged:
+        logging.info(f"commit abandoned, rolling back {tx.staged!r}")
+        tx.rollback()
+
+
+def _executor(name: str) -> concurrent.futures.ThreadPoolExecutor:
+    return concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
@@ -30,14 +30,16 @@ def is_enabled(name: str) -> bool:
         return False
 
 
-def enable(name: str, exe_path: Path) -> bool:
+def enable(name: str, exe_path: Path, args: str = "") -> bool:
     if winreg is None:
         return False
-    quoted = f'"{Path(exe_path).resolve()}"'
+    command = f'"{Path(exe_path).resolve()}"'
+    if args:
+        command += f" {args}"
     try:
         with _open(winreg.KEY_SET_VALUE) as key:
-            winreg.SetValueEx(key, name, 0, winreg.REG_SZ, quoted)
-        logging.info(f"autostart enabled: {name} -> {quoted}")
+            winreg.SetValueEx(key, name, 0, winreg.REG_SZ, command)
+        logging.info(f"autostart enabled: {name} -> {command}")
         return True
     except OSError as e:
         logging.error(f"autostart.enable failed: {e}")
@@ -0,0 +1,225 @@
+"""
+Allocation budget for the Win32 display hot path.
+
+Drives reschanger.Win32Backend against an in-process stand-in for user32 (so
+it runs anywhere and never touches a real display) and uses tracemalloc to
+measure, per operation, the memory reschanger still holds afterwards and the
+peak it allocates while running. Fails (exit 1) when anything is retained
+across switches or a peak exceeds the budget. The mode table rebuild
+(a cache miss) is reported but not budgeted. Like a real driver, the stand-in
+reports private bytes in dmDriverExtra; passing a DEVMODE back without a reset
+header (dmSize, dmDriverExtra) also fails.
+
+    python benchmarks/allocations.py [--displays 2] [--runs 500]
+                                     [--peak-budget 1024]
+"""
+
+import argparse
+import ctypes
+import gc
+import sys
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import reschanger  # noqa: E402
+
+DEFAULT_PEAK_BUDGET = 1024  # transient bytes per operation and display
+DRIVER_EXTRA = 1024  # private DEVMODE bytes the stand-in driver reports
+DRIVER_FIELDS = (  # what it fills in besides the mode itself
+    reschanger.DM_POSITION
+    | reschanger.DM_BITSPERPEL
+    | reschanger.DM_PELSWIDTH
+    | reschanger.DM_PELSHEIGHT
+    | reschanger.DM_DISPLAYFLAGS
+    | reschanger.DM_DISPLAYFREQUENCY
+)
+STAGED_FIELDS = (
+    reschanger.DM_PELSWIDTH | reschanger.DM_PELSHEIGHT | reschanger.DM_DISPLAYFREQUENCY
+)
+MODES = ((1920, 1080, 60), (1920, 1080, 120), (1920, 1080, 165), (1280, 720, 60))
+
+
+class FakeUser32:
+    """The handful of user32 entry points Win32Backend calls, in Python."""
+
+    def __init__(self, displays: int, modes: Tuple[Tuple[int, int, int], ...] = MODES):
+        self.adapters = [f"\\\\.\\DISPLAY{i + 1}".encode() for i in range(displays)]
+        self.modes = modes
+        self.current = {a: modes[-2] for a in self.adapters}
+        self.registry = dict(self.current)
+        self.bad_headers = 0  # DEVMODEs passed in with a stale header
+
+    def _check_header(self, dm) -> None:
+        # the API reads dmSize + dmDriverExtra bytes from the pointer
+        if dm.dmSize != ctypes.sizeof(dm) or dm.dmDriverExtra:
+            self.bad_headers += 1
+
+    @staticmethod
+    def _target(ref):
+        try:
+            return ref._obj  # the structure behind ctypes.byref()
+        except AttributeError:
+            return ref.contents  # a ctypes.pointer()
+
+    def EnumDisplayDevicesA(self, device, index, ref, flags):
+        dd = self._target(ref)
+        if device is None:
+            if index >= len(self.adapters):
+                return 0
+            dd.DeviceName = self.adapters[index]
+            dd.StateFlags = reschanger.DISPLAY_DEVICE_ACTIVE
+            return 1
+        if index > 0:
+            return 0
+        dd.DeviceID = b"MONITOR\\SIM" + device[-1:] + b"\\{sim}\\0000"
+        dd.DeviceString = b"Generic PnP Monitor"
+        dd.StateFlags = reschanger.DISPLAY_DEVICE_ACTIVE
+        return 1
+
+    def EnumDisplaySettingsA(self, device, index, ref):
+        dm = self._target(ref)
+        self._check_header(dm)
+        index &= 0xFFFFFFFF
+        if index == reschanger.ENUM_CURRENT_SETTINGS & 0xFFFFFFFF:
+            mode = self.current[device]
+        elif index == reschanger.ENUM_REGISTRY_SETTINGS & 0xFFFFFFFF:
+            mode = self.registry[device]
+        elif index < len(self.modes):
+            mode = self.modes[index]
+        else:
+            return 0
+        dm.dmPelsWidth, dm.dmPelsHeight, dm.dmDisplayFrequency = mode
+        dm.dmDriverExtra = DRIVER_EXTRA
+        dm.dmFields = DRIVER_FIELDS
+        return 1
+
+    def ChangeDisplaySettingsExA(self, device, ref, hwnd, flags, param):
+        if device is None:  # apply everything staged
+            self.current.update(self.registry)
+            return 0
+        if ref is None:
+            self.current[device] = self.registry[device]
+            return 0
+        dm = self._target(ref)
+        self._check_header(dm)
+        if dm.dmFields != STAGED_FIELDS:  # would also apply a stale position
+            self.bad_headers += 1
+        mode = (dm.dmPelsWidth, dm.dmPelsHeight, dm.dmDisplayFrequency)
+        if flags & reschanger.CDS_UPDATEREGISTRY:
+            self.registry[device] = mode
+        if not flags & reschanger.CDS_NORESET:
+            self.current[device] = mode
+        return 0
+
+    def ChangeDisplaySettingsA(self, ref, flags):
+        self.current.update(self.registry)
+        return 0
+
+
+def operations(user32: FakeUser32) -> Dict[str, Callable[[int], None]]:
+    adapters = user32.adapters
+
+    def transaction(i: int) -> None:
+        w, h, hz = MODES[i % 2]
+        with reschanger.ModeTransaction() as tx:
+            for adapter in adapters:
+                tx.stage(w, h, hz, adapter)
+            tx.commit()
+
+    def set_resolution(i: int) -> None:
+        reschanger.set_resolution(*MODES[i % 2], adapters[0])
+
+    def current_settings(i: int) -> None:
+        for adapter in adapters:
+            reschanger.get_display_settings(adapter, reschanger.ENUM_CURRENT_SETTINGS)
+
+    def active_displays(i: int) -> None:
+        reschanger.get_active_displays()
+
+    def mode_table(i: int) -> None:
+        reschanger.invalidate_mode_cache([adapters[0]])
+        reschanger.get_mode_table(adapters[0])
+
+    return {
+        "ModeTransaction switch": transaction,
+        "set_resolution": set_resolution,
+        "get_display_settings": current_settings,
+        "get_active_displays": active_displays,
+        "get_mode_table (rebuild)": mode_table,
+    }
+
+
+def _reschanger_bytes(snapshot: tracemalloc.Snapshot) -> Tuple[int, int]:
+    """(bytes, blocks) still held by allocations made in reschanger.py."""
+    only = snapshot.filter_traces([tracemalloc.Filter(True, reschanger.__file__)])
+    stats = only.statistics("filename")
+    return sum(s.size for s in stats), sum(s.count for s in stats)
+
+
+def measure(op: Callable[[int], None], runs: int) -> Tuple[int, int, int]:
+    """
+    (retained bytes, retained blocks, worst peak bytes). Retained is the growth
+    between two traced intervals of `runs` calls each, so objects that are
+    merely replaced (cached tables, stats counters) do not count.
+    """
+    for i in range(8):  # fill caches and per-thread scratch first
+        op(i)
+    tracemalloc.start(1)
+    try:
+        peak = 0
+        held = []
+        for _ in range(2):
+            for i in range(runs):
+                current, _ = tracemalloc.get_traced_memory()
+                tracemalloc.reset_peak()
+                op(i)
+                peak = max(peak, tracemalloc.get_traced_memory()[1] - current)
+            gc.collect()  # also empties the free lists that keep dead tuples
+            held.append(_reschanger_bytes(tracemalloc.take_snapshot()))
+    finally:
+        tracemalloc.stop()
+    return held[1][0] - held[0][0], held[1][1] - held[0][1], peak
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--displays", type=int, default=2)
+    parser.add_argument("--runs", type=int, default=500)
+    parser.add_argument(
+        "--peak-budget",
+        type=int,
+        default=DEFAULT_PEAK_BUDGET,
+        help="max transient bytes per operation and display",
+    )
+    args = parser.parse_args(argv[1:])
+
+    user32 = FakeUser32(args.displays)
+    reschanger.user32 = user32
+    reschanger.use_backend(reschanger.Win32Backend())
+
+    budget = args.peak_budget * max(1, args.displays)
+    failed = False
+    for name, op in operations(user32).items():
+        retained, blocks, peak = measure(op, args.runs)
+        verdict = "ok"
+        if retained > 0 or blocks > 0:
+            verdict = "LEAK"
+        elif peak > budget and not name.endswith("(rebuild)"):
+            verdict = "OVER BUDGET"
+        failed |= verdict != "ok"
+        print(
+            f"{name:<26} peak {peak:>6} B/op  retained {retained:>6} B"
+            f" in {blocks} blocks over {args.runs} runs  {verdict}"
+        )
+    if user32.bad_headers:
+        print(f"FAIL: {user32.bad_headers} calls got a DEVMODE with a stale header")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
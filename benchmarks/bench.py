@@ -0,0 +1,371 @@
+"""
+Micro-benchmarks for SRR's control path. Runs anywhere: display calls go to
+simdisplay, or to reschanger.Win32Backend on the stand-in user32 from
+allocations.py, and battery state comes from power.FakePowerSource, so
+neither Windows nor psutil is needed. The tray benchmark needs pystray and
+Pillow and is skipped without them.
+
+    python benchmarks/bench.py [--output results.json] [--filter load_config]
+    python benchmarks/bench.py --compare baseline.json [--threshold 0.25]
+
+Each benchmark reports the best and median time per call over --repeat
+rounds. --compare flags (exit 1) every benchmark whose best time is more than
+--threshold slower than in the baseline file written by --output, and by more
+than --min-delta-us, so timer jitter on sub-microsecond cases is not flagged.
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import json
+import logging
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import edid  # noqa: E402
+import main as srr  # noqa: E402
+import power  # noqa: E402
+import reschanger  # noqa: E402
+import simdisplay  # noqa: E402
+import topology  # noqa: E402
+from allocations import FakeUser32  # noqa: E402
+
+FORMAT_VERSION = 1
+DEFAULT_REPEAT = 7
+DEFAULT_THRESHOLD = 0.25  # 25 % slower than the baseline is a regression
+DEFAULT_MIN_DELTA_US = 0.5
+
+# a typical laptop panel: native and scaled resolutions at several rates
+PANEL_MODES = tuple(
+    (w, h, hz)
+    for w, h in (
+        (2560, 1600), (2560, 1440), (1920, 1200), (1920, 1080), (1680, 1050),
+        (1600, 900), (1440, 900), (1366, 768), (1280, 800), (1280, 720),
+        (1024, 768), (800, 600),
+    )
+    for hz in (48, 50, 59, 60, 90, 100, 120, 144, 165, 240)
+)
+
+
+@dataclasses.dataclass
+class Case:
+    """`run` is timed; one call of it performs `inner` operations."""
+
+    run: Callable[[], object]
+    inner: int = 1
+    close: Optional[Callable[[], None]] = None
+
+
+class Skip(Exception):
+    pass
+
+
+BENCHMARKS: Dict[str, Callable[[], Case]] = {}
+
+
+def benchmark(name: str):
+    def register(factory: Callable[[], Case]) -> Callable[[], Case]:
+        BENCHMARKS[name] = factory
+        return factory
+
+    return register
+
+
+# --- fixtures ---------------------------------------------------------------
+
+
+def make_edid(name: str, max_hz: int = 165) -> bytes:
+    """A base EDID block with a detailed timing, name and range limits."""
+    block = bytearray(128)
+    block[:8] = bytes.fromhex("00ffffffffffff00")
+    block[8:10] = (0x30E4).to_bytes(2, "big")  # "LGD"
+    block[10:12] = (0x0521).to_bytes(2, "little")
+    block[18:20] = b"\x01\x04"
+    # 1920x1080, 148.5 MHz pixel clock
+    block[54:72] = bytes.fromhex("023a801871382d40582c450009252100001e")
+    block[72:90] = b"\x00\x00\x00\xfc\x00" + name.encode()[:13].ljust(13, b"\n")
+    block[90:108] = bytes([0, 0, 0, 0xFD, 0, 48, max_hz, 30, 160, 60]) + bytes(8)
+    block[108:126] = b"\x00\x00\x00\xff\x00" + b"SN0001".ljust(13, b"\n")
+    block[127] = -sum(block[:127]) % 256
+    return bytes(block)
+
+
+def _sim(count: int) -> simdisplay.SimulatedBackend:
+    backend = simdisplay.SimulatedBackend.fleet(count, modes=PANEL_MODES)
+    for i, d in enumerate(backend.displays.values()):
+        d.edid = make_edid(f"Panel {i}")
+    reschanger.use_backend(backend)
+    return backend
+
+
+_workdir = Path(tempfile.mkdtemp(prefix="srr-bench-"))
+
+
+def _write_config(monitor_ids: List[str]) -> None:
+    config: dict = {
+        mid: {
+            "performance-state": {"width": 1920, "height": 1080, "refresh_rate": 165},
+            "powersave-state": {"width": 1920, "height": 1080, "refresh_rate": 60},
+            "lowest-state": {"width": 1920, "height": 1080, "refresh_rate": 48},
+        }
+        for mid in monitor_ids
+    }
+    config["target_display"] = None
+    config["power_filter"] = {"dwell_powersave": 2, "max_switches": 6}
+    config["rules"] = [
+        {"profile": "lowest", "ac": False, "battery_below": 20},
+        {"profile": "powersave", "ac": True, "between": ["23:00", "07:00"]},
+    ]
+    srr.PATH_CONFIG = _workdir / "config.json"
+    srr.PATH_CONFIG.write_text(json.dumps(config, indent=4), encoding="utf-8")
+
+
+def _run_sync(coro):
+    """Drive a coroutine that never suspends (load_config does no I/O waits)."""
+    try:
+        coro.send(None)
+    except StopIteration as stop:
+        return stop.value
+    coro.close()
+    raise RuntimeError("coroutine suspended; it needs an event loop")
+
+
+# --- benchmarks -------------------------------------------------------------
+
+
+@benchmark("srr_loop tick (8 displays)")
+def _loop_tick() -> Case:
+    """One wake-up in steady state: nothing to switch, nothing to sample."""
+    backend = _sim(8)
+    _write_config([d.monitor_id for d in backend.displays.values()])
+    loop = asyncio.new_event_loop()
+
+    async def start() -> asyncio.Task:
+        srr._shutdown_event = asyncio.Event()
+        srr._reload_event = asyncio.Event()
+        srr._wake_event = asyncio.Event()
+        srr._power = power.FakePowerSource(power.PowerStatus(False, 80.0, 10000))
+        srr._topology = topology.FakeTopologySource(
+            topology.read_displays().values()
+        )
+        srr._power.start(loop, lambda status: srr._wake_event.set())
+        srr._topology.start(loop, lambda events: srr._wake_event.set())
+        task = loop.create_task(srr.srr_loop())
+        srr._wake_event.set()
+        await asyncio.sleep(0.05)  # first tick: load config, settle
+        return task
+
+    task = loop.run_until_complete(start())
+    inner = 100
+
+    async def ticks() -> None:
+        # the loop task runs its whole tick before this one resumes
+        for _ in range(inner):
+            srr._wake_event.set()
+            await asyncio.sleep(0)
+
+    def close() -> None:
+        srr._shutdown_event.set()
+        srr._wake_event.set()
+        loop.run_until_complete(task)
+        srr._display_io.shutdown()
+        loop.close()
+
+    return Case(lambda: loop.run_until_complete(ticks()), inner, close)
+
+
+def _load_config_case(monitors: int) -> Case:
+    _write_config([f"MONITOR\\BNC{i:04d}\\{{bench}}\\{i:04d}" for i in range(monitors)])
+    return Case(lambda: _run_sync(srr.load_config(force=True)))
+
+
+for _n in (1, 8, 64):
+    benchmark(f"load_config ({_n} monitors)")(
+        lambda n=_n: _load_config_case(n)
+    )
+
+
+def _win32_modes() -> bytes:
+    user32 = FakeUser32(1, PANEL_MODES)
+    reschanger.user32 = user32
+    reschanger.use_backend(reschanger.Win32Backend())
+    return user32.adapters[0]
+
+
+@benchmark("mode lookup (cached table)")
+def _mode_lookup() -> Case:
+    adapter = _win32_modes()
+    w, h, hz = PANEL_MODES[len(PANEL_MODES) // 2]
+    reschanger.get_mode_table(adapter)
+    return Case(lambda: reschanger.has_mode(adapter, w, h, hz))
+
+
+@benchmark("mode lookup (enum_display_modes walk)")
+def _mode_walk() -> Case:
+    adapter = _win32_modes()
+    mode = PANEL_MODES[len(PANEL_MODES) // 2]
+    return Case(lambda: mode in reschanger.enum_display_modes(adapter))
+
+
+def _display_name_case(cold: bool) -> Case:
+    backend = _sim(1)
+    d = next(iter(backend.displays.values()))
+
+    def run() -> str:
+        if cold:
+            srr._friendly_names.clear()
+            edid._cache.clear()
+        return srr._format_display_name(d.adapter_name, d.monitor_id, d.monitor_string)
+
+    return Case(run)
+
+
+benchmark("_format_display_name (cold)")(lambda: _display_name_case(True))
+benchmark("_format_display_name (cached)")(lambda: _display_name_case(False))
+
+
+@benchmark("edid.parse_edid")
+def _edid_parse() -> Case:
+    data = make_edid("LG ULTRAFINE")
+    return Case(lambda: edid.parse_edid(data))
+
+
+@benchmark("TrayController._build_menu (8 displays)")
+def _tray_menu() -> Case:
+    try:
+        from tray import TrayController
+    except ImportError as e:
+        raise Skip(f"{e.name} not installed") from None
+    tray = TrayController(
+        project_name=srr.PROJECT_NAME,
+        exe_path=_workdir / srr.PROJECT_EXECUTABLE,
+        config_path=_workdir / "config.json",
+        log_path=_workdir / "logs.txt",
+        on_exit=lambda: None,
+        on_reload=lambda: None,
+    )
+    tray._displays = [
+        {"id": f"MONITOR\\SIM{i:04d}", "name": f"{i + 1}: Panel {i}"} for i in range(8)
+    ]
+    return Case(tray._build_menu)
+
+
+# --- runner -----------------------------------------------------------------
+
+
+def measure(case: Case, repeat: int) -> Dict[str, float]:
+    timer = timeit.Timer(case.run)
+    number, _ = timer.autorange()
+    rounds = [t / (number * case.inner) for t in timer.repeat(repeat, number)]
+    return {
+        "best_us": min(rounds) * 1e6,
+        "median_us": statistics.median(rounds) * 1e6,
+        "calls": number * case.inner,
+        "rounds": repeat,
+    }
+
+
+def run_all(repeat: int, pattern: str = "") -> dict:
+    results: Dict[str, Dict[str, float]] = {}
+    skipped: Dict[str, str] = {}
+    for name, factory in BENCHMARKS.items():
+        if pattern not in name:
+            continue
+        try:
+            case = factory()
+        except Skip as e:
+            skipped[name] = str(e)
+            print(f"{name:<42} skipped: {e}")
+            continue
+        try:
+            results[name] = measure(case, repeat)
+        finally:
+            if case.close is not None:
+                case.close()
+        r = results[name]
+        print(f"{name:<42} {r['best_us']:>10.2f} us  (median {r['median_us']:.2f})")
+    return {
+        "version": FORMAT_VERSION,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+        "skipped": skipped,
+    }
+
+
+def compare(
+    current: dict,
+    baseline: dict,
+    threshold: float,
+    min_delta_us: float = DEFAULT_MIN_DELTA_US,
+) -> Tuple[List[str], List[str]]:
+    """(report lines, names of regressed benchmarks)."""
+    lines, regressed = [], []
+    base = baseline.get("results", {})
+    for name, r in current["results"].items():
+        if name not in base:
+            lines.append(f"{name:<42} new")
+            continue
+        ratio = r["best_us"] / base[name]["best_us"]
+        delta = abs(r["best_us"] - base[name]["best_us"])
+        verdict = ""
+        if delta < min_delta_us:
+            pass
+        elif ratio > 1 + threshold:
+            verdict = "REGRESSION"
+            regressed.append(name)
+        elif ratio < 1 - threshold:
+            verdict = "faster"
+        lines.append(
+            f"{name:<42} {base[name]['best_us']:>10.2f} -> {r['best_us']:>10.2f} us"
+            f"  x{ratio:.2f} {verdict}".rstrip()
+        )
+    return lines, regressed
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    parser.add_argument("--compare", type=Path, help="baseline JSON to compare to")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--min-delta-us", type=float, default=DEFAULT_MIN_DELTA_US)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--filter", default="", help="only names containing this")
+    args = parser.parse_args(argv[1:])
+    logging.basicConfig(level=logging.ERROR)
+
+    baseline = None
+    if args.compare is not None:
+        try:
+            baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            print(f"cannot read baseline {args.compare}: {e}")
+            return 2
+
+    current = run_all(args.repeat, args.filter)
+    if args.output is not None:
+        args.output.write_text(json.dumps(current, indent=2), encoding="utf-8")
+    if baseline is None:
+        return 0
+    lines, regressed = compare(current, baseline, args.threshold, args.min_delta_us)
+    print(f"\ncompared to {args.compare} ({baseline.get('time', '?')}):")
+    for line in lines:
+        print(line)
+    if regressed:
+        print(f"{len(regressed)} regression(s) over {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
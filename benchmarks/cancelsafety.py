@@ -0,0 +1,112 @@
+"""
+Cancellation check for multi-display switches.
+
+A retry or switch cancelled while AsyncDisplay.commit_modes is staging must
+not leave its modes staged in the registry: the next unrelated commit's
+global apply would switch those displays to a mode nobody wants any more.
+Cancels a commit while one adapter is still staging (and, separately, right
+after it staged), then commits another adapter and checks that only that one
+changed mode. Runs against simdisplay; fails (exit 1) on a stale mode.
+
+    python benchmarks/cancelsafety.py [--stage-ms 100]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import asyncdisplay  # noqa: E402
+import reschanger  # noqa: E402
+import simdisplay  # noqa: E402
+
+MODES = ((1920, 1080, 60), (1920, 1080, 144), (1920, 1080, 165))
+DISPLAY1, DISPLAY2 = b"\\\\.\\DISPLAY1", b"\\\\.\\DISPLAY2"
+
+
+class SlowStaging(simdisplay.SimulatedBackend):
+    """Staging a mode on DISPLAY1 blocks for `stage_delay` seconds."""
+
+    def __init__(self, displays, stage_delay: float):
+        super().__init__(displays)
+        self.stage_delay = stage_delay
+
+    def change_mode(self, width, height, freq, adapter_name, flags):
+        if adapter_name == DISPLAY1:
+            time.sleep(self.stage_delay)
+        return super().change_mode(width, height, freq, adapter_name, flags)
+
+
+async def scenario(
+    stage_delay: float, cancel_after: float, hold_commit: float = 0.0
+) -> List[str]:
+    """
+    Problems found when a DISPLAY1 commit is cancelled after `cancel_after`.
+    `hold_commit` keeps the global lane busy that long, so the commit is still
+    queued when the cancellation arrives.
+    """
+    fleet = simdisplay.SimulatedBackend.fleet(2, modes=MODES)
+    backend = SlowStaging(list(fleet.displays.values()), stage_delay)
+    reschanger.use_backend(backend)
+    original = backend.displays[DISPLAY1].current
+    display_io = asyncdisplay.AsyncDisplay()
+    problems = []
+    try:
+        if hold_commit:
+            blocker = asyncio.ensure_future(
+                display_io.call(None, time.sleep, hold_commit)
+            )
+        stale = asyncio.ensure_future(
+            display_io.commit_modes([((1920, 1080, 60), DISPLAY1)])
+        )
+        await asyncio.sleep(cancel_after)
+        stale.cancel()
+        try:
+            await stale
+            problems.append("commit finished before it could be cancelled")
+        except asyncio.CancelledError:
+            pass
+        if hold_commit:
+            await blocker
+        await asyncio.sleep(stage_delay)  # let a stage still on its lane land
+        res, failed, _ = await display_io.commit_modes(
+            [((1920, 1080, 144), DISPLAY2)]
+        )
+        if res != reschanger.DISP_RESULTS.DISP_CHANGE_SUCCESSFUL or failed:
+            problems.append(f"second commit failed: {res}, {failed!r}")
+    finally:
+        display_io.shutdown()
+    d1, d2 = backend.displays[DISPLAY1], backend.displays[DISPLAY2]
+    if d1.current != original:
+        problems.append(f"DISPLAY1 switched to stale {d1.current}")
+    if d1.registry != original or d1.pending:
+        problems.append(f"DISPLAY1 left staged at {d1.registry}")
+    if d2.current != (1920, 1080, 144):
+        problems.append(f"DISPLAY2 is at {d2.current}, not 144 Hz")
+    return problems
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stage-ms", type=float, default=100.0)
+    args = parser.parse_args(argv[1:])
+    stage = args.stage_ms / 1000
+
+    failed = False
+    for label, cancel_after, hold_commit in (
+        ("cancelled while staging", stage / 2, 0.0),
+        ("cancelled before commit", stage * 1.5, stage * 2),
+    ):
+        problems = asyncio.run(scenario(stage, cancel_after, hold_commit))
+        print(f"{label:<26} {'; '.join(problems) if problems else 'ok'}")
+        failed |= bool(problems)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
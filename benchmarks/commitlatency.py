@@ -0,0 +1,122 @@
+"""
+Latency check for switching several displays at once.
+
+Drives AsyncDisplay.commit_modes against simdisplay with a different staging
+delay per adapter (a slow driver on each). Since every adapter stages on its
+own lane, a multi-display switch should take about as long as the slowest
+adapter, not the sum of all of them, and apply everything with exactly one
+global mode set. Fails (exit 1) otherwise.
+
+    python benchmarks/commitlatency.py [--displays 4] [--delay-ms 50]
+                                       [--runs 3] [--tolerance 0.5]
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import asyncdisplay  # noqa: E402
+import reschanger  # noqa: E402
+import simdisplay  # noqa: E402
+
+MODES = ((1920, 1080, 60), (1920, 1080, 165))
+
+
+class SlowAdapters(simdisplay.SimulatedBackend):
+    """Staging a mode on adapter a blocks for delays[a] seconds."""
+
+    def __init__(self, displays, delays: Dict[bytes, float]):
+        super().__init__(displays)
+        self.delays = delays
+
+    def change_mode(self, width, height, freq, adapter_name, flags):
+        time.sleep(self.delays.get(adapter_name, 0.0))
+        return super().change_mode(width, height, freq, adapter_name, flags)
+
+
+async def switch_all(display_io, backend, mode) -> float:
+    changes = [(mode, adapter) for adapter in backend.displays]
+    t0 = time.perf_counter()
+    res, failed, _ = await display_io.commit_modes(changes)
+    elapsed = time.perf_counter() - t0
+    if res != reschanger.DISP_RESULTS.DISP_CHANGE_SUCCESSFUL or failed:
+        raise RuntimeError(f"commit failed: {res}, {failed!r}")
+    return elapsed
+
+
+async def run(displays: int, delay: float, runs: int):
+    fleet = simdisplay.SimulatedBackend.fleet(displays, modes=MODES)
+    delays = {a: delay * (i + 1) for i, a in enumerate(fleet.displays)}
+    backend = SlowAdapters(list(fleet.displays.values()), delays)
+    reschanger.use_backend(backend)
+    for adapter in backend.displays:
+        reschanger.get_mode_table(adapter)  # mode tables are not what we time
+
+    display_io = asyncdisplay.AsyncDisplay()
+    timings: List[float] = []
+    applies: List[int] = []
+    try:
+        for n in range(runs):
+            before = backend.applies
+            timings.append(await switch_all(display_io, backend, MODES[n % 2]))
+            applies.append(backend.applies - before)
+    finally:
+        display_io.shutdown()
+    return delays, timings, applies
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--displays", type=int, default=4)
+    parser.add_argument(
+        "--delay-ms",
+        type=float,
+        default=50.0,
+        help="staging delay of the first adapter; adapter i gets i times this",
+    )
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.5,
+        help="allowed overshoot over the slowest adapter, as a fraction of it",
+    )
+    args = parser.parse_args(argv[1:])
+
+    delays, timings, applies = asyncio.run(
+        run(args.displays, args.delay_ms / 1000, args.runs)
+    )
+    slowest, total = max(delays.values()), sum(delays.values())
+    elapsed = statistics.median(timings)
+    print(
+        f"{args.displays} displays, staging delays "
+        f"{', '.join(f'{d * 1000:.0f}' for d in delays.values())} ms"
+    )
+    print(
+        f"switch took {elapsed * 1000:.1f} ms (median of {args.runs}); "
+        f"slowest adapter {slowest * 1000:.0f} ms, sum {total * 1000:.0f} ms"
+    )
+    print(f"global applies per switch: {applies}")
+
+    failed = False
+    if elapsed > slowest * (1 + args.tolerance):
+        print(f"FAIL: more than {args.tolerance:.0%} over the slowest adapter")
+        failed = True
+    if args.displays > 1 and elapsed >= (slowest + total) / 2:
+        print("FAIL: adapters were staged one after another")
+        failed = True
+    if any(n != 1 for n in applies):
+        print("FAIL: expected exactly one global apply per switch")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
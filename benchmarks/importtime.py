@@ -0,0 +1,173 @@
+"""
+Import-time budget for SRR's startup path.
+
+Runs `python -X importtime -c "import main"` in a fresh interpreter, parses the
+per-module timings and fails (exit 1) when importing main pulls in a module
+that must only load on first use, or is too slow.
+
+"Too slow" is relative to the machine: every run is paired with a fresh
+interpreter importing REFERENCE_MODULES (the stdlib SRR builds on), and the
+median of main / reference must stay under --max-ratio. An absolute
+--budget-ms can be added for a known machine. SRR's modules are compiled
+first, since the frozen build ships bytecode.
+
+    python benchmarks/importtime.py [--max-ratio 1.75] [--budget-ms N]
+                                    [--runs 9] [--top 15]
+"""
+
+import argparse
+import compileall
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# main / reference measured 1.10-1.43 over repeated runs (Linux, Python 3.11,
+# a shared machine); main itself swung 112-170 ms over the same runs
+DEFAULT_MAX_RATIO = 1.75
+# stdlib modules main imports; their cost scales with the machine like main's
+REFERENCE_MODULES = (
+    "argparse",
+    "array",
+    "asyncio",
+    "collections",
+    "concurrent.futures",
+    "ctypes",
+    "dataclasses",
+    "enum",
+    "hashlib",
+    "json",
+    "logging",
+    "random",
+    "shutil",
+    "signal",
+    "struct",
+)
+# heavy modules that must stay off the `import main` path
+LAZY_MODULES = (
+    "psutil",
+    "pystray",
+    "PIL",
+    "winotify",
+    "tray",
+    # SRR's own modules that are only needed once srr() runs, or when opted in
+    "control",
+    "telemetry",
+    "eventtrace",
+    "lagwatch",
+    "logpipe",
+    "replay",
+    "simdisplay",
+)
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def parse_importtime(stderr: str) -> Dict[str, Tuple[int, int]]:
+    """{module: (self_us, cumulative_us)} from `-X importtime` output."""
+    out = {}
+    for line in stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            out[m.group(4)] = (int(m.group(1)), int(m.group(2)))
+    return out
+
+
+def _run(code: str) -> str:
+    """-X importtime output of a fresh interpreter running `code`."""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(f"{code!r} failed with exit code {proc.returncode}")
+    return proc.stderr
+
+
+def measure_once() -> Dict[str, Tuple[int, int]]:
+    return parse_importtime(_run("import main"))
+
+
+def reference_ms() -> float:
+    """
+    Time to import REFERENCE_MODULES: the sum over top-level entries only,
+    since a module nested under another is already in its cumulative time.
+    """
+    stderr = _run("import " + ", ".join(REFERENCE_MODULES))
+    top = (_LINE.match(line) for line in stderr.splitlines())
+    return sum(int(m.group(2)) for m in top if m and len(m.group(3)) == 1) / 1000
+
+
+def lazy_violations(modules: Dict[str, Tuple[int, int]]) -> List[str]:
+    return sorted(
+        name
+        for name in modules
+        if any(name == lazy or name.startswith(lazy + ".") for lazy in LAZY_MODULES)
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--max-ratio",
+        type=float,
+        default=DEFAULT_MAX_RATIO,
+        help="max import main time as a multiple of the stdlib reference",
+    )
+    parser.add_argument(
+        "--budget-ms", type=float, help="also fail above this absolute time"
+    )
+    parser.add_argument("--runs", type=int, default=9)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    # the frozen build ships bytecode: time imports, not compiling stale .pyc
+    compileall.compile_dir(ROOT, maxlevels=0, quiet=1)
+    runs, totals, ratios = [], [], []
+    for _ in range(args.runs):  # interleaved, so both see the same load
+        run = measure_once()
+        if "main" not in run:
+            raise SystemExit("no timing recorded for main")
+        runs.append(run)
+        totals.append(run["main"][1] / 1000)
+        ratios.append(totals[-1] / reference_ms())
+    median_ms = statistics.median(totals)
+    ratio = statistics.median(ratios)
+
+    last = runs[-1]
+    print(f"{'self ms':>9} {'cumul ms':>9}  module")
+    for name, (self_us, cum_us) in sorted(
+        last.items(), key=lambda kv: kv[1][1], reverse=True
+    )[: args.top]:
+        print(f"{self_us / 1000:9.1f} {cum_us / 1000:9.1f}  {name}")
+    print(
+        f"\nimport main: median {median_ms:.1f} ms over {len(totals)} run(s), "
+        f"{ratio:.2f}x the stdlib reference (max {args.max_ratio:.2f}x)"
+    )
+
+    failed = False
+    violations = lazy_violations(last)
+    if violations:
+        print(f"FAIL: loaded eagerly: {', '.join(violations)}")
+        failed = True
+    if ratio > args.max_ratio:
+        print(f"FAIL: {ratio:.2f}x the stdlib reference, max {args.max_ratio:.2f}x")
+        failed = True
+    if args.budget_ms is not None and median_ms > args.budget_ms:
+        print(f"FAIL: over budget by {median_ms - args.budget_ms:.1f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,4 +2,5 @@ if not exist .venv (
     py -3.12 -m venv .venv
     .\.venv\Scripts\pip3.exe install -r requirements.txt
 )
-.\.venv\Scripts\pyinstaller.exe --uac-admin --noconsole --clean -n SRR -F --add-data "assets/icon.png;assets" main.py
\ No newline at end of file
+.\.venv\Scripts\python.exe -c "from PIL import Image; open('assets/icon.rgba', 'wb').write(Image.open('assets/icon.png').convert('RGBA').tobytes())"
+.\.venv\Scripts\pyinstaller.exe --uac-admin --noconsole --clean -n SRR -F --add-data "assets/icon.png;assets" --add-data "assets/icon.rgba;assets" main.py
\ No newline at end of file
@@ -0,0 +1,354 @@
+"""
+Config directory watcher. Collapses bursts of file-system notifications
+(editors that write, rename and replace) into one debounced callback.
+"""
+
+import asyncio
+import ctypes
+import ctypes.wintypes
+import logging
+import os
+import struct
+import sys
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+
+import scheduler
+
+DEFAULT_DEBOUNCE = 0.2  # seconds
+
+# inotify(7)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+# ReadDirectoryChangesW
+FILE_LIST_DIRECTORY = 0x0001
+FILE_SHARE_ALL = 0x00000001 | 0x00000002 | 0x00000004
+OPEN_EXISTING = 3
+FILE_FLAG_BACKUP_SEMANTICS = 0x02000000
+FILE_NOTIFY_CHANGE_FILE_NAME = 0x00000001
+FILE_NOTIFY_CHANGE_SIZE = 0x00000008
+FILE_NOTIFY_CHANGE_LAST_WRITE = 0x00000010
+INVALID_HANDLE_VALUE = ctypes.c_void_p(-1).value
+
+
+class DirectoryWatcher:
+    """
+    Base class. Watches `names` inside `directory` and, once no further
+    change has arrived for `debounce` seconds, calls back on the asyncio loop
+    thread with the set of names that changed. Subclasses report raw changes
+    through `_changed`, which is safe to call from any thread.
+    """
+
+    name = "base"
+
+    def __init__(
+        self, directory: Path, names: Iterable[str], debounce: float = DEFAULT_DEBOUNCE
+    ):
+        self.directory = Path(directory)
+        self.names = {n.lower() for n in names}
+        self.debounce = debounce
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._callback: Optional[Callable[[Set[str]], None]] = None
+        self._pending: Set[str] = set()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def start(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        callback: Callable[[Set[str]], None],
+    ) -> None:
+        self._loop = loop
+        self._callback = callback
+        self._start()
+        logging.info(f"config watcher: {self.name} on {self.directory}")
+
+    def stop(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _start(self) -> None:
+        raise NotImplementedError
+
+    def _changed(self, name: str) -> None:
+        name = name.lower()
+        if name not in self.names:
+            return
+        if self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._touch, name)
+
+    def _touch(self, name: str) -> None:
+        assert self._loop is not None
+        self._pending.add(name)
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = self._loop.call_later(self.debounce, self._flush)
+
+    def _flush(self) -> None:
+        self._timer = None
+        names, self._pending = self._pending, set()
+        if names and self._callback is not None:
+            self._callback(names)
+
+
+class InotifyWatcher(DirectoryWatcher):
+    """Linux: inotify fd registered directly with the asyncio loop."""
+
+    name = "inotify"
+    MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_CREATE | IN_DELETE
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._fd: Optional[int] = None
+
+    @staticmethod
+    def available() -> bool:
+        return sys.platform.startswith("linux") and hasattr(_libc(), "inotify_init1")
+
+    def _start(self) -> None:
+        assert self._loop is not None
+        libc = _libc()
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        wd = libc.inotify_add_watch(fd, os.fsencode(self.directory), self.MASK)
+        if wd < 0:
+            os.close(fd)
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch {self.directory}")
+        self._fd = fd
+        self._loop.add_reader(fd, self._read)
+
+    def stop(self) -> None:
+        if self._fd is not None:
+            if self._loop is not None and not self._loop.is_closed():
+                self._loop.remove_reader(self._fd)
+            os.close(self._fd)
+            self._fd = None
+        super().stop()
+
+    def _read(self) -> None:
+        assert self._fd is not None
+        try:
+            buf = os.read(self._fd, 4096)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset + _INOTIFY_EVENT.size <= len(buf):
+            _wd, _mask, _cookie, length = _INOTIFY_EVENT.unpack_from(buf, offset)
+            offset += _INOTIFY_EVENT.size
+            raw = buf[offset:offset + length].split(b"\x00", 1)[0]
+            offset += length
+            if raw:
+                self._changed(os.fsdecode(raw))
+
+
+class Win32DirectoryWatcher(DirectoryWatcher):
+    """Windows: blocking ReadDirectoryChangesW on a daemon thread."""
+
+    name = "ReadDirectoryChangesW"
+    FILTER = (
+        FILE_NOTIFY_CHANGE_FILE_NAME
+        | FILE_NOTIFY_CHANGE_LAST_WRITE
+        | FILE_NOTIFY_CHANGE_SIZE
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._handle = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    @staticmethod
+    def available() -> bool:
+        return sys.platform == "win32"
+
+    def _start(self) -> None:
+        kernel32 = _kernel32()
+        handle = kernel32.CreateFileW(
+            str(self.directory),
+            FILE_LIST_DIRECTORY,
+            FILE_SHARE_ALL,
+            None,
+            OPEN_EXISTING,
+            FILE_FLAG_BACKUP_SEMANTICS,
+            None,
+        )
+        if handle in (None, INVALID_HANDLE_VALUE):
+            raise ctypes.WinError()
+        self._handle = handle
+        self._thread = threading.Thread(
+            target=self._run, daemon=True, name="srr-confwatch"
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._handle is not None and not self._stopping:
+            self._stopping = True
+            _kernel32().CancelIoEx(self._handle, None)  # thread closes the handle
+        super().stop()
+
+    def _run(self) -> None:
+        try:
+            self._read_changes()
+        finally:
+            _kernel32().CloseHandle(self._handle)
+            self._handle = None
+
+    def _read_changes(self) -> None:
+        kernel32 = _kernel32()
+        buf = (ctypes.wintypes.DWORD * 1024)()  # DWORD-aligned, as required
+        returned = ctypes.wintypes.DWORD()
+        while not self._stopping:
+            ok = kernel32.ReadDirectoryChangesW(
+                self._handle,
+                buf,
+                ctypes.sizeof(buf),
+                False,
+                self.FILTER,
+                ctypes.byref(returned),
+                None,
+                None,
+            )
+            if not ok:
+                if not self._stopping:
+                    logging.warning(
+                        f"ReadDirectoryChangesW failed: {ctypes.WinError()}"
+                    )
+                return
+            if returned.value == 0:
+                # buffer overflow: details were dropped, assume everything changed
+                for name in self.names:
+                    self._changed(name)
+                continue
+            data = bytes(buf)[: returned.value]
+            offset = 0
+            while True:
+                next_offset, _action, length = struct.unpack_from("III", data, offset)
+                start = offset + 12
+                self._changed(data[start:start + length].decode("utf-16-le"))
+                if next_offset == 0:
+                    break
+                offset += next_offset
+
+
+class PollingWatcher(DirectoryWatcher):
+    """
+    Fallback: stats the watched files every `interval` seconds, slowing down
+    to `max_interval` while none of them changes.
+    """
+
+    name = "polling"
+
+    def __init__(
+        self, *args, interval: float, max_interval: Optional[float] = None, **kwargs
+    ):
+        super().__init__(*args, **kwargs)
+        self.interval = interval
+        self.max_interval = max_interval
+        self._job: Optional[scheduler.Job] = None
+        self._stats: Dict[str, Optional[Tuple[int, int]]] = {}
+
+    def _stat(self, name: str) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.directory / name)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _start(self) -> None:
+        assert self._loop is not None
+        self._stats = {n: self._stat(n) for n in self.names}
+        self._job = scheduler.shared(self._loop).add(
+            "config", self._poll, self.interval, self.max_interval
+        )
+
+    def stop(self) -> None:
+        if self._job is not None:
+            self._job.cancel()
+            self._job = None
+        super().stop()
+
+    def _poll(self) -> str:
+        result = scheduler.UNCHANGED
+        for name in self.names:
+            st = self._stat(name)
+            if st != self._stats.get(name):
+                self._stats[name] = st
+                self._changed(name)
+                result = scheduler.CHANGED
+        return result
+
+
+def _libc():
+    return ctypes.CDLL(None, use_errno=True)
+
+
+def _kernel32():
+    kernel32 = ctypes.windll.kernel32
+    HANDLE = ctypes.wintypes.HANDLE
+    kernel32.CreateFileW.restype = HANDLE
+    kernel32.ReadDirectoryChangesW.argtypes = [
+        HANDLE,
+        ctypes.c_void_p,
+        ctypes.wintypes.DWORD,
+        ctypes.wintypes.BOOL,
+        ctypes.wintypes.DWORD,
+        ctypes.POINTER(ctypes.wintypes.DWORD),
+        ctypes.c_void_p,
+        ctypes.c_void_p,
+    ]
+    kernel32.CancelIoEx.argtypes = [HANDLE, ctypes.c_void_p]
+    kernel32.CloseHandle.argtypes = [HANDLE]
+    return kernel32
+
+
+def create_watcher(
+    directory: Path,
+    names: Iterable[str],
+    poll_interval: float,
+    debounce: float = DEFAULT_DEBOUNCE,
+    max_interval: Optional[float] = None,
+) -> DirectoryWatcher:
+    """Native notification watcher where available, polling otherwise."""
+    for cls in (Win32DirectoryWatcher, InotifyWatcher):
+        if cls.available():
+            return cls(directory, names, debounce)
+    return PollingWatcher(
+        directory, names, debounce, interval=poll_interval, max_interval=max_interval
+    )
+
+
+def start_watcher(
+    loop: asyncio.AbstractEventLoop,
+    callback: Callable[[Set[str]], None],
+    directory: Path,
+    names: Iterable[str],
+    poll_interval: float,
+    debounce: float = DEFAULT_DEBOUNCE,
+    max_interval: Optional[float] = None,
+) -> DirectoryWatcher:
+    """create_watcher + start, degrading to polling if the native API fails."""
+    watcher = create_watcher(directory, names, poll_interval, debounce, max_interval)
+    try:
+        watcher.start(loop, callback)
+    except OSError as e:
+        logging.warning(f"{watcher.name} watcher failed ({e}); polling instead")
+        watcher = PollingWatcher(
+            directory,
+            names,
+            debounce,
+            interval=poll_interval,
+            max_interval=max_interval,
+        )
+        watcher.start(loop, callback)
+    return watcher
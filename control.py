@@ -0,0 +1,249 @@
+"""
+Local control channel: JSON-lines requests/responses over a named pipe on
+Windows or a Unix socket elsewhere, served on the asyncio loop.
+
+    {"cmd": "status"}                            -> {"ok": true, ...}
+    {"cmd": "force", "profile": "powersave"}     (null/"auto" clears it)
+    {"cmd": "pause"} / {"cmd": "resume"} / {"cmd": "reload"}
+    {"cmd": "target", "display": "<monitor id>"} (null: all displays)
+
+Client:  python control.py status | force <profile|auto> | pause | resume |
+         reload | target [<monitor id>]
+"""
+
+import asyncio
+import getpass
+import json
+import logging
+import os
+import socket
+import sys
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, List, Optional
+
+MAX_REQUEST = 64 * 1024  # bytes per request line
+
+Handler = Callable[[dict], Awaitable[dict]]
+
+
+def default_address(program_dir: Path) -> str:
+    """Per-user pipe name on Windows, a socket in the program dir elsewhere."""
+    if sys.platform == "win32":
+        return rf"\\.\pipe\SRR-{getpass.getuser()}"
+    return str(program_dir / "control.sock")
+
+
+class ControlServer:
+    def __init__(self, address: str, handler: Handler):
+        self.address = address
+        self._handler = handler
+        self._servers: list = []
+        self._clients: set = set()
+        self.stats = {"connections": 0, "requests": 0, "errors": 0}
+
+    async def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if sys.platform == "win32":
+            # Proactor loop only; one pipe instance is re-armed per client
+            self._servers = await loop.start_serving_pipe(
+                self._protocol_factory, self.address
+            )
+        else:
+            try:
+                os.unlink(self.address)  # left behind by a crashed run
+            except FileNotFoundError:
+                pass
+            server = await asyncio.start_unix_server(
+                self._accept, self.address, limit=MAX_REQUEST
+            )
+            os.chmod(self.address, 0o600)
+            self._servers = [server]
+        logging.info(f"control channel listening on {self.address}")
+
+    def _protocol_factory(self) -> asyncio.StreamReaderProtocol:
+        reader = asyncio.StreamReader(limit=MAX_REQUEST)
+        return asyncio.StreamReaderProtocol(reader, self._accept)
+
+    def _accept(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        # a task of our own: the stream protocol's done-callback (3.11, early
+        # 3.12) logs a client task cancelled by stop() as an error
+        task = asyncio.get_running_loop().create_task(self._serve(reader, writer))
+        self._clients.add(task)
+        task.add_done_callback(self._clients.discard)
+
+    def stop(self) -> None:
+        for server in self._servers:
+            server.close()
+        self._servers = []
+        for task in list(self._clients):
+            task.cancel()
+        if sys.platform != "win32":
+            try:
+                os.unlink(self.address)
+            except OSError:
+                pass
+
+    async def _serve(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self.stats["connections"] += 1
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:  # longer than MAX_REQUEST
+                    await self._reply(writer, _error("request too large"))
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                await self._reply(writer, await self._dispatch(line))
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, line: bytes) -> dict:
+        self.stats["requests"] += 1
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            self.stats["errors"] += 1
+            return _error(f"invalid JSON: {e}")
+        if not isinstance(request, dict) or not isinstance(request.get("cmd"), str):
+            self.stats["errors"] += 1
+            return _error('expected {"cmd": "..."}')
+        try:
+            return await self._handler(request)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logging.error(f"control request {request!r} failed: {e}", exc_info=e)
+            return _error(str(e))
+
+    @staticmethod
+    async def _reply(writer: asyncio.StreamWriter, response: dict) -> None:
+        writer.write(json.dumps(response).encode() + b"\n")
+        await writer.drain()
+
+
+def _error(message: str) -> dict:
+    return {"ok": False, "error": message}
+
+
+def request(address: str, payload: dict, timeout: float = 5.0) -> dict:
+    """Blocking one-shot client, for scripts and the command line."""
+    data = json.dumps(payload).encode() + b"\n"
+    if sys.platform == "win32":
+        return json.loads(_pipe_request(address, data, timeout))
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(address)
+        sock.sendall(data)
+        return json.loads(_read_line(lambda n: sock.recv(n)))
+
+
+def _pipe_request(address: str, data: bytes, timeout: float) -> bytes:
+    """
+    One request over the named pipe. Overlapped I/O, so that `timeout` covers
+    the open, the write and the read like it does for the socket.
+    """
+    import _winapi
+
+    deadline = time.monotonic() + timeout
+
+    def remaining_ms() -> int:
+        return max(0, int((deadline - time.monotonic()) * 1000))
+
+    def timed_out() -> TimeoutError:
+        return TimeoutError(f"{address} did not answer within {timeout} s")
+
+    while True:
+        try:
+            handle = _winapi.CreateFile(
+                address,
+                _winapi.GENERIC_READ | _winapi.GENERIC_WRITE,
+                0,
+                _winapi.NULL,
+                _winapi.OPEN_EXISTING,
+                _winapi.FILE_FLAG_OVERLAPPED,
+                _winapi.NULL,
+            )
+            break
+        except OSError as e:
+            # every pipe instance is serving another client: wait for a free one
+            if e.winerror != _winapi.ERROR_PIPE_BUSY:
+                raise
+            if not remaining_ms():
+                raise timed_out() from e
+            try:
+                _winapi.WaitNamedPipe(address, max(1, remaining_ms()))
+            except OSError:
+                raise timed_out() from e
+
+    def wait(ov) -> None:
+        signalled = _winapi.WaitForMultipleObjects([ov.event], False, remaining_ms())
+        if signalled == _winapi.WAIT_TIMEOUT:
+            ov.cancel()
+            raise timed_out()
+        ov.GetOverlappedResult(True)
+
+    def read(n: int) -> bytes:
+        try:
+            ov, _ = _winapi.ReadFile(handle, n, overlapped=True)
+            wait(ov)
+        except BrokenPipeError:  # server closed its end
+            return b""
+        return ov.getbuffer()
+
+    try:
+        ov, _ = _winapi.WriteFile(handle, data, overlapped=True)
+        wait(ov)
+        return _read_line(read)
+    finally:
+        _winapi.CloseHandle(handle)
+
+
+def _read_line(read: Callable[[int], bytes]) -> bytes:
+    buf = b""
+    while not buf.endswith(b"\n"):
+        chunk = read(4096)
+        if not chunk:
+            break
+        buf += chunk
+    return buf
+
+
+def _parse_cli(argv: List[str]) -> Optional[dict]:
+    if not argv:
+        return None
+    cmd, rest = argv[0], argv[1:]
+    if cmd in ("status", "pause", "resume", "reload") and not rest:
+        return {"cmd": cmd}
+    if cmd == "force" and len(rest) == 1:
+        return {"cmd": cmd, "profile": None if rest[0] == "auto" else rest[0]}
+    if cmd == "target" and len(rest) <= 1:
+        return {"cmd": cmd, "display": rest[0] if rest else None}
+    return None
+
+
+def main(argv: List[str]) -> int:
+    payload = _parse_cli(argv[1:])
+    if payload is None:
+        print(__doc__.strip().split("Client:", 1)[1].strip())
+        return 2
+    base = Path(os.environ.get("LOCALAPPDATA", Path.home()))
+    try:
+        response = request(default_address(base / "SRR"), payload)
+    except OSError as e:
+        print(f"SRR is not reachable: {e}")
+        return 1
+    print(json.dumps(response, indent=2))
+    return 0 if response.get("ok") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,168 @@
+"""
+Persistent per-monitor metadata (friendly name, EDID hash, mode table,
+registry mode) kept next to config.json so a cold start can skip re-probing
+displays whose hardware has not changed, plus the registry modes SRR has
+overwritten and must put back.
+"""
+
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, FrozenSet, Optional, Tuple
+
+import edid
+
+CACHE_VERSION = 1
+
+ModeTable = Dict[Tuple[int, int], FrozenSet[int]]
+
+
+def fingerprint(
+    monitor_id: str,
+    adapter_name: bytes,
+    monitor_string: str,
+    edid_data,
+    driver: Optional[str] = None,
+) -> str:
+    """
+    Cheap identity of a display: where it is attached, which panel it is and
+    which driver version enumerates its modes (a driver update can add or
+    drop modes without changing anything else).
+    """
+    h = hashlib.blake2b(digest_size=8)
+    h.update(monitor_id.encode("utf-8", errors="replace"))
+    h.update(b"\0" + adapter_name + b"\0")
+    h.update(monitor_string.encode("utf-8", errors="replace"))
+    h.update(b"\0" + (edid.edid_hash(edid_data) if edid_data else "").encode())
+    h.update(b"\0" + (driver or "").encode("utf-8", errors="replace"))
+    return h.hexdigest()
+
+
+@dataclasses.dataclass
+class CachedDisplay:
+    fingerprint: str
+    friendly_name: Optional[str]
+    edid_hash: Optional[str]
+    modes: ModeTable
+    registry_mode: Optional[Tuple[int, int, int]]
+
+    def to_json(self) -> dict:
+        return {
+            "fingerprint": self.fingerprint,
+            "friendly_name": self.friendly_name,
+            "edid_hash": self.edid_hash,
+            "modes": {
+                f"{w}x{h}": sorted(freqs) for (w, h), freqs in self.modes.items()
+            },
+            "registry_mode": list(self.registry_mode) if self.registry_mode else None,
+        }
+
+    @classmethod
+    def from_json(cls, raw: dict) -> "CachedDisplay":
+        modes: ModeTable = {}
+        for res, freqs in raw["modes"].items():
+            w, h = res.split("x")
+            modes[(int(w), int(h))] = frozenset(int(f) for f in freqs)
+        registry = raw.get("registry_mode")
+        return cls(
+            fingerprint=str(raw["fingerprint"]),
+            friendly_name=raw.get("friendly_name"),
+            edid_hash=raw.get("edid_hash"),
+            modes=modes,
+            registry_mode=tuple(int(v) for v in registry) if registry else None,
+        )
+
+
+class DisplayCache:
+    def __init__(self, path: Path):
+        self.path = path
+        self.entries: Dict[str, CachedDisplay] = {}
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path: Path) -> "DisplayCache":
+        """Missing, corrupt or other-version files give an empty cache."""
+        cache = cls(path)
+        try:
+            with open(path, "r") as f:
+                raw = json.load(f)
+            if raw.get("version") != CACHE_VERSION:
+                logging.info(f"display cache version {raw.get('version')!r} ignored")
+                return cache
+            for mid, entry in raw["displays"].items():
+                cache.entries[mid] = CachedDisplay.from_json(entry)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            logging.warning(f"display cache unreadable, rebuilding: {e}")
+            cache.entries = {}
+        return cache
+
+    def get(self, monitor_id: str, current_fingerprint: str) -> Optional[CachedDisplay]:
+        """The entry for monitor_id if it was recorded for the same hardware."""
+        entry = self.entries.get(monitor_id)
+        if entry is None or entry.fingerprint != current_fingerprint:
+            return None
+        return entry
+
+    def put(self, monitor_id: str, entry: CachedDisplay) -> None:
+        self.entries[monitor_id] = entry
+        self.dirty = True
+
+    def save(self) -> None:
+        data = {
+            "version": CACHE_VERSION,
+            "displays": {mid: e.to_json() for mid, e in self.entries.items()},
+        }
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        try:
+            with open(tmp, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+            self.dirty = False
+        except OSError as e:
+            logging.warning(f"failed to write display cache: {e}")
+
+
+class OriginalModesFile:
+    """
+    Registry modes SRR overwrote, as reschanger.original_modes(). Written
+    before every first registry write of an adapter and rewritten as they are
+    restored, so a leftover non-empty file means the last run did not exit
+    cleanly.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def load(self) -> Dict[bytes, Tuple[int, int, int]]:
+        try:
+            with open(self.path, "r") as f:
+                raw = json.load(f)
+            return {
+                name.encode("latin-1"): tuple(int(v) for v in mode)
+                for name, mode in raw["originals"].items()
+            }
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            logging.warning(f"original modes file unreadable, ignored: {e}")
+            return {}
+
+    def save(self, originals: Dict[bytes, Tuple[int, int, int]]) -> None:
+        """Raises OSError; reschanger logs it (the registry write goes ahead)."""
+        if not originals:
+            self.path.unlink(missing_ok=True)
+            return
+        data = {
+            "originals": {
+                name.decode("latin-1"): list(mode) for name, mode in originals.items()
+            }
+        }
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
@@ -0,0 +1,162 @@
+"""
+EDID parser. Works on a memoryview of the raw block(s) without copying and
+caches results by a hash of the bytes, so each panel is parsed once.
+"""
+
+import dataclasses
+import hashlib
+from typing import Dict, List, Optional, Tuple
+
+EDID_HEADER = b"\x00\xff\xff\xff\xff\xff\xff\x00"
+BLOCK_SIZE = 128
+DESCRIPTORS_OFFSET = 54
+DESCRIPTOR_SIZE = 18
+
+TAG_SERIAL = 0xFF
+TAG_TEXT = 0xFE
+TAG_RANGE_LIMITS = 0xFD
+TAG_NAME = 0xFC
+EXT_CTA = 0x02
+
+
+class EdidError(ValueError):
+    pass
+
+
+@dataclasses.dataclass(frozen=True)
+class Timing:
+    width: int
+    height: int
+    refresh_rate: float
+    pixel_clock_khz: int
+
+
+@dataclasses.dataclass(frozen=True)
+class EdidInfo:
+    manufacturer: str  # PNP id, e.g. 'LGD'
+    product_code: int
+    serial_number: int
+    name: Optional[str]
+    serial: Optional[str]
+    preferred_timing: Optional[Timing]
+    min_vrefresh: Optional[int]  # Hz, from the range limits descriptor
+    max_vrefresh: Optional[int]
+    timings: Tuple[Timing, ...]  # every detailed timing, base block first
+    extensions: Tuple[int, ...]  # extension block tags, e.g. (0x02,) for CTA-861
+    checksum_ok: bool
+
+    @property
+    def model_code(self) -> str:
+        """Same form as the model part of a monitor DeviceID, e.g. 'LGD0521'."""
+        return f"{self.manufacturer}{self.product_code:04X}"
+
+
+def edid_hash(data) -> str:
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+def _text(desc: memoryview) -> Optional[str]:
+    text = str(desc[5:18], "ascii", errors="replace").split("\n")[0].strip()
+    return text or None
+
+
+def _timing(desc: memoryview) -> Optional[Timing]:
+    clock = desc[0] | desc[1] << 8  # 10 kHz units
+    if clock == 0:
+        return None
+    h_active = desc[2] | (desc[4] & 0xF0) << 4
+    h_blank = desc[3] | (desc[4] & 0x0F) << 8
+    v_active = desc[5] | (desc[7] & 0xF0) << 4
+    v_blank = desc[6] | (desc[7] & 0x0F) << 8
+    total = (h_active + h_blank) * (v_active + v_blank)
+    refresh = clock * 10_000 / total if total else 0.0
+    return Timing(h_active, v_active, round(refresh, 2), clock * 10)
+
+
+def _checksum_ok(block: memoryview) -> bool:
+    return sum(block) % 256 == 0
+
+
+def parse_edid(data) -> EdidInfo:
+    """Parse a base EDID block plus any extension blocks that are present."""
+    mv = memoryview(data).cast("B")
+    if len(mv) < BLOCK_SIZE:
+        raise EdidError(f"EDID too short: {len(mv)} bytes")
+    if mv[:8] != EDID_HEADER:
+        raise EdidError("bad EDID header")
+
+    raw_id = mv[8] << 8 | mv[9]
+    manufacturer = "".join(
+        chr(((raw_id >> shift) & 0x1F) + ord("A") - 1) for shift in (10, 5, 0)
+    )
+    product_code = mv[10] | mv[11] << 8
+    serial_number = int.from_bytes(mv[12:16], "little")
+
+    name = serial = None
+    min_v = max_v = None
+    timings: List[Timing] = []
+    for i in range(4):
+        base = DESCRIPTORS_OFFSET + i * DESCRIPTOR_SIZE
+        desc = mv[base:base + DESCRIPTOR_SIZE]
+        if desc[0] or desc[1]:
+            t = _timing(desc)
+            if t is not None:
+                timings.append(t)
+            continue
+        tag = desc[3]
+        if tag == TAG_NAME:
+            name = _text(desc)
+        elif tag == TAG_SERIAL:
+            serial = _text(desc)
+        elif tag == TAG_RANGE_LIMITS:
+            # EDID 1.4 offset flags: bit 0 -> +255 Hz on min, bit 1 -> on max
+            min_v = desc[5] + (255 if desc[4] & 0x01 else 0)
+            max_v = desc[6] + (255 if desc[4] & 0x02 else 0)
+
+    checksum_ok = _checksum_ok(mv[:BLOCK_SIZE])
+    extensions = []
+    for n in range(1, mv[126] + 1):
+        block = mv[n * BLOCK_SIZE:(n + 1) * BLOCK_SIZE]
+        if len(block) < BLOCK_SIZE:
+            break  # truncated copy, keep what we have
+        extensions.append(block[0])
+        checksum_ok = checksum_ok and _checksum_ok(block)
+        if block[0] == EXT_CTA and block[2] >= 4:
+            offset = block[2]
+            while offset + DESCRIPTOR_SIZE <= BLOCK_SIZE - 1:
+                t = _timing(block[offset:offset + DESCRIPTOR_SIZE])
+                if t is None:
+                    break
+                timings.append(t)
+                offset += DESCRIPTOR_SIZE
+
+    return EdidInfo(
+        manufacturer=manufacturer,
+        product_code=product_code,
+        serial_number=serial_number,
+        name=name,
+        serial=serial,
+        preferred_timing=timings[0] if timings else None,
+        min_vrefresh=min_v,
+        max_vrefresh=max_v,
+        timings=tuple(timings),
+        extensions=tuple(extensions),
+        checksum_ok=checksum_ok,
+    )
+
+
+# edid_hash -> parsed result
+_cache: Dict[str, EdidInfo] = {}
+cache_stats = {"hits": 0, "misses": 0}
+
+
+def parse_cached(data) -> EdidInfo:
+    """parse_edid, memoized by edid_hash(data)."""
+    key = edid_hash(data)
+    info = _cache.get(key)
+    if info is not None:
+        cache_stats["hits"] += 1
+        return info
+    cache_stats["misses"] += 1
+    info = _cache[key] = parse_edid(data)
+    return info
@@ -0,0 +1,186 @@
+"""
+Compact timestamped trace of srr_loop's inputs and outputs, for replaying
+field behaviour with replay.py. Enabled with SRR_TRACE=<path>.
+
+One JSON object per line; "t" is seconds since the trace started and "k" the
+kind of record:
+
+    start     wall-clock time the trace started (for time-of-day rules)
+    power     plugged, percent, secsleft
+    displays  the full display snapshot after a topology change
+    config    hash of the parsed config.json; "body" the first time it is seen
+    command   tray/control/signal action: exit, reload, pause, resume,
+              force (arg: profile) or target (arg: monitor id)
+    switch    adapter, mode, previous mode and whether the driver accepted it
+"""
+
+import dataclasses
+import hashlib
+import json
+import logging
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, TextIO
+
+VERSION = 1
+
+START = "start"
+POWER = "power"
+DISPLAYS = "displays"
+CONFIG = "config"
+COMMAND = "command"
+SWITCH = "switch"
+
+
+def config_hash(raw) -> str:
+    return hashlib.sha1(
+        json.dumps(raw, sort_keys=True, separators=(",", ":")).encode()
+    ).hexdigest()[:16]
+
+
+def adapter_text(adapter_name: bytes) -> str:
+    return adapter_name.decode("latin-1")
+
+
+class TraceRecorder:
+    """Appends records to a line-buffered text stream; never raises."""
+
+    def __init__(self, stream: TextIO, clock: Callable[[], float] = time.monotonic):
+        self._out = stream
+        self._clock = clock
+        self._t0 = clock()
+        self._configs: set = set()
+        self._last_config: Optional[str] = None
+        self.records = 0
+        self.write(START, time=round(time.time(), 3), version=VERSION)
+
+    @classmethod
+    def open(cls, path: str) -> "TraceRecorder":
+        return cls(open(path, "a", encoding="utf-8", buffering=1))
+
+    def close(self) -> None:
+        self._out.close()
+
+    def write(self, kind: str, **fields) -> None:
+        record = {"t": round(self._clock() - self._t0, 3), "k": kind, **fields}
+        try:
+            self._out.write(json.dumps(record, separators=(",", ":")) + "\n")
+        except (OSError, ValueError) as e:  # full disk, closed stream
+            logging.warning(f"trace: dropping {kind} record: {e}")
+            return
+        self.records += 1
+
+    def power(self, status) -> None:
+        self.write(
+            POWER,
+            plugged=status.plugged,
+            percent=status.percent,
+            secsleft=status.secsleft,
+        )
+
+    def displays(self, snapshot) -> None:
+        """`snapshot`: topology.Snapshot, monitor id -> DisplayInfo."""
+        self.write(
+            DISPLAYS,
+            displays=[
+                [d.monitor_id, adapter_text(d.adapter_name), d.monitor_string]
+                for d in snapshot.values()
+            ],
+        )
+
+    def config(self, raw) -> None:
+        digest = config_hash(raw)
+        if digest == self._last_config:
+            return
+        self._last_config = digest
+        if digest in self._configs:
+            self.write(CONFIG, hash=digest)
+        else:
+            self._configs.add(digest)
+            self.write(CONFIG, hash=digest, body=raw)
+
+    def command(self, name: str, arg: Optional[str] = None) -> None:
+        if arg is None:
+            self.write(COMMAND, name=name)
+        else:
+            self.write(COMMAND, name=name, arg=arg)
+
+    def switch(
+        self,
+        adapter_name: bytes,
+        mode: Sequence[int],
+        ok: bool,
+        previous: Optional[Sequence[int]] = None,
+    ) -> None:
+        self.write(
+            SWITCH,
+            adapter=adapter_text(adapter_name),
+            mode=list(mode),
+            previous=list(previous) if previous is not None else None,
+            ok=ok,
+        )
+
+
+def from_env(value: Optional[str]) -> Optional[TraceRecorder]:
+    """SRR_TRACE=<path> appends a trace to that file; unset disables it."""
+    if not value:
+        return None
+    try:
+        recorder = TraceRecorder.open(value)
+    except OSError as e:
+        logging.warning(f"trace: cannot open SRR_TRACE={value!r}: {e}")
+        return None
+    logging.info(f"trace: recording to {value}")
+    return recorder
+
+
+def read(path: str) -> Iterator[dict]:
+    """Records of the last trace in `path` (a file may hold several runs)."""
+    runs: List[List[dict]] = []
+    with open(path, encoding="utf-8") as f:
+        for n, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                logging.warning(f"trace: {path}:{n} is not JSON, skipped")
+                continue
+            if record.get("k") == START or not runs:
+                runs.append([])
+            runs[-1].append(record)
+    return iter(runs[-1] if runs else [])
+
+
+@dataclasses.dataclass
+class SwitchStats:
+    issued: int = 0
+    failed: int = 0
+    redundant: int = 0  # undone within the window, and the switch undoing them
+
+    @classmethod
+    def of(cls, records: Sequence[dict], window: float) -> "SwitchStats":
+        """
+        A switch is redundant when the same display is switched back to the
+        mode it came from within `window` seconds: both switches were wasted.
+        """
+        stats = cls()
+        last: Dict[str, dict] = {}
+        for r in records:
+            if r["k"] != SWITCH:
+                continue
+            stats.issued += 1
+            if not r["ok"]:
+                stats.failed += 1
+                continue
+            prev = last.get(r["adapter"])
+            if (
+                prev is not None
+                and prev["previous"] is not None
+                and r["mode"] == prev["previous"]
+                and r["t"] - prev["t"] <= window
+            ):
+                stats.redundant += 2
+                last.pop(r["adapter"])
+                continue
+            last[r["adapter"]] = r
+        return stats
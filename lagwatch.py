@@ -0,0 +1,199 @@
+"""
+Opt-in event-loop lag watchdog. Measures how late the asyncio loop runs a
+periodic heartbeat and attributes every stall over the threshold to the
+blocking call that caused it, using timing wrappers around instrumented
+functions plus stack samples of the loop thread taken while it is stuck.
+"""
+
+import asyncio
+import collections
+import functools
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Counter, Dict, Iterable, List, Optional
+
+_PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+_THIS_FILE = os.path.abspath(__file__)
+
+
+class _CallStats:
+    __slots__ = ("count", "total", "max", "slow")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.slow = 0
+
+
+class LoopWatchdog:
+    def __init__(
+        self,
+        threshold: float = 0.1,
+        interval: float = 0.05,
+        summary_every: float = 600.0,
+    ):
+        self.threshold = threshold
+        self.interval = interval
+        self.summary_every = summary_every
+
+        self.max_lag = 0.0
+        self.stall_count = 0
+        self.stalls: Counter[str] = collections.Counter()  # culprit -> stalls
+        self.calls: Dict[str, _CallStats] = {}
+
+        self._loop_thread: Optional[int] = None
+        self._heartbeat = time.perf_counter()
+        self._samples: Counter[str] = collections.Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._sampler: Optional[threading.Thread] = None
+
+    # --- instrumentation ----------------------------------------------
+
+    def instrument(self, owner, names: Iterable[str], prefix: str) -> None:
+        """Replace owner.<name> with a timing wrapper for each name."""
+        for name in names:
+            func = getattr(owner, name)
+            setattr(owner, name, self._wrap(func, f"{prefix}.{name}"))
+
+    def _wrap(self, func, label: str):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._record_call(label, args, time.perf_counter() - start)
+
+        return wrapper
+
+    def _record_call(self, label: str, args: tuple, elapsed: float) -> None:
+        with self._lock:
+            stats = self.calls.get(label)
+            if stats is None:
+                stats = self.calls[label] = _CallStats()
+            stats.count += 1
+            stats.total += elapsed
+            stats.max = max(stats.max, elapsed)
+            if elapsed < self.threshold:
+                return
+            stats.slow += 1
+        if threading.get_ident() == self._loop_thread:
+            detail = ", ".join(repr(a) for a in args if isinstance(a, (bytes, str)))
+            logging.warning(
+                f"watchdog: {label}({detail}) blocked the loop for "
+                f"{elapsed * 1000:.0f} ms"
+            )
+
+    # --- lag measurement ----------------------------------------------
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop_thread = threading.get_ident()
+        self._heartbeat = time.perf_counter()
+        self._tasks = [
+            loop.create_task(self._beat()),
+            loop.create_task(self._summaries()),
+        ]
+        self._sampler = threading.Thread(
+            target=self._sample, daemon=True, name="srr-watchdog"
+        )
+        self._sampler.start()
+        logging.info(
+            f"watchdog: enabled, threshold {self.threshold * 1000:.0f} ms, "
+            f"heartbeat {self.interval * 1000:.0f} ms"
+        )
+
+    def stop(self) -> None:
+        self._stop.set()
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        self.log_summary()
+
+    async def _beat(self) -> None:
+        while True:
+            expected = time.perf_counter() + self.interval
+            self._heartbeat = expected
+            await asyncio.sleep(self.interval)
+            lag = time.perf_counter() - expected
+            self._heartbeat = time.perf_counter()
+            if lag >= self.threshold:
+                self._record_stall(lag)
+
+    def _record_stall(self, lag: float) -> None:
+        with self._lock:
+            samples, self._samples = self._samples, collections.Counter()
+        culprit = samples.most_common(1)[0][0] if samples else "unattributed"
+        self.stall_count += 1
+        self.max_lag = max(self.max_lag, lag)
+        self.stalls[culprit] += 1
+        logging.warning(f"watchdog: loop stalled {lag * 1000:.0f} ms in {culprit}")
+
+    def _sample(self) -> None:
+        period = min(self.interval, self.threshold) / 2
+        while not self._stop.wait(period):
+            if time.perf_counter() - self._heartbeat < self.threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            where = _innermost_project_frame(frame)
+            with self._lock:
+                self._samples[where] += 1
+
+    # --- reporting ----------------------------------------------------
+
+    async def _summaries(self) -> None:
+        while True:
+            await asyncio.sleep(self.summary_every)
+            self.log_summary()
+
+    def log_summary(self) -> None:
+        with self._lock:
+            slowest = sorted(self.calls.items(), key=lambda kv: -kv[1].max)[:5]
+            calls = ", ".join(
+                f"{label} n={s.count} avg={s.total / s.count * 1000:.1f}ms "
+                f"max={s.max * 1000:.0f}ms slow={s.slow}"
+                for label, s in slowest
+            )
+        culprits = ", ".join(f"{c} x{n}" for c, n in self.stalls.most_common(5))
+        logging.info(
+            f"watchdog summary: {self.stall_count} stall(s), max lag "
+            f"{self.max_lag * 1000:.0f} ms; culprits: {culprits or 'none'}; "
+            f"calls: {calls or 'none'}"
+        )
+
+
+def _describe(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def _innermost_project_frame(frame) -> str:
+    """The deepest frame in this project (skipping our wrappers), else the top."""
+    top = frame
+    while frame is not None:
+        path = os.path.abspath(frame.f_code.co_filename)
+        if os.path.dirname(path) == _PROJECT_DIR and path != _THIS_FILE:
+            return _describe(frame)
+        frame = frame.f_back
+    return _describe(top)
+
+
+def from_env(value: Optional[str]) -> Optional[LoopWatchdog]:
+    """SRR_WATCHDOG=<threshold ms> enables the watchdog; unset or 0 disables it."""
+    if not value:
+        return None
+    try:
+        threshold_ms = float(value)
+    except ValueError:
+        logging.warning(f"watchdog: ignoring invalid SRR_WATCHDOG={value!r}")
+        return None
+    if threshold_ms <= 0:
+        return None
+    return LoopWatchdog(threshold=threshold_ms / 1000)
@@ -0,0 +1,204 @@
+"""
+Logging pipeline for logs.txt. Records are only queued on the calling thread
+(usually the event loop); a background QueueListener thread formats them and
+does the file I/O, including rotation. Identical messages repeated more than
+RATE_BURST times within RATE_WINDOW seconds are dropped and later collapsed
+into one "suppressed N times" line. SRR_LOG_FORMAT=json writes JSON lines
+instead of plain text.
+"""
+
+import datetime
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+RATE_BURST = 5  # identical records let through per window
+RATE_WINDOW = 60.0  # seconds
+MAX_KEYS = 1024  # distinct messages tracked at once
+
+_Key = Tuple[str, int, str]
+
+
+class _Bucket:
+    __slots__ = ("start", "count", "suppressed", "last")
+
+    def __init__(self, start: float):
+        self.start = start
+        self.count = 0
+        self.suppressed = 0
+        self.last: Optional[logging.LogRecord] = None
+
+
+class RateLimiter:
+    """
+    Per-message-key limiter. The key is (logger, level, message text), so a
+    failure that keeps repeating the same text is limited while other messages
+    from the same call site are not.
+    """
+
+    def __init__(
+        self,
+        burst: int = RATE_BURST,
+        window: float = RATE_WINDOW,
+        clock=time.monotonic,
+    ):
+        self.burst = burst
+        self.window = window
+        self._clock = clock
+        self._buckets: Dict[_Key, _Bucket] = {}
+        self._next_sweep = clock() + window
+        self._lock = threading.Lock()
+        self.suppressed = 0
+
+    def admit(self, record: logging.LogRecord) -> List[logging.LogRecord]:
+        """Records to pass on for `record`: summaries of expired keys, then it."""
+        key = (record.name, record.levelno, record.getMessage())
+        now = self._clock()
+        with self._lock:
+            out = self._sweep(now) if now >= self._next_sweep else []
+            bucket = self._buckets.get(key)
+            if bucket is not None and now - bucket.start >= self.window:
+                out.extend(self._close(key, bucket))
+                bucket = None
+            if bucket is None:
+                if len(self._buckets) >= MAX_KEYS:  # full: retire the oldest key
+                    oldest = next(iter(self._buckets))
+                    out.extend(self._close(oldest, self._buckets[oldest]))
+                bucket = self._buckets[key] = _Bucket(now)
+            bucket.count += 1
+            if bucket.count <= self.burst:
+                out.append(record)
+            else:
+                bucket.suppressed += 1
+                bucket.last = record
+                self.suppressed += 1
+        return out
+
+    def flush(self) -> List[logging.LogRecord]:
+        """Summaries for every key with suppressed records (e.g. at exit)."""
+        with self._lock:
+            out: List[logging.LogRecord] = []
+            for key, bucket in list(self._buckets.items()):
+                out.extend(self._close(key, bucket))
+            return out
+
+    def _sweep(self, now: float) -> List[logging.LogRecord]:
+        self._next_sweep = now + self.window
+        out: List[logging.LogRecord] = []
+        for key, bucket in list(self._buckets.items()):
+            if now - bucket.start >= self.window:
+                out.extend(self._close(key, bucket))
+        return out
+
+    def _close(self, key: _Key, bucket: _Bucket) -> List[logging.LogRecord]:
+        del self._buckets[key]
+        if not bucket.suppressed or bucket.last is None:
+            return []
+        summary = logging.makeLogRecord(bucket.last.__dict__)
+        summary.msg = (
+            f"{key[2]} (suppressed {bucket.suppressed} times "
+            f"in {self.window:.0f} s)"
+        )
+        summary.args = None
+        summary.exc_info = None
+        summary.exc_text = None
+        summary.suppressed = bucket.suppressed
+        return [summary]
+
+
+class RateLimitedQueueHandler(logging.handlers.QueueHandler):
+    """Runs the limiter on the calling thread, then only enqueues."""
+
+    def __init__(self, q: "queue.SimpleQueue", limiter: RateLimiter):
+        super().__init__(q)
+        self.limiter = limiter
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            for r in self.limiter.admit(record):
+                self.enqueue(self.prepare(r))
+        except Exception:
+            self.handleError(record)
+
+    def flush(self) -> None:
+        for r in self.limiter.flush():
+            self.enqueue(self.prepare(r))
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per record: ts, level, logger, thread, msg[, suppressed].
+    QueueHandler.prepare has already merged any traceback into msg.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created)
+            .astimezone()
+            .isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        suppressed = getattr(record, "suppressed", None)
+        if suppressed:
+            entry["suppressed"] = suppressed
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class LogPipeline:
+    """The installed handler and its writer thread; stop() drains both."""
+
+    def __init__(
+        self,
+        handler: RateLimitedQueueHandler,
+        listener: logging.handlers.QueueListener,
+    ):
+        self.handler = handler
+        self.listener = listener
+
+    def stop(self) -> None:
+        self.handler.flush()
+        self.listener.stop()
+        for h in self.listener.handlers:
+            h.close()
+        logging.getLogger().removeHandler(self.handler)
+
+
+def setup(
+    path,
+    fmt: Optional[str] = None,
+    level: int = logging.INFO,
+    max_bytes: int = 1_000_000,
+    backup_count: int = 3,
+) -> LogPipeline:
+    """
+    Route the root logger through the queue to a rotating file at `path`.
+    `fmt` is "text" (default) or "json", as given by SRR_LOG_FORMAT.
+    """
+    json_lines = (fmt or "text").lower() == "json"
+    file_handler = logging.handlers.RotatingFileHandler(
+        path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+    )
+    file_handler.setFormatter(
+        JsonFormatter() if json_lines else logging.Formatter(TEXT_FORMAT)
+    )
+    q: "queue.SimpleQueue" = queue.SimpleQueue()
+    handler = RateLimitedQueueHandler(q, RateLimiter())
+    listener = logging.handlers.QueueListener(
+        q, file_handler, respect_handler_level=True
+    )
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(handler)
+    listener.start()
+    if not json_lines and (fmt or "text").lower() != "text":
+        logging.warning(f"logging: ignoring invalid SRR_LOG_FORMAT={fmt!r}")
+    return LogPipeline(handler, listener)
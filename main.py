@@ -1,36 +1,81 @@
+import argparse
 import asyncio
 import ctypes
 import dataclasses
 import json
 import logging
-import logging.handlers
 import os
 import shutil
+import signal
 import sys
+import time
 from pathlib import Path
-from typing import Dict, Iterator, Optional, Tuple
-
-import psutil
-from winotify import Notification
-
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Collection,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+import asyncdisplay
 import autostart
+import confwatch
+import displaycache
+import edid
+import policy
+import power
+import reconcile
 import reschanger
+import retry
+import scheduler
+import topology
+import transition
+import winmsg
 from reschanger import DISP_RESULTS
-from tray import TrayController
+
+if TYPE_CHECKING:
+    # imported where first used, to keep them off the `import main` path
+    import control
+    import eventtrace
+    import lagwatch
+    import logpipe
+    import telemetry
+    from tray import TrayController
 
 # constants
-TIME_STEP = 5  # seconds
-CONFIG_RELOAD_EVERY = 6  # iterations -> ~30 s
+# polling fallbacks where no OS notification exists (seconds); each backs off
+# on its own while nothing changes, see scheduler.py
+POWER_POLL_INTERVAL = 5
+# an unplug noticed late runs the panel at full rate on battery: do not back off
+POWER_POLL_MAX_INTERVAL = 5
+TOPOLOGY_POLL_INTERVAL = 30
+CONFIG_POLL_INTERVAL = 30
+CONFIG_DEBOUNCE = 0.2  # seconds of quiet before a changed config.json is parsed
+TELEMETRY_SAVE_EVERY = 32  # samples between writes of telemetry.bin
+# WM_QUERYENDSESSION must be answered within Windows' hung-app timeout (5 s)
+SESSION_END_RESTORE_TIMEOUT = 4.0
 
 PROJECT_NAME = "SRR"
 PROJECT_EXECUTABLE = PROJECT_NAME + ".exe"
 
-PATH_APPDATA_LOCAL = Path(os.environ["LOCALAPPDATA"]).resolve()
+# LOCALAPPDATA only exists on Windows; elsewhere (simulated backend runs) use ~
+PATH_APPDATA_LOCAL = Path(os.environ.get("LOCALAPPDATA", Path.home())).resolve()
 PATH_TO_PROGRAM = PATH_APPDATA_LOCAL / PROJECT_NAME
 PATH_CURRENT_FILE = Path(sys.argv[0]).resolve()
 PATH_BASE_DIR = PATH_CURRENT_FILE.parent
 PATH_CONFIG = PATH_TO_PROGRAM / "config.json"
 PATH_LOG = PATH_TO_PROGRAM / "logs.txt"
+PATH_DISPLAY_CACHE = PATH_TO_PROGRAM / "display_cache.json"
+# registry modes SRR overwrote; left behind only by a run that did not exit
+PATH_ORIGINAL_MODES = PATH_TO_PROGRAM / "original_modes.json"
+PATH_TELEMETRY = PATH_TO_PROGRAM / "telemetry.bin"
+# one command per line (exit, reload, pause, resume); consumed and deleted
+PATH_CONTROL = PATH_TO_PROGRAM / "control"
 
 
 def _resource_path(rel: str) -> Path:
@@ -43,11 +88,58 @@ PATH_ICON = _resource_path("assets/icon.png")
 # runtime state
 _shutdown_event: Optional[asyncio.Event] = None
 _reload_event: Optional[asyncio.Event] = None
-_tray: Optional[TrayController] = None
-
-config_last_state: Optional[Dict[str, Tuple["ScreenSettings", "ScreenSettings"]]] = None
+_wake_event: Optional[asyncio.Event] = None
+_tray: Optional["TrayController"] = None
+_power: Optional[power.PowerSource] = None
+_topology: Optional[topology.TopologySource] = None
+_display_events: List[topology.DisplayEvent] = []
+_config_watcher: Optional[confwatch.DirectoryWatcher] = None
+_config_changed = False
+_watchdog: Optional["lagwatch.LoopWatchdog"] = None
+_display_io = asyncdisplay.AsyncDisplay()
+_observed = reconcile.ObservedModes(_display_io)
+_power_filter: Optional[transition.TransitionFilter] = None
+_telemetry: Optional["telemetry.TelemetryRing"] = None
+_paused = False
+# control command name -> action, filled in by srr()
+_commands: Dict[str, Callable[[], None]] = {}
+# profile forced over the rules from the control channel (None: rules decide)
+_forced: Optional[str] = None
+# srr_loop's managed-display setter, for the control channel
+_select_target: Optional[Callable[[Optional[str]], None]] = None
+_control_server: Optional["control.ControlServer"] = None
+_scheduler: Optional[scheduler.Scheduler] = None
+_loop_wakeups = 0
+_started = time.monotonic()
+# SRR_TRACE input/output recorder for replay.py
+_trace: Optional["eventtrace.TraceRecorder"] = None
+# wall clock for time-of-day rules; replay.py substitutes virtual time
+_wall_clock: Callable[[], float] = time.time
+
+# blocking entry points timed by the lag watchdog (SRR_WATCHDOG=<threshold ms>)
+_WATCHED_RESCHANGER_CALLS = (
+    "get_active_displays",
+    "get_display_settings",
+    "enum_display_modes",
+    "set_resolution",
+    "set_display_defaults",
+    "get_monitor_friendly_name",
+)
+
+# monitor id -> {profile: settings}; every monitor has performance and powersave
+Config = Dict[str, Dict[str, "ScreenSettings"]]
+
+config_last_state: Optional[Config] = None
 config_last_update = None
 config_last_target: Optional[str] = None
+config_last_filter = transition.FilterSettings()
+config_last_policy = policy.Policy()
+
+# seeded from display_cache.json at startup
+_friendly_names: Dict[str, Optional[str]] = {}
+_registry_modes: Dict[str, Tuple[int, int, int]] = {}
+# adapters whose mode table came from display_cache.json, not the driver
+_disk_tables: Set[bytes] = set()
 
 
 @dataclasses.dataclass
@@ -74,32 +166,120 @@ def write_logs(e: BaseException, show_dialog: bool = True):
             pass
 
 
+def _notify(message: str) -> None:
+    """User-facing notice: a tray balloon when there is a tray, always the log."""
+    logging.info(f"notify: {message}")
+    if _tray is not None:
+        _tray.notify(message)
+
+
+def set_paused(paused: bool) -> None:
+    global _paused
+    if paused == _paused:
+        return
+    _paused = paused
+    logging.info(f"paused={paused}")
+    if _trace is not None:
+        _trace.command("pause" if paused else "resume")
+    if _tray is not None:
+        _tray.set_paused(paused)
+    if _wake_event is not None:
+        _wake_event.set()
+
+
+def run_command(name: str) -> bool:
+    """Run a control command on the loop thread; False if it is unknown."""
+    action = _commands.get(name)
+    if action is None:
+        logging.warning(f"unknown control command {name!r}")
+        return False
+    logging.info(f"control: {name}")
+    action()
+    return True
+
+
+def _read_control_file() -> List[str]:
+    try:
+        text = PATH_CONTROL.read_text(encoding="utf-8")
+        PATH_CONTROL.unlink()
+    except FileNotFoundError:
+        return []
+    except OSError as e:
+        logging.warning(f"control file unreadable: {e}")
+        return []
+    return [line.strip().lower() for line in text.splitlines() if line.strip()]
+
+
 def cur_power_state() -> Optional[bool]:
     """Returns True if AC, False if on battery, None if no battery info."""
-    try:
-        bat = psutil.sensors_battery()
-    except Exception as e:
-        logging.warning(f"sensors_battery failed: {e}")
-        return None
-    if bat is None:
-        return None
-    return bool(bat.power_plugged)
+    if _power is not None:
+        return _power.current().plugged
+    return power.read_battery().plugged
 
 
 def build_display_map() -> Dict[str, bytes]:
     """Returns {monitor_id: adapter_name} for all currently active displays."""
+    if _topology is not None:
+        return {mid: d.adapter_name for mid, d in _topology.current().items()}
     return {
         d["monitor_id"]: d["adapter_name"] for d in reschanger.get_active_displays()
     }
 
 
-_CONFIG_RESERVED_KEYS = {"target_display"}
+_CONFIG_RESERVED_KEYS = {"target_display", "power_filter", "rules"}
+_SCREEN_SETTINGS_KEYS = tuple(f.name for f in dataclasses.fields(ScreenSettings))
+
+
+def _parse_screen_settings(monitor_id: str, state_name: str, raw) -> ScreenSettings:
+    where = f"{monitor_id!r} {state_name}"
+    if not isinstance(raw, dict):
+        raise ValueError(f"{where}: expected an object, got {type(raw).__name__}")
+    unknown = sorted(set(raw) - set(_SCREEN_SETTINGS_KEYS))
+    if unknown:
+        raise ValueError(f"{where}: unknown key(s) {', '.join(unknown)}")
+    for key in _SCREEN_SETTINGS_KEYS:
+        if key not in raw:
+            raise ValueError(f"{where}: missing {key}")
+        value = raw[key]
+        if not isinstance(value, int) or isinstance(value, bool) or value <= 0:
+            raise ValueError(
+                f"{where}.{key}: expected a positive integer, got {value!r}"
+            )
+    return ScreenSettings(**raw)
+
+
+def _parse_config_entry(monitor_id: str, entry) -> Dict[str, ScreenSettings]:
+    """{profile: settings} from the "<profile>-state" keys of one monitor."""
+    if not isinstance(entry, dict):
+        raise ValueError(f"{monitor_id!r}: expected an object")
+    suffix = policy.PROFILE_SUFFIX
+    profiles = {}
+    for key, raw in entry.items():
+        if not key.endswith(suffix) or key == suffix:
+            raise ValueError(f"{monitor_id!r}: unknown key {key}")
+        profiles[key[: -len(suffix)]] = _parse_screen_settings(monitor_id, key, raw)
+    for name in policy.BASE_PROFILES:
+        if name not in profiles:
+            raise ValueError(f"{monitor_id!r}: missing {name}{suffix}")
+    return profiles
+
+
+def _parse_rules(raw, config: Config) -> policy.Policy:
+    rules = policy.Policy.from_config(raw)
+    defined = {p for profiles in config.values() for p in profiles}
+    defined.update(policy.BASE_PROFILES)
+    for i, rule in enumerate(rules.rules):
+        if rule.profile not in defined:
+            raise ValueError(
+                f"rules[{i}].profile: no display defines "
+                f"{rule.profile}{policy.PROFILE_SUFFIX}"
+            )
+    return rules
 
 
-async def load_config(
-    force: bool = False,
-) -> Optional[Dict[str, Tuple[ScreenSettings, ScreenSettings]]]:
+async def load_config(force: bool = False) -> Optional[Config]:
     global config_last_state, config_last_update, config_last_target
+    global config_last_filter, config_last_policy
     try:
         update_time = os.path.getmtime(PATH_CONFIG)
     except OSError as e:
@@ -113,22 +293,27 @@ async def load_config(
         with open(PATH_CONFIG, "r") as f:
             raw = json.load(f)
 
-        result: Dict[str, Tuple[ScreenSettings, ScreenSettings]] = {}
+        result: Config = {}
         for monitor_id, entry in raw.items():
             if monitor_id in _CONFIG_RESERVED_KEYS:
                 continue
-            perf = ScreenSettings(**entry["performance-state"])
-            psav = ScreenSettings(**entry["powersave-state"])
-            result[monitor_id] = (perf, psav)
-    except (json.JSONDecodeError, KeyError, TypeError) as e:
+            result[monitor_id] = _parse_config_entry(monitor_id, entry)
+        filter_settings = transition.FilterSettings.from_config(
+            raw.get("power_filter", {})
+        )
+        rules = _parse_rules(raw.get("rules"), result)
+    except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
         logging.error(f"config parse failed, keeping previous: {e}")
-        if _tray is not None:
-            _tray.notify("config.json is invalid — keeping previous settings.")
+        _notify(f"config.json is invalid ({e}) — keeping previous settings.")
         return config_last_state
 
     config_last_update = update_time
     config_last_state = result
     config_last_target = raw.get("target_display", None)
+    config_last_filter = filter_settings
+    config_last_policy = rules
+    if _trace is not None:
+        _trace.config(raw)
     return config_last_state
 
 
@@ -147,44 +332,227 @@ def save_target_display(mid: Optional[str]) -> None:
         logging.warning(f"failed to save target_display: {e}")
 
 
-async def change_screen_settings(ss: ScreenSettings, adapter_name: bytes) -> None:
-    logging.info(f"Changing {adapter_name!r} to {ss}")
-    res = reschanger.set_resolution(*ss, adapter_name=adapter_name)
+async def change_screen_settings(changes: List[Tuple[ScreenSettings, bytes]]) -> None:
+    """
+    Stage every (settings, adapter) change and apply them in one commit.
+    Modes come from a SwitchPlan, so they are known to be supported.
+    Driver calls run off the event loop, concurrently per adapter.
+    """
+    for ss, adapter_name in changes:
+        _retries.cancel(adapter_name)  # a newer target supersedes a pending retry
+        logging.info(f"Changing {adapter_name!r} to {ss}")
+
+    previous = {}
+    if _trace is not None:  # cached by the diff that produced `changes`
+        previous = await _observed.read(a for _, a in changes)
+    res, failed, results = await _display_io.commit_modes(changes)
+    for ss, adapter_name in changes:
+        # a BADPARAM stage is neither applied nor in `failed`: not observed
+        ok = results[adapter_name] == DISP_RESULTS.DISP_CHANGE_SUCCESSFUL
+        if ok:
+            _observed.record(adapter_name, ss)
+        elif adapter_name not in failed:
+            logging.warning(f"{adapter_name!r} does not support {ss}; skipped")
+        if _trace is not None:
+            _trace.switch(adapter_name, ss, ok, previous.get(adapter_name))
+    if failed:
+        logging.warning(
+            f"mode commit returned {res}; retrying {failed!r} in the background"
+        )
+        targets = {adapter_name: ss for ss, adapter_name in changes}
+        for adapter_name in failed:
+            _retries.schedule(adapter_name, targets[adapter_name])
 
-    if res == DISP_RESULTS.DISP_CHANGE_BADPARAM:
-        msg = f"Unsupported display mode in config.json for {adapter_name!r}."
-        logging.error(msg)
-        if _tray is not None:
-            _tray.notify(msg)
-        return
 
-    if res != DISP_RESULTS.DISP_CHANGE_SUCCESSFUL:
-        logging.warning(
-            f"set_resolution returned {res} for {adapter_name!r}; retrying after 10s"
+async def _retry_mode(adapter_name: bytes, ss: ScreenSettings) -> bool:
+    logging.info(f"Retrying {adapter_name!r} -> {ss}")
+    _, _, results = await _display_io.commit_modes([(ss, adapter_name)])
+    ok = results[adapter_name] == DISP_RESULTS.DISP_CHANGE_SUCCESSFUL
+    if ok:
+        _observed.record(adapter_name, ss)
+    if _trace is not None:
+        _trace.switch(adapter_name, ss, ok)
+    return ok
+
+
+_retries = retry.RetryScheduler(_retry_mode)
+
+
+async def build_plan(
+    config: Optional[Config],
+    display_map: Dict[str, bytes],
+    target: Optional[str] = None,
+) -> reconcile.SwitchPlan:
+    """Compile the switch plan, reporting modes the displays do not support."""
+    if config is None:
+        return reconcile.EMPTY_PLAN
+    plan, errors = await reconcile.compile_plan(
+        _display_io, config, display_map, target
+    )
+    stale = _disk_tables.intersection(display_map.values())
+    if errors and stale:
+        # the tables from display_cache.json may predate a new custom mode
+        logging.info(f"re-probing cached mode tables of {sorted(stale)!r}")
+        await _display_io.call(None, _refresh_display_cache, stale)
+        plan, errors = await reconcile.compile_plan(
+            _display_io, config, display_map, target
         )
-        await asyncio.sleep(10)
-        reschanger.set_resolution(*ss, adapter_name=adapter_name)
+    for msg in errors:
+        logging.error(f"config.json: {msg}")
+    if errors:
+        _notify("Unsupported display mode in config.json:\n" + "\n".join(errors))
+    return plan
 
 
 async def switch_rate(
-    current_state: Optional[bool],
-    config: Dict[str, Tuple[ScreenSettings, ScreenSettings]],
-    display_map: Dict[str, bytes],
+    decision: Optional[policy.Decision],
+    plan: reconcile.SwitchPlan,
+    only: Optional[Collection[bytes]] = None,
 ) -> None:
-    if current_state is None:
+    """Switch only the displays whose current mode differs from the plan's."""
+    if decision is None:
         return
-    for monitor_id, (perf, powersave) in config.items():
-        adapter_name = display_map.get(monitor_id)
-        if adapter_name is None:
-            logging.debug(f"monitor {monitor_id!r} not active, skipping")
-            continue
-        await change_screen_settings(perf if current_state else powersave, adapter_name)
+    desired = plan.modes(decision)
+    if only is not None:
+        desired = {a: ss for a, ss in desired.items() if a in only}
+    changes = await _observed.diff(desired)
+    changed = {adapter_name for _, adapter_name in changes}
+    for adapter_name in desired:
+        if adapter_name not in changed:
+            _retries.cancel(adapter_name)  # already in the desired mode
+    if changes:
+        await change_screen_settings(changes)
+
+
+def decide(plugged: Optional[bool]) -> Optional[policy.Decision]:
+    """Profile the rules pick for the given AC state and the current battery/time."""
+    if _forced is not None:
+        return _forced, plugged if plugged is not None else True
+    if plugged is None:
+        return None
+    status = _power.current() if _power is not None else power.read_battery()
+    inputs = policy.Inputs(
+        plugged, status.percent, status.secsleft, policy.local_minute(_wall_clock())
+    )
+    return config_last_policy.select(inputs), plugged
+
+
+async def record_telemetry(
+    status: power.PowerStatus, display_map: Dict[str, bytes]
+) -> None:
+    """One sample per active display with the mode it is in right now."""
+    if _telemetry is None or status.plugged is None or status.percent is None:
+        return
+    modes = await _observed.read(display_map.values())
+    now = time.time()
+    for mid, adapter_name in display_map.items():
+        mode = modes.get(adapter_name)
+        if mode is not None:
+            _telemetry.append(
+                now, status.percent, status.secsleft, status.plugged, mid, mode
+            )
+    if _telemetry.unsaved >= TELEMETRY_SAVE_EVERY:
+        _telemetry.save()
+
+
+def log_telemetry_summary() -> None:
+    if _telemetry is None:
+        return
+    import telemetry
+    names = {
+        telemetry.display_key(mid): _friendly_names.get(mid) or mid
+        for mid in (config_last_state or {})
+    }
+    for line in telemetry.format_summary(
+        telemetry.drain_rates(_telemetry.samples()), names
+    ):
+        logging.info(f"drain: {line}")
 
 
-def _state_label(state: Optional[bool]) -> str:
-    if state is None:
+def _state_label(decision: Optional[policy.Decision]) -> str:
+    if decision is None:
         return "no battery info"
-    return "AC (performance)" if state else "Battery (powersave)"
+    profile, plugged = decision
+    if _forced is not None:
+        return f"{profile} (forced)"
+    if profile == policy.base_profile(plugged):
+        return "AC (performance)" if plugged else "Battery (powersave)"
+    return f"{'AC' if plugged else 'Battery'} ({profile})"
+
+
+def set_forced(profile: Optional[str]) -> None:
+    global _forced
+    _forced = profile
+    logging.info(f"forced profile: {profile}")
+    if _trace is not None:
+        _trace.command("force", profile)
+    if _wake_event is not None:
+        _wake_event.set()
+
+
+def wakeup_stats() -> Dict[str, float]:
+    """Loop and polling-timer wakeups per hour since start, i.e. the idle cost."""
+    hours = max(time.monotonic() - _started, 1e-9) / 3600
+    timers = _scheduler.wakeups if _scheduler is not None else 0
+    return {
+        "loop_per_hour": round(_loop_wakeups / hours, 1),
+        "timers_per_hour": round(timers / hours, 1),
+    }
+
+
+async def control_status() -> dict:
+    display_map = build_display_map()
+    modes = await _observed.read(display_map.values())
+    status = _power.current() if _power is not None else power.read_battery()
+    decision = decide(_power_filter.committed if _power_filter is not None else None)
+    return {
+        "state": _state_label(decision),
+        "profile": decision[0] if decision is not None else None,
+        "forced": _forced,
+        "paused": _paused,
+        "power": dataclasses.asdict(status),
+        "target": config_last_target,
+        "displays": {
+            mid: {
+                "adapter": adapter.decode("ascii", errors="replace"),
+                "mode": list(modes[adapter]) if adapter in modes else None,
+            }
+            for mid, adapter in display_map.items()
+        },
+        "pending_retries": len(_retries.pending()),
+        "wakeups": wakeup_stats(),
+        "polling": _scheduler.stats["jobs"] if _scheduler is not None else {},
+    }
+
+
+async def handle_control(request: dict) -> dict:
+    """Serve one control-channel request (see control.py for the protocol)."""
+    cmd = request["cmd"]
+    if cmd == "status":
+        return {"ok": True, **await control_status()}
+    if cmd == "force":
+        profile = request.get("profile")
+        if profile == "auto":
+            profile = None
+        known = set(policy.BASE_PROFILES)
+        for profiles in (config_last_state or {}).values():
+            known.update(profiles)
+        if profile is not None and profile not in known:
+            return {"ok": False, "error": f"unknown profile {profile!r}"}
+        set_forced(profile)
+        return {"ok": True, "forced": profile}
+    if cmd == "target":
+        mid = request.get("display")
+        if mid is not None and mid not in build_display_map():
+            return {"ok": False, "error": f"display {mid!r} is not active"}
+        if _select_target is None:
+            return {"ok": False, "error": "not running"}
+        _select_target(mid)
+        return {"ok": True, "target": mid}
+    if cmd in _commands:
+        run_command(cmd)
+        return {"ok": True}
+    return {"ok": False, "error": f"unknown command {cmd!r}"}
 
 
 _MANUFACTURER_CODES: Dict[str, str] = {
@@ -202,6 +570,12 @@ def _format_model_code(model_code: str) -> str:
     return f"{manufacturer} {suffix}" if suffix else manufacturer
 
 
+def _friendly_name(monitor_id: str) -> Optional[str]:
+    if monitor_id not in _friendly_names:
+        _friendly_names[monitor_id] = reschanger.get_monitor_friendly_name(monitor_id)
+    return _friendly_names[monitor_id]
+
+
 def _format_display_name(
     adapter_name: bytes, monitor_id: str, monitor_string: str
 ) -> str:
@@ -211,7 +585,7 @@ def _format_display_name(
     parts = [p for p in monitor_id.split("\\") if p]
     model_code = parts[1] if len(parts) >= 2 else ""
     name = (
-        reschanger.get_monitor_friendly_name(monitor_id)
+        _friendly_name(monitor_id)
         or (_format_model_code(model_code) if model_code else None)
         or monitor_string.strip()
         or "Unknown display"
@@ -220,107 +594,214 @@ def _format_display_name(
 
 
 async def srr_loop() -> None:
+    global _config_changed, _power_filter, _select_target, _loop_wakeups
     assert _shutdown_event is not None
     assert _reload_event is not None
+    assert _wake_event is not None
 
-    last_state = cur_power_state()
     current_config = await load_config()
     display_map = build_display_map()
+    # displays follow the filtered (committed) state, not every raw edge
+    power_filter = _power_filter = transition.TransitionFilter(
+        config_last_filter, cur_power_state()
+    )
+    filter_timer: Optional[asyncio.TimerHandle] = None
+    # profile chosen by the rules for the committed AC state; time-of-day rules
+    # re-evaluate from a timer at the next window edge, never on a poll
+    decision = decide(power_filter.committed)
+    policy_timer: Optional[asyncio.TimerHandle] = None
+    # discharge is sampled on every battery status change, and once on plug-in
+    sampled: Optional[power.PowerStatus] = None
+    # switches deferred while paused, made on resume
+    held: Set[str] = set()
+    resync = False
 
     if _tray is not None:
-        _tray.set_state_text(_state_label(last_state))
-    counter = 0
+        _tray.set_state_text(_state_label(decision))
 
     loop = asyncio.get_running_loop()
     managed_display_id: Optional[str] = config_last_target
+    # compiled lazily; dropped whenever config, display map or target changes
+    plan: Optional[reconcile.SwitchPlan] = None
 
     def _set_managed_display(mid: Optional[str]) -> None:
-        nonlocal managed_display_id
+        nonlocal managed_display_id, plan
         managed_display_id = mid
+        plan = None
         logging.info(f"tray: managed display set to {mid!r}")
+        if _trace is not None:
+            _trace.command("target", mid)
         save_target_display(mid)
 
-    def _refresh_tray_displays() -> None:
+    tray_entries: Dict[str, dict] = {}
+
+    def _refresh_tray_displays(
+        events: Optional[List[topology.DisplayEvent]] = None,
+    ) -> None:
+        """Formats names only for displays in `events` (all of them if None)."""
         if _tray is None:
             return
-        displays = [
-            {
-                "id": d["monitor_id"],
+        snapshot = _topology.current() if _topology is not None else {}
+        if events is None:
+            tray_entries.clear()
+            changed = list(snapshot.values())
+        else:
+            for ev in events:
+                tray_entries.pop(ev.display.monitor_id, None)
+            changed = [ev.display for ev in events if ev.kind != topology.REMOVED]
+        for d in changed:
+            tray_entries[d.monitor_id] = {
+                "id": d.monitor_id,
                 "name": _format_display_name(
-                    d["adapter_name"], d["monitor_id"], d["monitor_string"]
+                    d.adapter_name, d.monitor_id, d.monitor_string
                 ),
             }
-            for d in reschanger.get_active_displays()
-        ]
         _tray.set_displays(
-            displays,
+            [tray_entries[mid] for mid in snapshot if mid in tray_entries],
             managed_display_id,
             lambda mid: loop.call_soon_threadsafe(_set_managed_display, mid),
         )
 
-    def _target_modes(state: bool) -> Dict[str, ScreenSettings]:
-        if current_config is None:
-            return {}
-        return {
-            mid: (perf if state else psav)
-            for mid, (perf, psav) in current_config.items()
-            if display_map.get(mid) is not None
-            and (managed_display_id is None or mid == managed_display_id)
-        }
-
-    async def _do_switch(state: bool) -> None:
-        assert current_config is not None
-        targets = _target_modes(state)
-        filtered_map = {mid: display_map[mid] for mid in targets if mid in display_map}
-        await switch_rate(state, current_config, filtered_map)
-
+    def _apply_display_events(events: List[topology.DisplayEvent]) -> List[str]:
+        """Updates display_map in place; returns ids of added/changed monitors."""
+        nonlocal plan
+        plan = None
+        stale = set()
+        touched = []
+        for ev in events:
+            logging.info(f"display {ev.kind}: {ev.display}")
+            if ev.previous is not None:
+                stale.add(ev.previous.adapter_name)
+            stale.add(ev.display.adapter_name)
+            _friendly_names.pop(ev.display.monitor_id, None)
+            if ev.kind == topology.REMOVED:
+                display_map.pop(ev.display.monitor_id, None)
+                _retries.cancel(ev.display.adapter_name)
+            else:
+                display_map[ev.display.monitor_id] = ev.display.adapter_name
+                touched.append(ev.display.monitor_id)
+        reschanger.invalidate_mode_cache(stale)
+        _refresh_tray_displays(events)
+        return touched
+
+    async def _do_switch(
+        decision: policy.Decision, only: Optional[List[str]] = None
+    ) -> None:
+        nonlocal plan
+        if plan is None:
+            plan = await build_plan(current_config, display_map, managed_display_id)
+        adapters = None
+        if only is not None:
+            adapters = {display_map[mid] for mid in only if mid in display_map}
+        await switch_rate(decision, plan, adapters)
+
+    def _arm_policy_timer() -> None:
+        nonlocal policy_timer
+        if policy_timer is not None:
+            policy_timer.cancel()
+            policy_timer = None
+        delay = config_last_policy.seconds_to_boundary(_wall_clock())
+        if delay is not None:
+            policy_timer = loop.call_later(delay, _wake_event.set)
+
+    def _select(mid: Optional[str]) -> None:
+        _set_managed_display(mid)
+        _refresh_tray_displays()
+
+    _select_target = _select
     _refresh_tray_displays()
+    _arm_policy_timer()
 
     while not _shutdown_event.is_set():
-        try:
-            await asyncio.wait_for(_shutdown_event.wait(), timeout=TIME_STEP)
+        # woken by power, display and config changes or tray actions
+        await _wake_event.wait()
+        _wake_event.clear()
+        _loop_wakeups += 1
+        _observed.new_tick()
+        if _shutdown_event.is_set():
             break
-        except asyncio.TimeoutError:
-            pass
+
+        if _display_events:
+            events = list(_display_events)
+            _display_events.clear()
+            touched = _apply_display_events(events)
+            if _paused:
+                held.update(touched)
+            elif touched and current_config is not None and decision is not None:
+                await _do_switch(decision, only=touched)
 
         if _reload_event.is_set():
             _reload_event.clear()
             current_config = await load_config(force=True)
-            display_map = build_display_map()
-            _refresh_tray_displays()
-            if current_config is not None:
-                state = cur_power_state()
-                if state is not None:
-                    await _do_switch(state)
-
-        if _tray is not None and _tray.paused:
+            plan = None
+            await _display_io.call(None, _refresh_display_cache)
+            power_filter.settings = config_last_filter
+            if _topology is not None:
+                # changes arrive as events on the next wake
+                await _topology.rescan_async()
+            decision = decide(power_filter.committed)
+            if _paused:
+                resync = True
+            elif current_config is not None and decision is not None:
+                await _do_switch(decision)
+
+        if _paused:  # display and reload bookkeeping above still ran
+            # displays with a failed switch are switched again on resume
+            retrying = set(_retries.pending())
+            held.update(mid for mid, a in display_map.items() if a in retrying)
+            _retries.cancel_all()
             continue
 
-        current_state = cur_power_state()
+        if (resync or held) and current_config is not None and decision is not None:
+            # switches skipped while paused: a reload, or displays plugged in
+            await _do_switch(decision, only=None if resync else list(held))
+        resync = False
+        held.clear()
 
-        if counter >= CONFIG_RELOAD_EVERY:
-            counter = 0
+        if _config_changed:
+            _config_changed = False
             new_config = await load_config()
-            display_map = build_display_map()
-            _refresh_tray_displays()
+            power_filter.settings = config_last_filter
             if new_config is not None and new_config != current_config:
                 current_config = new_config
-                if _tray is not None:
-                    _tray.notify("Config reloaded.")
-                if current_state is not None:
-                    await _do_switch(current_state)
-        counter += 1
+                plan = None
+                _notify("Config reloaded.")
+                decision = decide(power_filter.committed)
+                if decision is not None:
+                    await _do_switch(decision)
+
+        power_filter.observe(cur_power_state(), loop.time())
+        _, recheck_at = power_filter.poll(loop.time())
+        if filter_timer is not None:
+            filter_timer.cancel()
+            filter_timer = None
+        if recheck_at is not None:
+            filter_timer = loop.call_at(recheck_at, _wake_event.set)
+        _arm_policy_timer()
+
+        new_decision = decide(power_filter.committed)
+        if new_decision != decision and current_config is not None:
+            if new_decision is not None:
+                logging.info(f"policy: {decision} -> {new_decision}")
+                await _do_switch(new_decision)
+        decision = new_decision
+        if _tray is not None:
+            _tray.set_state_text(_state_label(decision))
 
-        if current_state != last_state and current_config is not None:
-            if current_state is not None:
-                await _do_switch(current_state)
-            if _tray is not None:
-                _tray.set_state_text(_state_label(current_state))
+        status = _power.current() if _power is not None else None
+        if status is not None and status != sampled:
+            if status.plugged is False or (sampled and sampled.plugged is False):
+                await record_telemetry(status, display_map)
+            sampled = status
 
-        last_state = current_state
+    for timer in (filter_timer, policy_timer):
+        if timer is not None:
+            timer.cancel()
 
 
 async def get_processes(app_name: str):
+    import psutil  # only the installer needs it; keeps it off the startup path
+
     out = []
     for p in psutil.process_iter(["pid", "name", "exe"]):
         try:
@@ -334,7 +815,7 @@ async def get_processes(app_name: str):
     return out
 
 
-async def install():
+async def install(headless: bool = False):
     """Copy exe into %LOCALAPPDATA%\\SRR, register autostart, restart from there."""
     if PATH_BASE_DIR == PATH_TO_PROGRAM:
         return
@@ -342,6 +823,7 @@ async def install():
         return
 
     logging.info("Installer: relocating to %s", PATH_TO_PROGRAM)
+    import psutil
 
     for inst in await get_processes(PROJECT_EXECUTABLE):
         try:
@@ -358,14 +840,21 @@ async def install():
         logging.error(f"copy to {target_exe} failed: {e}")
         raise
 
-    autostart.enable(PROJECT_NAME, target_exe)
+    args = "--headless" if headless else ""
+    autostart.enable(PROJECT_NAME, target_exe, args)
 
     try:
-        os.startfile(str(target_exe))
+        os.startfile(str(target_exe), arguments=args)
     except OSError as e:
         logging.error(f"failed to launch installed copy: {e}")
         raise
 
+    if headless:
+        logging.info("SRR installed, running headless")
+        sys.exit(0)
+
+    from winotify import Notification
+
     Notification(
         app_id=PROJECT_NAME,
         title="SRR installed",
@@ -374,6 +863,107 @@ async def install():
     sys.exit(0)
 
 
+def _probe_display(
+    mid: str, adapter: bytes, edid_data: Optional[bytes], fingerprint: str
+) -> displaycache.CachedDisplay:
+    info = None
+    if edid_data:
+        try:
+            info = edid.parse_cached(edid_data)
+        except edid.EdidError as e:
+            logging.warning(f"unparseable EDID for {mid!r}: {e}")
+    try:
+        # once SRR has staged a mode, the registry holds SRR's mode
+        registry = reschanger.original_modes().get(adapter)
+        if registry is None:
+            registry = reschanger.get_display_settings(
+                adapter, reschanger.ENUM_REGISTRY_SETTINGS
+            )
+    except RuntimeError as e:
+        logging.warning(f"could not read registry settings for {mid!r}: {e}")
+        registry = None
+    return displaycache.CachedDisplay(
+        fingerprint=fingerprint,
+        friendly_name=info.name if info is not None else None,
+        edid_hash=edid.edid_hash(edid_data) if edid_data else None,
+        modes=reschanger.get_mode_table(adapter),
+        registry_mode=registry,
+    )
+
+
+def _warm_display_cache(reprobe: Optional[Collection[bytes]] = None) -> None:
+    """
+    Seed mode tables, friendly names and registry modes from
+    display_cache.json for every display whose fingerprint (attachment, EDID
+    hash and driver version) is unchanged; probe and record the others, and
+    every display on an adapter in `reprobe`.
+    """
+    cache = displaycache.DisplayCache.load(PATH_DISPLAY_CACHE)
+    displays = reschanger.get_active_displays()
+    reused = 0
+    for disp in displays:
+        mid, adapter = disp["monitor_id"], disp["adapter_name"]
+        edid_data = reschanger.read_monitor_edid(mid)
+        fp = displaycache.fingerprint(
+            mid,
+            adapter,
+            disp["monitor_string"],
+            edid_data,
+            reschanger.driver_identity(adapter),
+        )
+        if reprobe is not None and adapter in reprobe:
+            entry = None
+        else:
+            entry = cache.get(mid, fp)
+        if entry is None:
+            reschanger.invalidate_mode_cache([adapter])
+            _disk_tables.discard(adapter)
+            entry = _probe_display(mid, adapter, edid_data, fp)
+            cache.put(mid, entry)
+        else:
+            reused += 1
+            reschanger.prime_mode_cache(adapter, entry.modes)
+            _disk_tables.add(adapter)
+        _friendly_names[mid] = entry.friendly_name
+        if entry.registry_mode is not None:
+            _registry_modes[mid] = entry.registry_mode
+    logging.info(f"display cache: reused {reused} of {len(displays)} display(s)")
+    if cache.dirty:
+        cache.save()
+
+
+def _refresh_display_cache(adapters: Optional[Collection[bytes]] = None) -> None:
+    """
+    Re-probe the mode tables of `adapters` (all active ones if None) and
+    replace their display_cache.json entries, for modes added since they were
+    recorded (custom resolutions, driver settings) that change no fingerprint.
+    """
+    if adapters is None:
+        adapters = [d["adapter_name"] for d in reschanger.get_active_displays()]
+    _warm_display_cache(reprobe=set(adapters))
+
+
+def _restore_original_modes() -> None:
+    """
+    Put back registry modes that a killed or crashed run left as the desktop
+    default, and persist the originals of every later registry write.
+    """
+    originals = displaycache.OriginalModesFile(PATH_ORIGINAL_MODES)
+    leftover = originals.load()
+    reschanger.persist_original_modes(originals.save)
+    if leftover:
+        restored = reschanger.restore_original_modes(leftover)
+        logging.warning(
+            f"last run did not restore the registry modes of {list(leftover)!r}; "
+            f"restored {restored!r}"
+        )
+
+
+def _reset_display_defaults() -> None:
+    """Put every active display back to its pre-SRR default (blocking)."""
+    reschanger.set_display_defaults(list(build_display_map().values()))
+
+
 def _ensure_config() -> None:
     """
     Create or update config.json.
@@ -401,14 +991,14 @@ def _ensure_config() -> None:
 
         adapter = disp["adapter_name"]
         try:
-            w, h, freq = reschanger.get_display_settings(
+            w, h, freq = _registry_modes.get(mid) or reschanger.get_display_settings(
                 adapter, reschanger.ENUM_REGISTRY_SETTINGS
             )
         except RuntimeError as e:
             logging.warning(f"could not read registry settings for {mid!r}: {e}")
             continue
 
-        bat_freq = reschanger.best_powersave_freq(adapter, w, h)
+        bat_freq = reschanger.propose_powersave_freq(adapter, mid, w, h, freq)
         existing[mid] = {
             "performance-state": {"width": w, "height": h, "refresh_rate": freq},
             "powersave-state": {"width": w, "height": h, "refresh_rate": bat_freq},
@@ -422,68 +1012,258 @@ def _ensure_config() -> None:
             json.dump(existing, f, indent=4)
 
 
-async def srr():
+def _install_signal_handlers(
+    loop: asyncio.AbstractEventLoop,
+    on_exit: Callable[[], None],
+    on_reload: Callable[[], None],
+) -> None:
+    """SIGINT/SIGTERM (SIGBREAK on Windows) exit, SIGHUP reloads."""
+    handlers = {signal.SIGINT: on_exit, signal.SIGTERM: on_exit}
+    if hasattr(signal, "SIGBREAK"):
+        handlers[signal.SIGBREAK] = on_exit
+    if hasattr(signal, "SIGHUP"):
+        handlers[signal.SIGHUP] = on_reload
+    for sig, action in handlers.items():
+        try:
+            loop.add_signal_handler(sig, action)
+        except (NotImplementedError, RuntimeError):  # Windows event loops
+            signal.signal(sig, lambda *_, a=action: loop.call_soon_threadsafe(a))
+
+
+async def srr(headless: bool = False):
     PATH_TO_PROGRAM.mkdir(parents=True, exist_ok=True)
-    await install()
+    await install(headless)
+    _restore_original_modes()  # before anything reads registry modes
+    _warm_display_cache()
     _ensure_config()
 
-    global _shutdown_event, _reload_event, _tray
+    global _shutdown_event, _reload_event, _wake_event, _tray
+    global _power, _topology, _config_watcher, _watchdog, _telemetry
+    global _control_server, _trace, _scheduler, _started
     loop = asyncio.get_running_loop()
     _shutdown_event = asyncio.Event()
     _reload_event = asyncio.Event()
+    _wake_event = asyncio.Event()
     _shutdown_ev = _shutdown_event
     _reload_ev = _reload_event
+    _wake_ev = _wake_event
+
+    def _set_and_wake(event: asyncio.Event) -> None:
+        event.set()
+        _wake_ev.set()
 
     def _request_exit():
         logging.info("shutdown requested")
+        if _trace is not None:
+            _trace.command("exit")
+        logging.info(f"mode table cache: {reschanger.mode_cache_stats}")
+        logging.info(f"mode commits: {reschanger.mode_commit_stats}")
+        logging.info(f"EDID parse cache: {edid.cache_stats}")
+        logging.info(f"reconciler: {_observed.stats}")
+        log_telemetry_summary()
+        if _power_filter is not None:
+            logging.info(f"power transitions: {_power_filter.stats}")
+        logging.info(f"wakeups: {wakeup_stats()}")
+        if _scheduler is not None:
+            logging.info(f"polling: {_scheduler.stats}")
+        loop.call_soon_threadsafe(_set_and_wake, _shutdown_ev)
+
+    def _request_reload():
+        if _trace is not None:
+            _trace.command("reload")
+        loop.call_soon_threadsafe(_set_and_wake, _reload_ev)
+
+    async def _restore_for_session_end() -> None:
+        # no stage or apply may run alongside the restore, or start after it
+        await _display_io.close()
+        _retries.cancel_all()
+        await _display_io.call(None, reschanger.set_display_defaults)
+
+    def _on_query_end_session(wparam: int, lparam: int) -> None:
+        # message window thread; Windows may end the process right after this
+        if not reschanger.original_modes():
+            return
+        logging.info("session ending: restoring registry modes")
+        restored = asyncio.run_coroutine_threadsafe(_restore_for_session_end(), loop)
         try:
-            adapter_names = list(build_display_map().values())
-            reschanger.set_display_defaults(adapter_names)
+            restored.result(SESSION_END_RESTORE_TIMEOUT)
         except Exception as e:
-            logging.warning(f"set_display_defaults failed: {e}")
-        loop.call_soon_threadsafe(_shutdown_ev.set)
+            logging.warning(f"restoring registry modes at session end failed: {e!r}")
 
-    def _request_reload():
-        loop.call_soon_threadsafe(_reload_ev.set)
-
-    _tray = TrayController(
-        project_name=PROJECT_NAME,
-        exe_path=PATH_TO_PROGRAM / PROJECT_EXECUTABLE,
-        config_path=PATH_CONFIG,
-        log_path=PATH_LOG,
-        on_exit=_request_exit,
-        on_reload=_request_reload,
-        icon_path=PATH_ICON if PATH_ICON.exists() else None,
+    def _resume_after_session_end() -> None:
+        _display_io.reopen()
+        _set_and_wake(_reload_ev)
+
+    def _on_end_session(wparam: int, lparam: int) -> None:
+        if not wparam:  # logoff/shutdown was cancelled: put our modes back
+            loop.call_soon_threadsafe(_resume_after_session_end)
+
+    _commands.update(
+        exit=_request_exit,
+        reload=_request_reload,
+        pause=lambda: set_paused(True),
+        resume=lambda: set_paused(False),
+    )
+    _install_signal_handlers(loop, _request_exit, _request_reload)
+
+    def _on_power_change(status: power.PowerStatus) -> None:
+        logging.debug(f"power status changed: {status}")
+        if _trace is not None:
+            _trace.power(status)
+        _wake_ev.set()
+
+    def _on_display_events(events: List[topology.DisplayEvent]) -> None:
+        _display_events.extend(events)
+        if _trace is not None and _topology is not None:
+            _trace.displays(_topology.current())
+        _wake_ev.set()
+
+    import telemetry
+
+    _telemetry = telemetry.TelemetryRing.load(PATH_TELEMETRY)
+
+    if os.environ.get("SRR_WATCHDOG"):
+        import lagwatch
+
+        _watchdog = lagwatch.from_env(os.environ["SRR_WATCHDOG"])
+    if _watchdog is not None:
+        _watchdog.instrument(reschanger, _WATCHED_RESCHANGER_CALLS, "reschanger")
+        _watchdog.instrument(
+            reschanger.ModeTransaction, ("stage", "commit"), "ModeTransaction"
+        )
+        _watchdog.instrument(power, ("read_battery",), "power")
+        _watchdog.start(loop)
+
+    if os.environ.get("SRR_TRACE"):
+        import eventtrace
+
+        _trace = eventtrace.from_env(os.environ["SRR_TRACE"])
+
+    _scheduler = scheduler.shared(loop)
+    _started = time.monotonic()
+    _power = power.create_power_source(
+        poll_interval=POWER_POLL_INTERVAL, max_interval=POWER_POLL_MAX_INTERVAL
     )
-    _tray.start()
+    _power.start(loop, _on_power_change)
+    _topology = topology.create_topology_source(poll_interval=TOPOLOGY_POLL_INTERVAL)
+    _topology.start(loop, _on_display_events, display_io=_display_io)
+    if _trace is not None:
+        _trace.power(_power.current())
+        _trace.displays(_topology.current())
+    session_window = winmsg.shared_window() if winmsg.available() else None
+    if session_window is not None:
+        session_window.subscribe(winmsg.WM_QUERYENDSESSION, _on_query_end_session)
+        session_window.subscribe(winmsg.WM_ENDSESSION, _on_end_session)
+
+    def _on_config_files(names) -> None:
+        global _config_changed
+        logging.debug(f"config watcher: {names} changed")
+        if PATH_CONTROL.name in names:
+            for command in _read_control_file():
+                run_command(command)
+        if PATH_CONFIG.name in names:
+            _config_changed = True
+            _wake_ev.set()
+
+    PATH_CONTROL.unlink(missing_ok=True)  # stale commands from a previous run
+    _config_watcher = confwatch.start_watcher(
+        loop,
+        _on_config_files,
+        PATH_TO_PROGRAM,
+        [PATH_CONFIG.name, PATH_CONTROL.name],
+        poll_interval=CONFIG_POLL_INTERVAL,
+        debounce=CONFIG_DEBOUNCE,
+    )
+
+    import control
+
+    _control_server = control.ControlServer(
+        control.default_address(PATH_TO_PROGRAM), handle_control
+    )
+    try:
+        await _control_server.start()
+    except (OSError, NotImplementedError) as e:
+        logging.warning(f"control channel unavailable: {e}")
+        _control_server = None
+
+    if headless:
+        logging.info("running headless: no tray icon")
+    else:
+        from tray import TrayController  # pulls in pystray and Pillow
+
+        _tray = TrayController(
+            project_name=PROJECT_NAME,
+            exe_path=PATH_TO_PROGRAM / PROJECT_EXECUTABLE,
+            config_path=PATH_CONFIG,
+            log_path=PATH_LOG,
+            on_exit=_request_exit,
+            on_reload=_request_reload,
+            on_pause_change=lambda paused: loop.call_soon_threadsafe(
+                set_paused, paused
+            ),
+            icon_path=PATH_ICON,
+        )
+        _tray.start()
 
     cfg = await load_config()
     if cfg is not None:
-        await switch_rate(cur_power_state(), cfg, build_display_map())
+        plan = await build_plan(cfg, build_display_map())
+        await switch_rate(decide(cur_power_state()), plan)
 
-    await srr_loop()
+    try:
+        await srr_loop()
+    finally:
+        _power.stop()
+        _topology.stop()
+        _config_watcher.stop()
+        if _control_server is not None:
+            _control_server.stop()
+        if _watchdog is not None:
+            _watchdog.stop()
+        _retries.cancel_all()
+        try:  # on the global lane, once no commit is in flight
+            await _display_io.close()
+            await _display_io.call(None, _reset_display_defaults)
+        except Exception as e:
+            logging.warning(f"set_display_defaults failed: {e}")
+        _display_io.shutdown()
+        if _telemetry.unsaved:
+            _telemetry.save()
+        if _trace is not None:
+            _trace.close()
+        if _tray is not None:
+            _tray.stop()  # exit via control, signal or file: no ghost icon
 
 
-async def main():
+async def main(headless: bool = False):
     try:
-        await srr()
+        await srr(headless)
     except Exception as e:
-        write_logs(e)
+        write_logs(e, show_dialog=not headless)
         sys.exit(1)
 
 
-def _setup_logging():
-    PATH_TO_PROGRAM.mkdir(parents=True, exist_ok=True)
-    handler = logging.handlers.RotatingFileHandler(
-        PATH_LOG, maxBytes=1_000_000, backupCount=3, encoding="utf-8"
-    )
-    logging.basicConfig(
-        level=logging.INFO,
-        handlers=[handler],
-        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+def _parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog=PROJECT_NAME)
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="run without a tray icon; control via signals or the control file",
     )
+    return parser.parse_args(argv)
+
+
+def _setup_logging() -> "logpipe.LogPipeline":
+    import logpipe
+
+    PATH_TO_PROGRAM.mkdir(parents=True, exist_ok=True)
+    return logpipe.setup(PATH_LOG, fmt=os.environ.get("SRR_LOG_FORMAT"))
 
 
 if __name__ == "__main__":
-    _setup_logging()
-    asyncio.run(main())
+    args = _parse_args(sys.argv[1:])
+    _log_pipeline = _setup_logging()
+    try:
+        asyncio.run(main(args.headless))
+    finally:
+        _log_pipeline.stop()
@@ -0,0 +1,219 @@
+"""
+Rule engine choosing the display profile from power and time-of-day inputs.
+
+config.json may list ordered rules; the first rule whose conditions all hold
+selects its profile, otherwise AC picks "performance" and battery "powersave":
+
+    "rules": [
+        {"profile": "lowest", "ac": false, "battery_below": 20},
+        {"profile": "night", "ac": false, "between": ["22:00", "07:00"]}
+    ]
+
+A profile named p uses the "p-state" mode of each display that defines one;
+displays without it keep their AC/battery default.
+"""
+
+import dataclasses
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+PERFORMANCE = "performance"
+POWERSAVE = "powersave"
+BASE_PROFILES = (PERFORMANCE, POWERSAVE)
+PROFILE_SUFFIX = "-state"
+
+MINUTES_PER_DAY = 24 * 60
+
+# (profile, plugged): the profile to apply and the AC state whose default
+# mode applies to displays that do not define that profile
+Decision = Tuple[str, bool]
+
+
+def base_profile(plugged: bool) -> str:
+    return PERFORMANCE if plugged else POWERSAVE
+
+
+@dataclasses.dataclass(frozen=True)
+class Inputs:
+    plugged: bool
+    percent: Optional[float]
+    secsleft: Optional[int]
+    minute: int  # local minute of day, 0..1439
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Rule:
+    profile: str
+    ac: Optional[bool] = None
+    battery_below: Optional[float] = None
+    battery_above: Optional[float] = None
+    secsleft_below: Optional[int] = None
+    between: Optional[Tuple[int, int]] = None  # [start, end) minutes, may wrap
+
+
+def _parse_clock(where: str, value) -> int:
+    try:
+        hours, minutes = (int(part) for part in str(value).split(":"))
+    except ValueError:
+        raise ValueError(f"{where}: expected \"HH:MM\", got {value!r}") from None
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise ValueError(f"{where}: {value!r} is not a time of day")
+    return hours * 60 + minutes
+
+
+def _number(where: str, value, lo: float, hi: float) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{where}: expected a number, got {value!r}")
+    if not lo <= value <= hi:
+        raise ValueError(f"{where}: {value!r} is outside {lo:g}..{hi:g}")
+    return value
+
+
+def parse_rule(index: int, raw) -> Rule:
+    where = f"rules[{index}]"
+    if not isinstance(raw, dict):
+        raise ValueError(f"{where}: expected an object")
+    known = {f.name for f in dataclasses.fields(Rule)}
+    unknown = sorted(set(raw) - known)
+    if unknown:
+        raise ValueError(f"{where}: unknown key(s) {', '.join(unknown)}")
+    profile = raw.get("profile")
+    if not isinstance(profile, str) or not profile:
+        raise ValueError(f"{where}.profile: expected a profile name")
+    ac = raw.get("ac")
+    if ac is not None and not isinstance(ac, bool):
+        raise ValueError(f"{where}.ac: expected true or false, got {ac!r}")
+    below = raw.get("battery_below")
+    above = raw.get("battery_above")
+    secs = raw.get("secsleft_below")
+    between = raw.get("between")
+    if between is not None:
+        if not isinstance(between, list) or len(between) != 2:
+            raise ValueError(f"{where}.between: expected [\"HH:MM\", \"HH:MM\"]")
+        between = (
+            _parse_clock(f"{where}.between[0]", between[0]),
+            _parse_clock(f"{where}.between[1]", between[1]),
+        )
+    return Rule(
+        profile=profile,
+        ac=ac,
+        battery_below=(
+            None if below is None else _number(f"{where}.battery_below", below, 0, 100)
+        ),
+        battery_above=(
+            None if above is None else _number(f"{where}.battery_above", above, 0, 100)
+        ),
+        secsleft_below=(
+            None
+            if secs is None
+            else int(_number(f"{where}.secsleft_below", secs, 0, float("inf")))
+        ),
+        between=between,
+    )
+
+
+def _in_window(minute: int, window: Tuple[int, int]) -> bool:
+    start, end = window
+    if start <= end:
+        return start <= minute < end
+    return minute >= start or minute < end
+
+
+# one atomic condition, evaluated once per input change however many rules use it
+Atom = Callable[[Inputs], bool]
+
+
+def _atoms_of(rule: Rule) -> List[Tuple[tuple, Atom]]:
+    atoms: List[Tuple[tuple, Atom]] = []
+    if rule.ac is not None:
+        ac = rule.ac
+        atoms.append((("ac", ac), lambda i: i.plugged == ac))
+    if rule.battery_below is not None:
+        lim = rule.battery_below
+        atoms.append(
+            (("below", lim), lambda i: i.percent is not None and i.percent < lim)
+        )
+    if rule.battery_above is not None:
+        lim = rule.battery_above
+        atoms.append(
+            (("above", lim), lambda i: i.percent is not None and i.percent > lim)
+        )
+    if rule.secsleft_below is not None:
+        lim = rule.secsleft_below
+        atoms.append(
+            (("secs", lim), lambda i: i.secsleft is not None and i.secsleft < lim)
+        )
+    if rule.between is not None:
+        window = rule.between
+        atoms.append((("time", window), lambda i: _in_window(i.minute, window)))
+    return atoms
+
+
+class Policy:
+    """
+    Rules compiled into shared atomic conditions (one bit each) and, per rule,
+    the mask of bits it needs. select() evaluates the atoms into a bitmask and
+    memoizes mask -> profile, so repeated inputs cost a dict lookup.
+    """
+
+    def __init__(self, rules: Sequence[Rule] = ()):
+        self.rules = tuple(rules)
+        index: Dict[tuple, int] = {}
+        self._atoms: List[Atom] = []
+        self._masks: List[Tuple[int, str]] = []
+        for rule in self.rules:
+            mask = 0
+            for key, atom in _atoms_of(rule):
+                if key not in index:
+                    index[key] = len(self._atoms)
+                    self._atoms.append(atom)
+                mask |= 1 << index[key]
+            self._masks.append((mask, rule.profile))
+        self._decisions: Dict[Tuple[int, bool], str] = {}
+        self.boundaries = tuple(
+            sorted({m for r in self.rules if r.between for m in r.between})
+        )
+
+    @classmethod
+    def from_config(cls, raw) -> "Policy":
+        if raw is None:
+            return cls()
+        if not isinstance(raw, list):
+            raise ValueError("rules: expected a list")
+        return cls([parse_rule(i, r) for i, r in enumerate(raw)])
+
+    @property
+    def profiles(self) -> Tuple[str, ...]:
+        return tuple(dict.fromkeys(r.profile for r in self.rules))
+
+    def select(self, inputs: Inputs) -> str:
+        state = 0
+        for bit, atom in enumerate(self._atoms):
+            if atom(inputs):
+                state |= 1 << bit
+        key = (state, inputs.plugged)
+        profile = self._decisions.get(key)
+        if profile is None:
+            profile = next(
+                (p for mask, p in self._masks if state & mask == mask),
+                base_profile(inputs.plugged),
+            )
+            self._decisions[key] = profile
+        return profile
+
+    def seconds_to_boundary(self, now: Optional[float] = None) -> Optional[float]:
+        """Seconds until the next time-window edge (None without time rules)."""
+        if not self.boundaries:
+            return None
+        lt = time.localtime(now)
+        seconds = lt.tm_hour * 3600 + lt.tm_min * 60 + lt.tm_sec
+        minute = seconds // 60
+        nxt = next((b for b in self.boundaries if b > minute), None)
+        if nxt is None:
+            nxt = self.boundaries[0] + MINUTES_PER_DAY
+        return nxt * 60 - seconds
+
+
+def local_minute(now: Optional[float] = None) -> int:
+    lt = time.localtime(now)
+    return lt.tm_hour * 60 + lt.tm_min
@@ -0,0 +1,231 @@
+"""Power source subscriptions: push AC/battery changes into the asyncio loop."""
+
+import asyncio
+import ctypes
+import dataclasses
+import logging
+from typing import Callable, Iterable, Optional, Tuple
+
+import scheduler
+import winmsg
+
+try:
+    _kernel32 = ctypes.windll.kernel32
+except AttributeError:  # not Windows
+    _kernel32 = None
+
+BATTERY_FLAG_NO_BATTERY = 0x80
+BATTERY_PERCENT_UNKNOWN = 0xFF
+BATTERY_LIFE_UNKNOWN = 0xFFFFFFFF
+
+
+class SYSTEM_POWER_STATUS(ctypes.Structure):
+    _fields_ = [
+        ("ACLineStatus", ctypes.c_ubyte),
+        ("BatteryFlag", ctypes.c_ubyte),
+        ("BatteryLifePercent", ctypes.c_ubyte),
+        ("SystemStatusFlag", ctypes.c_ubyte),
+        ("BatteryLifeTime", ctypes.c_ulong),
+        ("BatteryFullLifeTime", ctypes.c_ulong),
+    ]
+
+
+@dataclasses.dataclass(frozen=True)
+class PowerStatus:
+    plugged: Optional[bool]  # True on AC, False on battery, None if no battery info
+    percent: Optional[float] = None
+    secsleft: Optional[int] = None
+
+
+NO_BATTERY = PowerStatus(None)
+
+
+def _read_battery_win32() -> PowerStatus:
+    # same call psutil.sensors_battery makes, without importing psutil at startup
+    sps = SYSTEM_POWER_STATUS()
+    if not _kernel32.GetSystemPowerStatus(ctypes.byref(sps)):
+        logging.warning(f"GetSystemPowerStatus failed: {ctypes.GetLastError()}")
+        return NO_BATTERY
+    if sps.BatteryFlag & BATTERY_FLAG_NO_BATTERY:
+        return NO_BATTERY
+    plugged = sps.ACLineStatus == 1
+    percent = (
+        None
+        if sps.BatteryLifePercent == BATTERY_PERCENT_UNKNOWN
+        else float(sps.BatteryLifePercent)
+    )
+    secsleft = (
+        None
+        if plugged or sps.BatteryLifeTime == BATTERY_LIFE_UNKNOWN
+        else int(sps.BatteryLifeTime)
+    )
+    return PowerStatus(plugged, percent, secsleft)
+
+
+def read_battery() -> PowerStatus:
+    if _kernel32 is not None:
+        return _read_battery_win32()
+    import psutil  # only needed off Windows; loaded on first use
+
+    try:
+        bat = psutil.sensors_battery()
+    except Exception as e:
+        logging.warning(f"sensors_battery failed: {e}")
+        return NO_BATTERY
+    if bat is None:
+        return NO_BATTERY
+    secsleft = bat.secsleft if bat.secsleft >= 0 else None
+    return PowerStatus(bool(bat.power_plugged), bat.percent, secsleft)
+
+
+class PowerSource:
+    """
+    Base class for power sources. `start` takes a snapshot and begins
+    delivering changes; the callback always runs on the asyncio loop thread
+    and only when the status differs from the previous one.
+    Subclasses implement `read` and may call `_publish` from any thread.
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._callback: Optional[Callable[[PowerStatus], None]] = None
+        self._last: PowerStatus = NO_BATTERY
+
+    def read(self) -> PowerStatus:
+        raise NotImplementedError
+
+    def current(self) -> PowerStatus:
+        return self._last
+
+    def start(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        callback: Callable[[PowerStatus], None],
+    ) -> None:
+        self._loop = loop
+        self._callback = callback
+        self._last = self.read()
+        self._start()
+        logging.info(f"power source: {self.name}, initial {self._last}")
+
+    def stop(self) -> None:
+        pass
+
+    def _start(self) -> None:
+        pass
+
+    def _publish(self, status: PowerStatus) -> None:
+        if self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._deliver, status)
+
+    def _deliver(self, status: PowerStatus) -> None:
+        if status == self._last:
+            return
+        self._last = status
+        if self._callback is not None:
+            self._callback(status)
+
+
+class Win32PowerSource(PowerSource):
+    """Re-reads the battery only when Windows broadcasts WM_POWERBROADCAST."""
+
+    name = "win32 power broadcast"
+
+    def __init__(self, window: winmsg.MessageWindow):
+        super().__init__()
+        self._window = window
+
+    def read(self) -> PowerStatus:
+        return read_battery()
+
+    def _start(self) -> None:
+        self._window.subscribe(winmsg.WM_POWERBROADCAST, self._on_broadcast)
+
+    def stop(self) -> None:
+        self._window.unsubscribe(winmsg.WM_POWERBROADCAST, self._on_broadcast)
+
+    def _on_broadcast(self, wparam: int, lparam: int) -> None:
+        if wparam in (
+            winmsg.PBT_APMPOWERSTATUSCHANGE,
+            winmsg.PBT_APMRESUMEAUTOMATIC,
+        ):
+            self._publish(self.read())
+
+
+class PollingPowerSource(PowerSource):
+    """
+    Fallback: polls the battery every `interval` seconds, slowing down to
+    `max_interval` while nothing changes and much further without a battery.
+    """
+
+    name = "polling"
+
+    def __init__(self, interval: float, max_interval: Optional[float] = None):
+        super().__init__()
+        self.interval = interval
+        self.max_interval = max_interval
+        self._job: Optional[scheduler.Job] = None
+
+    def read(self) -> PowerStatus:
+        return read_battery()
+
+    def _start(self) -> None:
+        assert self._loop is not None
+        self._job = scheduler.shared(self._loop).add(
+            "power", self._poll, self.interval, self.max_interval
+        )
+
+    def stop(self) -> None:
+        if self._job is not None:
+            self._job.cancel()
+            self._job = None
+
+    def _poll(self) -> str:
+        status = self.read()
+        changed = status != self._last
+        self._deliver(status)
+        if changed:
+            return scheduler.CHANGED
+        return scheduler.UNAVAILABLE if status.plugged is None else scheduler.UNCHANGED
+
+
+class FakePowerSource(PowerSource):
+    """Scriptable source for tests and simulations; never touches the OS."""
+
+    name = "fake"
+
+    def __init__(self, status: PowerStatus = PowerStatus(True, 100.0)):
+        super().__init__()
+        self._status = status
+        self._handles: list = []
+
+    def read(self) -> PowerStatus:
+        return self._status
+
+    def set(self, status: PowerStatus) -> None:
+        self._status = status
+        self._publish(status)
+
+    def play(self, steps: Iterable[Tuple[float, PowerStatus]]) -> None:
+        """Schedule (delay_seconds, status) steps relative to now."""
+        assert self._loop is not None, "start() the source first"
+        for delay, status in steps:
+            self._handles.append(self._loop.call_later(delay, self.set, status))
+
+    def stop(self) -> None:
+        for h in self._handles:
+            h.cancel()
+        self._handles.clear()
+
+
+def create_power_source(
+    poll_interval: float, max_interval: Optional[float] = None
+) -> PowerSource:
+    """OS power-broadcast source where available, polling otherwise."""
+    window = winmsg.shared_window()
+    if window is not None:
+        return Win32PowerSource(window)
+    return PollingPowerSource(poll_interval, max_interval)
@@ -0,0 +1,134 @@
+"""
+Desired-state reconciliation. Config, display map and target selection are
+compiled into a SwitchPlan holding the desired mode of every managed display
+per policy decision; a transition compares one of its tables with the
+observed current modes and only the displays that differ get switched.
+"""
+
+import asyncio
+import dataclasses
+import logging
+import types
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import policy
+import reschanger
+from asyncdisplay import AsyncDisplay
+
+Mode = Sequence[int]  # (width, height, freq), e.g. a ScreenSettings
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class SwitchPlan:
+    """Read-only {adapter: mode} table per policy decision (profile, plugged)."""
+
+    tables: Mapping[policy.Decision, Mapping[bytes, Mode]]
+
+    def modes(self, decision: policy.Decision) -> Mapping[bytes, Mode]:
+        table = self.tables.get(decision)
+        if table is None:  # a profile no display defines: AC/battery default
+            table = self.tables.get((policy.base_profile(decision[1]), decision[1]))
+        return table if table is not None else _EMPTY_TABLE
+
+
+_EMPTY_TABLE: Mapping[bytes, Mode] = types.MappingProxyType({})
+EMPTY_PLAN = SwitchPlan(types.MappingProxyType({}))
+
+
+async def compile_plan(
+    display_io: AsyncDisplay,
+    config: Dict[str, Mapping[str, Mode]],
+    display_map: Dict[str, bytes],
+    target: Optional[str] = None,
+) -> Tuple[SwitchPlan, List[str]]:
+    """
+    Plan for every active configured display (only `target` if set).
+    `config` maps monitor id -> {profile: mode}. For each profile p and AC
+    state the table is the AC/battery default overlaid with the p modes.
+    Modes missing from the adapter's mode table are left out of the plan and
+    reported in the returned list of error messages.
+    """
+    candidates: List[Tuple[str, str, Mode, bytes]] = []
+    for mid, profiles in config.items():
+        adapter_name = display_map.get(mid)
+        if adapter_name is None or (target is not None and mid != target):
+            continue
+        for profile, mode in profiles.items():
+            candidates.append((mid, profile, mode, adapter_name))
+
+    supported = await display_io.has_modes(
+        [(mode, adapter_name) for _, _, mode, adapter_name in candidates]
+    )
+    by_profile: Dict[str, Dict[bytes, Mode]] = {p: {} for p in policy.BASE_PROFILES}
+    errors = []
+    for (mid, profile, mode, adapter_name), ok in zip(candidates, supported):
+        if ok:
+            by_profile.setdefault(profile, {})[adapter_name] = mode
+            continue
+        w, h, hz = mode
+        errors.append(
+            f"{mid!r} {profile}{policy.PROFILE_SUFFIX}: {w}x{h} @ {hz} Hz is not "
+            f"a mode of {adapter_name.decode('ascii', errors='replace')}"
+        )
+
+    tables: Dict[policy.Decision, Mapping[bytes, Mode]] = {}
+    for profile, overlay in by_profile.items():
+        for plugged in (True, False):
+            base = by_profile[policy.base_profile(plugged)]
+            tables[(profile, plugged)] = types.MappingProxyType({**base, **overlay})
+    return SwitchPlan(types.MappingProxyType(tables)), errors
+
+
+class ObservedModes:
+    """
+    Current mode per adapter, read through AsyncDisplay at most once per tick.
+    Call new_tick() when the loop wakes up; modes committed during the tick
+    are recorded so a second reconcile in the same tick is free.
+    """
+
+    def __init__(self, display_io: AsyncDisplay):
+        self._io = display_io
+        self._modes: Dict[bytes, Optional[Tuple[int, int, int]]] = {}
+        self.stats = {"reads": 0, "in_sync": 0, "switched": 0}
+
+    def new_tick(self) -> None:
+        self._modes.clear()
+
+    def record(self, adapter_name: bytes, mode: Mode) -> None:
+        self._modes[adapter_name] = tuple(mode)
+
+    async def _read(self, adapter_name: bytes) -> Optional[Tuple[int, int, int]]:
+        self.stats["reads"] += 1
+        try:
+            return await self._io.call(
+                adapter_name,
+                reschanger.get_display_settings,
+                adapter_name,
+                reschanger.ENUM_CURRENT_SETTINGS,
+            )
+        except RuntimeError as e:
+            logging.warning(f"could not read current mode of {adapter_name!r}: {e}")
+            return None
+
+    async def read(
+        self, adapter_names: Iterable[bytes]
+    ) -> Dict[bytes, Optional[Tuple[int, int, int]]]:
+        missing = [a for a in adapter_names if a not in self._modes]
+        for adapter_name, mode in zip(
+            missing, await asyncio.gather(*(self._read(a) for a in missing))
+        ):
+            if mode is not None:
+                self._modes[adapter_name] = mode
+        return dict(self._modes)
+
+    async def diff(self, desired: Mapping[bytes, Mode]) -> List[Tuple[Mode, bytes]]:
+        """(mode, adapter) for every desired mode that is not the observed one."""
+        observed = await self.read(desired)
+        changes = [
+            (mode, adapter_name)
+            for adapter_name, mode in desired.items()
+            if observed.get(adapter_name) != tuple(mode)
+        ]
+        self.stats["in_sync"] += len(desired) - len(changes)
+        self.stats["switched"] += len(changes)
+        return changes
@@ -0,0 +1,388 @@
+"""
+Replays an SRR_TRACE recording (see eventtrace.py) through srr_loop against
+the simulated display driver, in virtual time: the loop jumps straight to the
+next timer or recorded event instead of waiting, and display calls run inline
+instead of on driver threads, so a week of field behaviour replays in seconds.
+
+    python replay.py trace.jsonl [--window 60] [--settle 600] [--json] [-v]
+
+Reports the switches the replayed loop issued next to the recorded ones,
+redundant switches (a display switched back to the mode it came from within
+--window seconds) and how long the loop took to process each input event.
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import io
+import json
+import logging
+import os
+import selectors
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import eventtrace
+import main as srr
+import power
+import reschanger
+import simdisplay
+import topology
+
+DEFAULT_WINDOW = 60.0  # seconds, see eventtrace.SwitchStats
+DEFAULT_SETTLE = 600.0  # virtual seconds run after the last event (dwell, retries)
+
+_INPUTS = (eventtrace.POWER, eventtrace.DISPLAYS, eventtrace.CONFIG)
+
+
+class _VirtualSelector:
+    """Never blocks: an idle select() advances the loop's clock instead."""
+
+    def __init__(self, loop: "VirtualTimeLoop", selector: selectors.BaseSelector):
+        self._loop = loop
+        self._selector = selector
+
+    def select(self, timeout: Optional[float] = None):
+        ready = self._selector.select(0)
+        if ready or timeout == 0:
+            return ready
+        self._loop.on_idle()
+        if timeout is None:
+            raise RuntimeError("replay stalled: nothing scheduled and nothing ready")
+        self._loop.now += timeout
+        return []
+
+    def __getattr__(self, name):
+        return getattr(self._selector, name)
+
+
+class VirtualTimeLoop(asyncio.SelectorEventLoop):
+    """
+    Event loop on a virtual clock starting at 0. run_in_executor() runs the
+    function inline, so driver calls finish before time can move on.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.idle_callbacks: List[Callable[[], None]] = []
+        super().__init__(_VirtualSelector(self, selectors.DefaultSelector()))
+
+    def time(self) -> float:
+        return self.now
+
+    def on_idle(self) -> None:
+        for callback in self.idle_callbacks:
+            callback()
+
+    def run_in_executor(self, executor, func, *args):
+        future = self.create_future()
+        try:
+            future.set_result(func(*args))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
+@dataclasses.dataclass
+class Report:
+    events: int
+    virtual_seconds: float
+    wall_seconds: float
+    replayed: eventtrace.SwitchStats
+    recorded: eventtrace.SwitchStats
+    latency_ms: List[float]
+
+    def as_dict(self) -> dict:
+        out = dataclasses.asdict(self)
+        out["latency_ms"] = _percentiles(self.latency_ms)
+        return out
+
+    def lines(self) -> List[str]:
+        speedup = self.virtual_seconds / max(self.wall_seconds, 1e-9)
+        lat = _percentiles(self.latency_ms)
+        return [
+            f"replayed {self.events} events over {_duration(self.virtual_seconds)}"
+            f" of trace in {self.wall_seconds:.2f} s ({speedup:,.0f}x)",
+            f"switches: {_switch_text(self.replayed)} replayed,"
+            f" {_switch_text(self.recorded)} recorded",
+            "decision latency: "
+            + (
+                f"p50 {lat['p50']:.2f} ms, p95 {lat['p95']:.2f} ms,"
+                f" max {lat['max']:.2f} ms"
+                if lat
+                else "n/a"
+            ),
+        ]
+
+
+def _switch_text(stats: eventtrace.SwitchStats) -> str:
+    return f"{stats.issued} ({stats.failed} failed, {stats.redundant} redundant)"
+
+
+def _duration(seconds: float) -> str:
+    if seconds >= 86400:
+        return f"{seconds / 86400:.1f} d"
+    if seconds >= 3600:
+        return f"{seconds / 3600:.1f} h"
+    return f"{seconds:.0f} s"
+
+
+def _percentiles(values: Sequence[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    ordered = sorted(values)
+    return {
+        "p50": statistics.median(ordered),
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "max": ordered[-1],
+    }
+
+
+def _config_modes(bodies: Dict[str, dict]) -> Dict[str, set]:
+    """Every mode any recorded config asks of each monitor, to simulate it."""
+    modes: Dict[str, set] = {}
+    for body in bodies.values():
+        for mid, entry in body.items():
+            if mid in srr._CONFIG_RESERVED_KEYS or not isinstance(entry, dict):
+                continue
+            for state, raw in entry.items():
+                try:
+                    ss = srr._parse_screen_settings(mid, state, raw)
+                except ValueError:
+                    continue
+                modes.setdefault(mid, set()).add(tuple(ss))
+    return modes
+
+
+class _Replayer:
+    def __init__(self, records: List[dict], workdir: Path, settle: float):
+        self.records = records
+        self.workdir = workdir
+        self.settle = settle
+        self.bodies = {
+            r["hash"]: r["body"]
+            for r in records
+            if r["k"] == eventtrace.CONFIG and "body" in r
+        }
+        self.modes = _config_modes(self.bodies)
+        self.backend = simdisplay.SimulatedBackend()
+        self.power = power.FakePowerSource(power.PowerStatus(None))
+        self.topology = topology.FakeTopologySource()
+        self.latency_ms: List[float] = []
+        self._pending: List[float] = []  # perf_counter() of unprocessed events
+        self.events = 0
+
+    # --- inputs ----------------------------------------------------------
+
+    def _power(self, r: dict) -> None:
+        self.power.set(power.PowerStatus(r["plugged"], r["percent"], r["secsleft"]))
+
+    def _plug(self, r: dict) -> List[topology.DisplayInfo]:
+        """Make the simulated driver match a displays record."""
+        infos = [
+            topology.DisplayInfo(mid, adapter.encode("latin-1"), name)
+            for mid, adapter, name in r["displays"]
+        ]
+        for adapter in list(self.backend.displays):
+            if all(d.adapter_name != adapter for d in infos):
+                self.backend.unplug(adapter)
+        for d in infos:
+            sim = self.backend.displays.get(d.adapter_name)
+            if sim is None or sim.monitor_id != d.monitor_id:
+                self.backend.plug(
+                    simdisplay.SimulatedDisplay(
+                        d.monitor_id,
+                        d.adapter_name,
+                        d.monitor_string,
+                        modes=tuple(
+                            sorted(
+                                set(simdisplay.DEFAULT_MODES)
+                                | self.modes.get(d.monitor_id, set())
+                            )
+                        ),
+                    )
+                )
+        reschanger.invalidate_mode_cache()
+        return infos
+
+    def _write_config(self, r: dict) -> bool:
+        body = self.bodies.get(r["hash"])
+        if body is None:
+            logging.warning(f"config {r['hash']} has no recorded body, skipped")
+            return False
+        srr.PATH_CONFIG.write_text(json.dumps(body, indent=4), encoding="utf-8")
+        mtime = srr._wall_clock()
+        os.utime(srr.PATH_CONFIG, (mtime, mtime))  # load_config() compares mtimes
+        return True
+
+    def _command(self, r: dict) -> None:
+        name, arg = r["name"], r.get("arg")
+        if name == "exit":
+            srr._shutdown_event.set()
+        elif name == "reload":
+            srr._reload_event.set()
+        elif name in ("pause", "resume"):
+            srr.set_paused(name == "pause")
+        elif name == "force":
+            srr.set_forced(arg)
+        elif name == "target" and srr._select_target is not None:
+            srr._select_target(arg)
+
+    def apply(self, r: dict) -> None:
+        self.events += 1
+        self._pending.append(time.perf_counter())
+        kind = r["k"]
+        if kind == eventtrace.POWER:
+            self._power(r)  # wakes the loop through the power source
+        elif kind == eventtrace.DISPLAYS:
+            self.topology.set_displays(self._plug(r))
+        elif kind == eventtrace.CONFIG:
+            srr._config_changed = self._write_config(r)
+            srr._wake_event.set()
+        elif kind == eventtrace.COMMAND:
+            self._command(r)
+            srr._wake_event.set()
+
+    def on_idle(self) -> None:
+        """The loop has nothing left to do: every pending event is processed."""
+        now = time.perf_counter()
+        self.latency_ms.extend((now - t) * 1000 for t in self._pending)
+        self._pending.clear()
+
+    # --- run -------------------------------------------------------------
+
+    def _split_initial(self) -> int:
+        """Index of the first record after the state SRR started with."""
+        seen = set()
+        for i, r in enumerate(self.records):
+            kind = r["k"]
+            if kind in (eventtrace.START, eventtrace.SWITCH):
+                continue
+            if kind not in _INPUTS or kind in seen:
+                return i
+            seen.add(kind)
+        return len(self.records)
+
+    async def run(self) -> List[dict]:
+        loop = asyncio.get_running_loop()
+        wall0 = self.records[0].get("time", time.time())
+        srr._wall_clock = lambda: wall0 + loop.time()
+        srr.PATH_TO_PROGRAM = self.workdir
+        srr.PATH_CONFIG = self.workdir / "config.json"
+        srr.PATH_DISPLAY_CACHE = self.workdir / "display_cache.json"
+        srr._shutdown_event = asyncio.Event()
+        srr._reload_event = asyncio.Event()
+        srr._wake_event = asyncio.Event()
+        output = io.StringIO()
+        srr._trace = eventtrace.TraceRecorder(output, clock=loop.time)
+        reschanger.use_backend(self.backend)
+
+        first = self._split_initial()
+        for r in self.records[:first]:
+            if r["k"] == eventtrace.POWER:
+                self.power = power.FakePowerSource(
+                    power.PowerStatus(r["plugged"], r["percent"], r["secsleft"])
+                )
+            elif r["k"] == eventtrace.DISPLAYS:
+                self.topology = topology.FakeTopologySource(self._plug(r))
+            elif r["k"] == eventtrace.CONFIG:
+                self._write_config(r)
+
+        def _on_display_events(events: List[topology.DisplayEvent]) -> None:
+            srr._display_events.extend(events)
+            srr._wake_event.set()
+
+        srr._power, srr._topology = self.power, self.topology
+        self.power.start(loop, lambda status: srr._wake_event.set())
+        self.topology.start(loop, _on_display_events)
+
+        # what srr() does before entering the loop
+        cfg = await srr.load_config()
+        if cfg is not None:
+            plan = await srr.build_plan(cfg, srr.build_display_map())
+            await srr.switch_rate(srr.decide(srr.cur_power_state()), plan)
+
+        end = 0.0
+        for r in self.records[first:]:
+            if r["k"] in _INPUTS or r["k"] == eventtrace.COMMAND:
+                loop.call_at(r["t"], self.apply, r)
+                end = max(end, r["t"])
+
+        def _finish() -> None:
+            srr._shutdown_event.set()
+            srr._wake_event.set()
+
+        loop.call_at(end + self.settle, _finish)
+        await srr.srr_loop()
+        srr._retries.cancel_all()
+        self.on_idle()
+        return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def replay(
+    records: List[dict],
+    window: float = DEFAULT_WINDOW,
+    settle: float = DEFAULT_SETTLE,
+) -> Report:
+    if not records or records[0].get("k") != eventtrace.START:
+        raise ValueError("not an SRR trace: missing start record")
+    loop = VirtualTimeLoop()
+    started = time.perf_counter()
+    try:
+        with tempfile.TemporaryDirectory(prefix="srr-replay-") as workdir:
+            replayer = _Replayer(records, Path(workdir), settle)
+            loop.idle_callbacks.append(replayer.on_idle)
+            output = loop.run_until_complete(replayer.run())
+    finally:
+        loop.close()
+    return Report(
+        events=replayer.events,
+        virtual_seconds=loop.now,
+        wall_seconds=time.perf_counter() - started,
+        replayed=eventtrace.SwitchStats.of(output, window),
+        recorded=eventtrace.SwitchStats.of(records, window),
+        latency_ms=replayer.latency_ms,
+    )
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("trace", help="file recorded with SRR_TRACE=<path>")
+    parser.add_argument(
+        "--window",
+        type=float,
+        default=DEFAULT_WINDOW,
+        help="seconds within which switching back counts as redundant",
+    )
+    parser.add_argument(
+        "--settle",
+        type=float,
+        default=DEFAULT_SETTLE,
+        help="virtual seconds to keep running after the last event",
+    )
+    parser.add_argument("--json", action="store_true", help="print JSON")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log the loop")
+    args = parser.parse_args(argv[1:])
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(levelname)s %(message)s",
+    )
+    try:
+        report = replay(list(eventtrace.read(args.trace)), args.window, args.settle)
+    except (OSError, ValueError) as e:
+        print(f"cannot replay {args.trace}: {e}")
+        return 1
+    if args.json:
+        print(json.dumps(report.as_dict(), indent=2))
+    else:
+        for line in report.lines():
+            print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -1,9 +1,20 @@
+import array
 import ctypes
 import ctypes.wintypes
 import enum
-import winreg
+import functools
+import logging
+import threading
 
-user32 = ctypes.windll.user32
+import edid
+
+try:
+    import winreg
+
+    user32 = ctypes.windll.user32
+except (ImportError, AttributeError):  # not on Windows, use_backend() required
+    winreg = None
+    user32 = None
 
 CCHFORMNAME = 32
 CCHDEVICENAME = 32
@@ -119,79 +130,323 @@ class DISPLAY_DEVICE(ctypes.Structure):
     ]
 
 
-def get_active_displays() -> list:
+class DisplayBackend:
     """
-    Returns list of dicts for every active display:
-        adapter_name  : bytes  e.g. b'\\\\.\\DISPLAY1'
-        monitor_id    : str    stable hardware ID e.g. 'MONITOR\\LGD0521\\...'
-        monitor_string: str    human-readable name
+    Driver-level display operations. The module-level functions below (mode
+    table cache, transactions, friendly names) are built on whichever backend
+    is active; Win32Backend on Windows, anything else via use_backend().
+    """
+
+    name = "base"
+
+    def get_active_displays(self) -> list:
+        """See get_active_displays()."""
+        raise NotImplementedError
+
+    def get_display_settings(self, adapter_name, mode: int) -> tuple:
+        """(width, height, freq) at ENUM_CURRENT_SETTINGS/ENUM_REGISTRY_SETTINGS."""
+        raise NotImplementedError
+
+    def enum_display_modes(self, adapter_name) -> tuple:
+        """All supported (width, height, freq) modes, in driver order."""
+        raise NotImplementedError
+
+    def enum_display_modes_into(self, adapter_name, out: array.array) -> None:
+        """Append every mode to `out` as flat width, height, freq triples."""
+        for mode in self.enum_display_modes(adapter_name):
+            out.extend(mode)
+
+    def change_mode(
+        self, width: int, height: int, freq: int, adapter_name, flags: int
+    ) -> int:
+        """
+        ChangeDisplaySettingsExA semantics: flags 0 switches now,
+        CDS_UPDATEREGISTRY | CDS_NORESET only stages the registry mode.
+        """
+        raise NotImplementedError
+
+    def apply_staged(self) -> int:
+        """Apply every staged registry mode in one global mode set."""
+        raise NotImplementedError
+
+    def reset_defaults(self, adapter_names: list | None) -> None:
+        """Switch adapters (all if None) back to their registry mode."""
+        raise NotImplementedError
+
+    def read_edid(self, monitor_id: str) -> bytes | None:
+        raise NotImplementedError
+
+    def driver_identity(self, adapter_name) -> str | None:
+        """Changes when the adapter's driver is updated or reinstalled."""
+        return None
+
+
+class _Scratch(threading.local):
+    """
+    Structures reused by every Win32 call on one thread, so the switching hot
+    path passes byref() views of them instead of allocating a DEVMODE and a
+    pointer object per call. Display calls run on several lanes (threads).
     """
-    result = []
-    dd_adapter = DISPLAY_DEVICE()
-    dd_adapter.cb = ctypes.sizeof(dd_adapter)
-    adapter_idx = 0
 
-    while user32.EnumDisplayDevicesA(None, adapter_idx, ctypes.pointer(dd_adapter), 0):
-        adapter_idx += 1
-        if not (dd_adapter.StateFlags & DISPLAY_DEVICE_ACTIVE):
-            continue
+    def __init__(self):
+        self.devmode = DEVMODE()
+        self.adapter = DISPLAY_DEVICE()
+        self.adapter.cb = ctypes.sizeof(DISPLAY_DEVICE)
+        self.monitor = DISPLAY_DEVICE()
+        self.monitor.cb = ctypes.sizeof(DISPLAY_DEVICE)
+        self.modes = array.array("I")  # flat width, height, freq triples
+
+    def fresh_devmode(self) -> DEVMODE:
+        """
+        The thread's DEVMODE with the header reset. A driver may have written
+        dmDriverExtra (its private bytes, which we have no room for) and
+        dmFields on the previous call.
+        """
+        dm = self.devmode
+        dm.dmSize = _DEVMODE_SIZE
+        dm.dmDriverExtra = 0
+        dm.dmFields = 0
+        return dm
+
+
+_DEVMODE_SIZE = ctypes.sizeof(DEVMODE)
+_scratch = _Scratch()
+
 
-        adapter_name = dd_adapter.DeviceName  # bytes
+@functools.lru_cache(maxsize=64)
+def _device_text(raw: bytes) -> str:
+    """Decoded DISPLAY_DEVICE string; the same few ids come back every scan."""
+    return raw.decode("ascii", errors="replace").strip()
 
-        dd_monitor = DISPLAY_DEVICE()
-        dd_monitor.cb = ctypes.sizeof(dd_monitor)
-        monitor_idx = 0
+
+class Win32Backend(DisplayBackend):
+    name = "win32"
+
+    def get_active_displays(self) -> list:
+        result = []
+        scratch = _scratch
+        dd_adapter, dd_monitor = scratch.adapter, scratch.monitor
+        adapter_idx = 0
 
         while user32.EnumDisplayDevicesA(
-            adapter_name, monitor_idx, ctypes.pointer(dd_monitor), 0
+            None, adapter_idx, ctypes.byref(dd_adapter), 0
         ):
-            monitor_idx += 1
-            if dd_monitor.StateFlags & DISPLAY_DEVICE_ACTIVE:
-                monitor_id = (
-                    dd_monitor.DeviceID.decode("ascii", errors="replace")
-                    .strip("\x00")
-                    .strip()
-                )
-                monitor_string = (
-                    dd_monitor.DeviceString.decode("ascii", errors="replace")
-                    .strip("\x00")
-                    .strip()
-                )
-                result.append(
-                    {
-                        "adapter_name": adapter_name,
-                        "monitor_id": monitor_id,
-                        "monitor_string": monitor_string,
-                    }
-                )
-                break  # one active monitor per adapter is the common case
+            adapter_idx += 1
+            if not (dd_adapter.StateFlags & DISPLAY_DEVICE_ACTIVE):
+                continue
+
+            adapter_name = dd_adapter.DeviceName  # bytes, up to the first NUL
+            monitor_idx = 0
+
+            while user32.EnumDisplayDevicesA(
+                adapter_name, monitor_idx, ctypes.byref(dd_monitor), 0
+            ):
+                monitor_idx += 1
+                if dd_monitor.StateFlags & DISPLAY_DEVICE_ACTIVE:
+                    result.append(
+                        {
+                            "adapter_name": adapter_name,
+                            "monitor_id": _device_text(dd_monitor.DeviceID),
+                            "monitor_string": _device_text(dd_monitor.DeviceString),
+                        }
+                    )
+                    break  # one active monitor per adapter is the common case
+
+        return result
+
+    def get_display_settings(self, adapter_name, mode: int) -> tuple:
+        dm = _scratch.fresh_devmode()
+        # ENUM_*_SETTINGS are negative; the API takes them as DWORD
+        if not user32.EnumDisplaySettingsA(
+            adapter_name, mode & 0xFFFFFFFF, ctypes.byref(dm)
+        ):
+            raise RuntimeError(
+                f"EnumDisplaySettingsA failed for {adapter_name!r} mode {mode}"
+            )
+        return dm.dmPelsWidth, dm.dmPelsHeight, dm.dmDisplayFrequency
+
+    def enum_display_modes(self, adapter_name) -> tuple:
+        flat = array.array("I")
+        self.enum_display_modes_into(adapter_name, flat)
+        return tuple(zip(flat[0::3], flat[1::3], flat[2::3]))
+
+    def enum_display_modes_into(self, adapter_name, out: array.array) -> None:
+        dm = _scratch.fresh_devmode()
+        ref = ctypes.byref(dm)
+        i = 0
+        while user32.EnumDisplaySettingsA(adapter_name, i, ref) != 0:
+            out.append(dm.dmPelsWidth)
+            out.append(dm.dmPelsHeight)
+            out.append(dm.dmDisplayFrequency)
+            dm.dmDriverExtra = 0  # each call may report the driver's size again
+            i += 1
+
+    def change_mode(
+        self, width: int, height: int, freq: int, adapter_name, flags: int
+    ) -> int:
+        dm = _scratch.fresh_devmode()
+        ref = ctypes.byref(dm)
+
+        if not user32.EnumDisplaySettingsA(
+            adapter_name, ENUM_CURRENT_SETTINGS, ref
+        ):
+            raise RuntimeError(
+                f"Failed to get current display settings for {adapter_name!r}"
+            )
+
+        dm.dmPelsWidth = width
+        dm.dmPelsHeight = height
+        dm.dmDisplayFrequency = freq
+        dm.dmSize = _DEVMODE_SIZE
+        dm.dmDriverExtra = 0
+        dm.dmFields = DM_PELSWIDTH | DM_PELSHEIGHT | DM_DISPLAYFREQUENCY
+
+        return user32.ChangeDisplaySettingsExA(adapter_name, ref, None, flags, None)
+
+    def apply_staged(self) -> int:
+        return user32.ChangeDisplaySettingsExA(None, None, None, 0, None)
+
+    def reset_defaults(self, adapter_names: list | None) -> None:
+        if not adapter_names:
+            user32.ChangeDisplaySettingsA(None, 0)
+            return
+        for name in adapter_names:
+            user32.ChangeDisplaySettingsExA(name, None, None, 0, None)
+
+    def read_edid(self, monitor_id: str) -> bytes | None:
+        parts = [p for p in monitor_id.split("\\") if p]
+        if len(parts) < 3:
+            return None
+        model, instance = parts[1], parts[2]
+        reg_path = (
+            f"SYSTEM\\CurrentControlSet\\Enum\\DISPLAY\\{model}\\{instance}"
+            "\\Device Parameters"
+        )
+        try:
+            with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, reg_path) as key:
+                edid_data, _ = winreg.QueryValueEx(key, "EDID")
+        except OSError:
+            return None
+        return bytes(edid_data)
+
+    def driver_identity(self, adapter_name) -> str | None:
+        dd = _scratch.adapter
+        idx = 0
+        while user32.EnumDisplayDevicesA(None, idx, ctypes.byref(dd), 0):
+            idx += 1
+            if dd.DeviceName == adapter_name:
+                break
+        else:
+            return None
+        # \Registry\Machine\System\CurrentControlSet\Control\Video\{guid}\0000
+        device_key = _device_text(dd.DeviceKey)
+        parts = [device_key]
+        prefix = "\\registry\\machine\\"
+        if device_key.lower().startswith(prefix):
+            try:
+                with winreg.OpenKey(
+                    winreg.HKEY_LOCAL_MACHINE, device_key[len(prefix) :]
+                ) as key:
+                    for value in ("DriverVersion", "DriverDate"):
+                        try:
+                            parts.append(str(winreg.QueryValueEx(key, value)[0]))
+                        except OSError:
+                            parts.append("")
+            except OSError:
+                pass
+        return "|".join(parts)
+
+
+_backend: DisplayBackend | None = Win32Backend() if user32 is not None else None
+
+
+def use_backend(backend: DisplayBackend) -> None:
+    """Route every display call through `backend` and drop cached state."""
+    global _backend
+    _backend = backend
+    invalidate_mode_cache()
+    _original_registry_modes.clear()
+
+
+def get_backend() -> DisplayBackend:
+    if _backend is None:
+        raise RuntimeError(
+            "no display backend on this platform; call reschanger.use_backend()"
+        )
+    return _backend
 
-    return result
+
+def get_active_displays() -> list:
+    """
+    Returns list of dicts for every active display:
+        adapter_name  : bytes  e.g. b'\\\\.\\DISPLAY1'
+        monitor_id    : str    stable hardware ID e.g. 'MONITOR\\LGD0521\\...'
+        monitor_string: str    human-readable name
+    """
+    return get_backend().get_active_displays()
+
+
+def driver_identity(adapter_name) -> str | None:
+    """Display driver key, version and date of adapter_name, or None."""
+    return get_backend().driver_identity(adapter_name)
 
 
 def get_display_settings(adapter_name, mode: int) -> tuple:
     """Return (width, height, freq) for adapter_name at the given mode constant."""
-    dm = DEVMODE()
-    dm.dmSize = ctypes.sizeof(dm)
-    if not user32.EnumDisplaySettingsA(
-        adapter_name, ctypes.c_uint32(mode).value, ctypes.pointer(dm)
-    ):
-        raise RuntimeError(
-            f"EnumDisplaySettingsA failed for {adapter_name!r} mode {mode}"
-        )
-    return dm.dmPelsWidth, dm.dmPelsHeight, dm.dmDisplayFrequency
+    return get_backend().get_display_settings(adapter_name, mode)
 
 
 def enum_display_modes(adapter_name) -> tuple:
     """Return all supported (width, height, freq) modes for the given adapter."""
-    dm = DEVMODE()
-    dm.dmSize = ctypes.sizeof(dm)
-    modes = []
-    i = 0
-    while user32.EnumDisplaySettingsA(adapter_name, i, ctypes.pointer(dm)) != 0:
-        modes.append((dm.dmPelsWidth, dm.dmPelsHeight, dm.dmDisplayFrequency))
-        i += 1
-    return tuple(modes)
+    return get_backend().enum_display_modes(adapter_name)
+
+
+# adapter_name -> {(width, height): frozenset of supported freqs}
+_mode_cache: dict[bytes, dict[tuple[int, int], frozenset]] = {}
+mode_cache_stats = {"hits": 0, "misses": 0}
+
+
+def get_mode_table(adapter_name) -> dict:
+    """
+    Return {(width, height): frozenset(freqs)} for adapter_name.
+    The table is built from a single enum_display_modes walk and cached until
+    invalidate_mode_cache() is called for the adapter.
+    """
+    table = _mode_cache.get(adapter_name)
+    if table is not None:
+        mode_cache_stats["hits"] += 1
+        return table
+
+    mode_cache_stats["misses"] += 1
+    flat = _scratch.modes
+    del flat[:]
+    get_backend().enum_display_modes_into(adapter_name, flat)
+    grouped: dict[tuple[int, int], set] = {}
+    it = iter(flat)
+    for w, h, freq in zip(it, it, it):
+        grouped.setdefault((w, h), set()).add(freq)
+    del flat[:]
+    table = {res: frozenset(freqs) for res, freqs in grouped.items()}
+    _mode_cache[adapter_name] = table
+    return table
+
+
+def prime_mode_cache(adapter_name, table: dict) -> None:
+    """Seed the cache with a table known to be current (e.g. from disk)."""
+    _mode_cache[adapter_name] = table
+
+
+def has_mode(adapter_name, width: int, height: int, freq: int) -> bool:
+    return freq in get_mode_table(adapter_name).get((width, height), ())
+
+
+def invalidate_mode_cache(adapter_names=None) -> None:
+    """Drop cached mode tables for adapter_names, or for every adapter if None."""
+    if adapter_names is None:
+        _mode_cache.clear()
+        return
+    for name in adapter_names:
+        _mode_cache.pop(name, None)
 
 
 def best_powersave_freq(adapter_name, width: int, height: int) -> int:
@@ -199,51 +454,223 @@ def best_powersave_freq(adapter_name, width: int, height: int) -> int:
     Highest refresh rate <= 60 Hz available at (width, height) on adapter_name.
     Falls back to the lowest available freq if nothing <= 60 exists.
     """
-    modes = enum_display_modes(adapter_name)
-    freqs = sorted(
-        {freq for w, h, freq in modes if w == width and h == height}, reverse=True
-    )
+    freqs = sorted(get_mode_table(adapter_name).get((width, height), ()), reverse=True)
     candidates = [f for f in freqs if f <= 60]
     if candidates:
         return candidates[0]
     return freqs[-1] if freqs else 60
 
 
+# adapter_name -> registry (width, height, freq) before SRR first staged a mode
+_original_registry_modes: dict[bytes, tuple] = {}
+_originals_lock = threading.Lock()
+# called with a copy of _original_registry_modes whenever it changes, before
+# the registry write that needed the new entry (see persist_original_modes)
+_originals_store = None
+mode_commit_stats = {"commits": 0, "rollbacks": 0}
+
+
+def persist_original_modes(store) -> None:
+    """
+    Have `store(originals)` save the original registry modes whenever they
+    change, so a crash or kill between a staged mode and set_display_defaults
+    does not leave SRR's mode as the desktop default.
+    """
+    global _originals_store
+    _originals_store = store
+
+
+def original_modes() -> dict[bytes, tuple]:
+    with _originals_lock:
+        return dict(_original_registry_modes)
+
+
+def _remember_original(adapter_name, previous: tuple) -> None:
+    with _originals_lock:
+        if adapter_name in _original_registry_modes:
+            return
+        _original_registry_modes[adapter_name] = previous
+        _save_originals()
+
+
+def _save_originals() -> None:
+    if _originals_store is not None:
+        try:
+            _originals_store(dict(_original_registry_modes))
+        except Exception as e:
+            logging.warning(f"saving original registry modes failed: {e}")
+
+
+def restore_original_modes(originals: dict[bytes, tuple]) -> list:
+    """
+    Put back registry modes left behind by a run that never reached
+    set_display_defaults. Originals of adapters that are not attached now are
+    kept for a later exit. Returns the adapters that were restored.
+    """
+    with _originals_lock:
+        for name, mode in originals.items():
+            _original_registry_modes.setdefault(name, tuple(mode))
+    active = {d["adapter_name"] for d in get_active_displays()}
+    present = [name for name in originals if name in active]
+    if present:
+        set_display_defaults(present)
+    return present
+
+
 def set_display_defaults(adapter_names: list | None = None) -> None:
-    """Reset display(s) to their default settings."""
-    if not adapter_names:
-        user32.ChangeDisplaySettingsA(None, 0)
-        return
-    for name in adapter_names:
-        user32.ChangeDisplaySettingsExA(name, None, None, 0, None)
+    """
+    Reset display(s) to their default settings. Registry modes overwritten by
+    a ModeTransaction are put back first, so defaults are the pre-SRR ones.
+    """
+    with _originals_lock:
+        names = adapter_names or list(_original_registry_modes)
+        restored = {
+            name: _original_registry_modes.pop(name)
+            for name in names
+            if name in _original_registry_modes
+        }
+    for name, original in restored.items():
+        _change_mode(*original, name, CDS_UPDATEREGISTRY | CDS_NORESET)
+    get_backend().reset_defaults(adapter_names)
+    if restored:
+        with _originals_lock:
+            _save_originals()
+
+
+def _change_mode(width: int, height: int, freq: int, adapter_name, flags: int) -> int:
+    return get_backend().change_mode(width, height, freq, adapter_name, flags)
+
+
+def _apply_staged() -> int:
+    """Apply every staged registry mode in one global mode set."""
+    mode_commit_stats["commits"] += 1
+    return get_backend().apply_staged()
 
 
 def set_resolution(width: int, height: int, freq: int, adapter_name) -> int:
     """
-    Set the resolution of a specific display.
+    Set the resolution of a specific display immediately.
     adapter_name: bytes, e.g. b'\\\\.\\DISPLAY1'
     """
-    dm = DEVMODE()
-    dm.dmSize = ctypes.sizeof(dm)
-
-    if not user32.EnumDisplaySettingsA(
-        adapter_name, ENUM_CURRENT_SETTINGS, ctypes.pointer(dm)
-    ):
-        raise RuntimeError(
-            f"Failed to get current display settings for {adapter_name!r}"
-        )
-
-    if (width, height, freq) not in enum_display_modes(adapter_name):
+    if not has_mode(adapter_name, width, height, freq):
         return DISP_RESULTS.DISP_CHANGE_BADPARAM
+    mode_commit_stats["commits"] += 1
+    return _change_mode(width, height, freq, adapter_name, 0)
 
-    dm.dmPelsWidth = width
-    dm.dmPelsHeight = height
-    dm.dmDisplayFrequency = freq
-    dm.dmFields = DM_PELSWIDTH | DM_PELSHEIGHT | DM_DISPLAYFREQUENCY
 
-    return user32.ChangeDisplaySettingsExA(
-        adapter_name, ctypes.byref(dm), None, 0, None
-    )
+class ModeTransaction:
+    """
+    Stages mode changes for several adapters with CDS_UPDATEREGISTRY |
+    CDS_NORESET and applies them all with one global mode set on commit(),
+    so the display pipeline re-trains once instead of once per monitor.
+
+    A mode missing from the adapter's mode table is rejected by stage() with
+    DISP_CHANGE_BADPARAM without affecting the transaction. Any other stage
+    failure makes commit() restore the registry modes of the adapters that
+    were already staged and apply nothing. Leaving a `with` block without
+    committing rolls back as well.
+
+    stage() may run concurrently for different adapters (one thread each);
+    commit() and rollback() must run after every stage() has returned.
+    exclude_failed() lets the successful stages be committed on their own.
+    """
+
+    def __init__(self):
+        self._staged: dict[bytes, tuple] = {}  # adapter -> registry mode to restore
+        self._failed = False
+        self._lock = threading.Lock()
+        self.results: dict[bytes, int] = {}
+
+    def __enter__(self) -> "ModeTransaction":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self._staged:
+            self.rollback()
+
+    @property
+    def staged(self) -> list:
+        return list(self._staged)
+
+    def stage(self, width: int, height: int, freq: int, adapter_name) -> int:
+        if not has_mode(adapter_name, width, height, freq):
+            with self._lock:
+                self.results[adapter_name] = DISP_RESULTS.DISP_CHANGE_BADPARAM
+            return DISP_RESULTS.DISP_CHANGE_BADPARAM
+
+        previous = get_display_settings(adapter_name, ENUM_REGISTRY_SETTINGS)
+        _remember_original(adapter_name, previous)  # persisted before the write
+        res = _change_mode(
+            width, height, freq, adapter_name, CDS_UPDATEREGISTRY | CDS_NORESET
+        )
+        with self._lock:
+            self.results[adapter_name] = res
+            if res == DISP_RESULTS.DISP_CHANGE_SUCCESSFUL:
+                self._staged.setdefault(adapter_name, previous)
+            else:
+                self._failed = True
+        return res
+
+    def exclude_failed(self) -> list:
+        """Forget failed stages (nothing was written for them); returns them."""
+        with self._lock:
+            failed = [
+                a
+                for a, res in self.results.items()
+                if res
+                not in (
+                    DISP_RESULTS.DISP_CHANGE_SUCCESSFUL,
+                    DISP_RESULTS.DISP_CHANGE_BADPARAM,
+                )
+            ]
+            self._failed = False
+        return failed
+
+    def commit(self) -> int:
+        if not self._staged:
+            return (
+                DISP_RESULTS.DISP_CHANGE_FAILED
+                if self._failed
+                else DISP_RESULTS.DISP_CHANGE_SUCCESSFUL
+            )
+        if self._failed:
+            self.rollback()
+            return DISP_RESULTS.DISP_CHANGE_FAILED
+
+        res = _apply_staged()
+        if res == DISP_RESULTS.DISP_CHANGE_SUCCESSFUL:
+            self._staged.clear()
+        else:
+            self.rollback(apply=True)
+        return res
+
+    def rollback(self, apply: bool = False) -> None:
+        """Restore staged adapters' registry modes; re-apply them if `apply`."""
+        mode_commit_stats["rollbacks"] += 1
+        for adapter_name, previous in self._staged.items():
+            _change_mode(*previous, adapter_name, CDS_UPDATEREGISTRY | CDS_NORESET)
+        self._staged.clear()
+        if apply:
+            _apply_staged()
+
+
+def read_monitor_edid(monitor_id: str) -> bytes | None:
+    """Raw EDID bytes of a monitor (from the registry on Win32), or None."""
+    return get_backend().read_edid(monitor_id)
+
+
+def get_monitor_edid(monitor_id: str) -> edid.EdidInfo | None:
+    """
+    Parsed EDID of a monitor, or None.
+    Parsing is cached by the EDID bytes' hash, so each panel is parsed once.
+    """
+    data = read_monitor_edid(monitor_id)
+    if not data:
+        return None
+    try:
+        return edid.parse_cached(data)
+    except edid.EdidError:
+        return None
 
 
 def get_monitor_friendly_name(monitor_id: str) -> str | None:
@@ -252,32 +679,23 @@ def get_monitor_friendly_name(monitor_id: str) -> str | None:
     Returns e.g. 'LG ULTRAFINE' or None if unavailable.
     monitor_id: value from get_active_displays(), e.g. 'MONITOR\\LGD0521\\4&abc&0&UID0'
     """
-    parts = [p for p in monitor_id.split("\\") if p]
-    if len(parts) < 3:
-        return None
-    model, instance = parts[1], parts[2]
-    reg_path = (
-        f"SYSTEM\\CurrentControlSet\\Enum\\DISPLAY\\{model}\\{instance}"
-        "\\Device Parameters"
-    )
-    try:
-        with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, reg_path) as key:
-            edid_data, _ = winreg.QueryValueEx(key, "EDID")
-    except OSError:
-        return None
-
-    if len(edid_data) < 128:
-        return None
+    info = get_monitor_edid(monitor_id)
+    return info.name if info is not None else None
 
-    # Scan the 4 descriptor blocks (offset 54, each 18 bytes) for tag 0xFC (monitor name)
-    for i in range(4):
-        base = 54 + i * 18
-        if edid_data[base:base + 3] == b"\x00\x00\x00" and edid_data[base + 3] == 0xFC:
-            raw = edid_data[base + 5 : base + 18]
-            name = raw.decode("ascii", errors="replace").split("\n")[0].strip()
-            return name or None
 
-    return None
+def propose_powersave_freq(
+    adapter_name, monitor_id: str, width: int, height: int, freq: int
+) -> int:
+    """
+    best_powersave_freq() for a panel currently at `freq`, answered from the
+    EDID range limits when they already settle it (a panel that cannot go
+    above 60 Hz keeps its current rate) instead of walking the mode list.
+    """
+    info = get_monitor_edid(monitor_id)
+    if info is not None and info.max_vrefresh is not None:
+        if info.max_vrefresh <= 60 and freq == info.max_vrefresh:
+            return freq
+    return best_powersave_freq(adapter_name, width, height)
 
 
 if __name__ == "__main__":
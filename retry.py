@@ -0,0 +1,94 @@
+"""Per-display retry scheduler with bounded exponential backoff and jitter."""
+
+import asyncio
+import logging
+import random
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+# apply(key, target) -> True once the target is in effect
+ApplyFunc = Callable[[Hashable, Any], Awaitable[bool]]
+
+
+class RetryScheduler:
+    """
+    Tracks at most one pending target per key (display). Scheduling a key
+    replaces whatever was pending for it, so a retry never applies a target
+    that a newer one has superseded, and one failing display never delays
+    the others: every key retries on its own timer task.
+    """
+
+    def __init__(
+        self,
+        apply: ApplyFunc,
+        base_delay: float = 2.0,
+        factor: float = 2.0,
+        max_delay: float = 60.0,
+        max_attempts: int = 6,
+        jitter: float = 0.25,
+    ):
+        self._apply = apply
+        self.base_delay = base_delay
+        self.factor = factor
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.jitter = jitter
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self._targets: Dict[Hashable, Any] = {}
+        self.stats = {"scheduled": 0, "succeeded": 0, "cancelled": 0, "gave_up": 0}
+
+    def delay(self, attempt: int) -> float:
+        """Backoff before `attempt` (1-based), jittered by +/- `jitter`."""
+        d = min(self.max_delay, self.base_delay * self.factor ** (attempt - 1))
+        return d * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def pending(self) -> Dict[Hashable, Any]:
+        return dict(self._targets)
+
+    def schedule(self, key: Hashable, target: Any) -> None:
+        """Retry `target` for `key` in the background, replacing any pending one."""
+        self.cancel(key)
+        self.stats["scheduled"] += 1
+        self._targets[key] = target
+        self._tasks[key] = asyncio.get_running_loop().create_task(
+            self._run(key, target)
+        )
+
+    def cancel(self, key: Hashable) -> bool:
+        """Drop the pending retry for `key`; True if there was one."""
+        task = self._tasks.pop(key, None)
+        self._targets.pop(key, None)
+        if task is None:
+            return False
+        if task is not asyncio.current_task():
+            task.cancel()
+        self.stats["cancelled"] += 1
+        return True
+
+    def cancel_all(self) -> None:
+        for key in list(self._tasks):
+            self.cancel(key)
+
+    async def _run(self, key: Hashable, target: Any) -> None:
+        for attempt in range(1, self.max_attempts + 1):
+            delay = self.delay(attempt)
+            logging.info(
+                f"retry {attempt}/{self.max_attempts} for {key!r} in {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
+            try:
+                ok = await self._apply(key, target)
+            except Exception as e:
+                logging.warning(f"retry for {key!r} raised: {e}")
+                ok = False
+            if ok:
+                self.stats["succeeded"] += 1
+                break
+        else:
+            logging.error(f"giving up on {key!r} -> {target} after {attempt} attempts")
+            self.stats["gave_up"] += 1
+        self._forget(key)
+
+    def _forget(self, key: Hashable) -> None:
+        if self._tasks.get(key) is asyncio.current_task():
+            del self._tasks[key]
+            self._targets.pop(key, None)
@@ -0,0 +1,163 @@
+"""
+One timer heap for SRR's periodic checks (the polling fallbacks used where no
+OS notification exists). Every job keeps its own interval: it doubles while
+the check reports no change, up to the job's cap (a much longer one while the
+source is unavailable, e.g. no battery on a desktop), and snaps back to the
+base interval as soon as the check sees a change. Jobs due within COALESCE
+seconds of each other run on the same wakeup.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+CHANGED = "changed"
+UNCHANGED = "unchanged"
+UNAVAILABLE = "unavailable"
+
+BACKOFF = 2.0
+MAX_SLOWDOWN = 4  # default cap: base interval * MAX_SLOWDOWN
+UNAVAILABLE_INTERVAL = 600.0  # seconds
+COALESCE = 1.0  # seconds a job may run early to share a wakeup
+
+
+class Job:
+    def __init__(
+        self,
+        owner: "Scheduler",
+        name: str,
+        check: Callable[[], str],
+        interval: float,
+        max_interval: float,
+        unavailable_interval: float,
+    ):
+        self._owner = owner
+        self.name = name
+        self.check = check
+        self.interval = interval
+        self.max_interval = max(interval, max_interval)
+        self.unavailable_interval = max(self.max_interval, unavailable_interval)
+        self.current = interval
+        self.due = 0.0
+        self.runs = 0
+        self.changes = 0
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+        self._owner._arm()
+
+    def _next_interval(self, result: str) -> float:
+        if result == CHANGED:
+            return self.interval
+        cap = self.unavailable_interval if result == UNAVAILABLE else self.max_interval
+        return min(cap, self.current * BACKOFF)
+
+
+class Scheduler:
+    """Runs jobs from one asyncio timer armed for the earliest due job."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self._heap: List[Tuple[float, int, Job]] = []
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._jobs: List[Job] = []
+        self.started = loop.time()
+        self.wakeups = 0
+
+    def add(
+        self,
+        name: str,
+        check: Callable[[], str],
+        interval: float,
+        max_interval: Optional[float] = None,
+        unavailable_interval: float = UNAVAILABLE_INTERVAL,
+    ) -> Job:
+        """
+        Run `check` every `interval` seconds, backing off up to `max_interval`
+        (default interval * MAX_SLOWDOWN). `check` runs on the loop thread and
+        returns CHANGED, UNCHANGED or UNAVAILABLE.
+        """
+        job = Job(
+            self,
+            name,
+            check,
+            interval,
+            max_interval if max_interval is not None else interval * MAX_SLOWDOWN,
+            unavailable_interval,
+        )
+        job.due = self.loop.time() + interval
+        self._jobs.append(job)
+        self._push(job)
+        self._arm()
+        return job
+
+    def _push(self, job: Job) -> None:
+        heapq.heappush(self._heap, (job.due, next(self._seq), job))
+
+    def _arm(self) -> None:
+        while self._heap and self._heap[0][2].cancelled:
+            heapq.heappop(self._heap)
+        self._jobs = [j for j in self._jobs if not j.cancelled]
+        due = self._heap[0][0] if self._heap else None
+        if self._timer is not None:
+            if due is not None and self._timer.when() == due:
+                return
+            self._timer.cancel()
+            self._timer = None
+        if due is not None and not self.loop.is_closed():
+            self._timer = self.loop.call_at(due, self._fire)
+
+    def _fire(self) -> None:
+        self._timer = None
+        self.wakeups += 1
+        now = self.loop.time()
+        ran = []
+        while self._heap and self._heap[0][0] <= now + COALESCE:
+            job = heapq.heappop(self._heap)[2]
+            if job.cancelled:
+                continue
+            try:
+                result = job.check()
+            except Exception as e:
+                logging.warning(f"scheduler: {job.name} check failed: {e}")
+                result = UNAVAILABLE
+            job.runs += 1
+            if result == CHANGED:
+                job.changes += 1
+            job.current = job._next_interval(result)
+            job.due = now + job.current
+            ran.append(job)
+        for job in ran:  # pushed afterwards: a job runs at most once per wakeup
+            if not job.cancelled:
+                self._push(job)
+        self._arm()
+
+    def wakeups_per_hour(self) -> float:
+        elapsed = self.loop.time() - self.started
+        return self.wakeups * 3600 / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def stats(self) -> Dict[str, object]:
+        return {
+            "wakeups": self.wakeups,
+            "wakeups_per_hour": round(self.wakeups_per_hour(), 1),
+            "jobs": {
+                j.name: {"interval": j.current, "runs": j.runs, "changes": j.changes}
+                for j in self._jobs
+            },
+        }
+
+
+_shared: Optional[Scheduler] = None
+
+
+def shared(loop: asyncio.AbstractEventLoop) -> Scheduler:
+    """Process-wide scheduler on `loop`, so all periodic checks share a timer."""
+    global _shared
+    if _shared is None or _shared.loop is not loop:
+        _shared = Scheduler(loop)
+    return _shared
@@ -0,0 +1,234 @@
+"""
+In-memory simulated display driver. Plugs into reschanger.use_backend() so
+the switching logic can run, be profiled and benchmarked off Windows.
+"""
+
+import collections
+import dataclasses
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import reschanger
+from reschanger import (
+    CDS_NORESET,
+    CDS_UPDATEREGISTRY,
+    DISP_RESULTS,
+    ENUM_CURRENT_SETTINGS,
+    ENUM_REGISTRY_SETTINGS,
+)
+
+Mode = Tuple[int, int, int]
+
+DEFAULT_MODES: Tuple[Mode, ...] = (
+    (1920, 1080, 60),
+    (1920, 1080, 120),
+    (1920, 1080, 144),
+    (1920, 1080, 165),
+    (1600, 900, 60),
+    (1280, 720, 60),
+)
+
+
+@dataclasses.dataclass
+class SimulatedDisplay:
+    monitor_id: str
+    adapter_name: bytes
+    monitor_string: str = "Generic PnP Monitor"
+    modes: Tuple[Mode, ...] = DEFAULT_MODES
+    current: Optional[Mode] = None  # defaults to the last (highest) mode
+    registry: Optional[Mode] = None  # defaults to `current`
+    edid: Optional[bytes] = None
+    driver: str = "simulated 1.0"  # change to simulate a driver update
+    pending: bool = False  # registry mode staged but not applied yet
+
+    def __post_init__(self):
+        if self.current is None:
+            self.current = max(self.modes)
+        if self.registry is None:
+            self.registry = self.current
+
+
+class SimulatedBackend(reschanger.DisplayBackend):
+    """
+    Behaves like the Win32 driver API: staged registry modes, a global apply,
+    registry resets. `latency` (seconds, either one value or per operation
+    name) is spent blocking in every call, like a slow driver would.
+    `mode_sets` counts how many times a panel actually changed mode.
+    """
+
+    name = "simulated"
+
+    def __init__(
+        self,
+        displays: List[SimulatedDisplay] = (),
+        latency: "float | Dict[str, float]" = 0.0,
+    ):
+        self.displays: Dict[bytes, SimulatedDisplay] = {
+            d.adapter_name: d for d in displays
+        }
+        self.latency = latency
+        self.calls: collections.Counter = collections.Counter()
+        self.mode_sets = 0
+        self.applies = 0
+        self._failures: list = []  # [op, adapter_name or None, result, times]
+        self._lock = threading.RLock()
+
+    @classmethod
+    def fleet(cls, count: int, modes: Tuple[Mode, ...] = DEFAULT_MODES, **kwargs):
+        """`count` identical virtual monitors on DISPLAY1..DISPLAY<count>."""
+        return cls(
+            [
+                SimulatedDisplay(
+                    monitor_id=f"MONITOR\\SIM{i:04d}\\{{sim}}\\{i:04d}",
+                    adapter_name=f"\\\\.\\DISPLAY{i + 1}".encode(),
+                    monitor_string=f"Simulated Monitor {i + 1}",
+                    modes=modes,
+                )
+                for i in range(count)
+            ],
+            **kwargs,
+        )
+
+    # --- scripting ----------------------------------------------------
+
+    def plug(self, display: SimulatedDisplay) -> None:
+        with self._lock:
+            self.displays[display.adapter_name] = display
+
+    def unplug(self, adapter_name: bytes) -> None:
+        with self._lock:
+            self.displays.pop(adapter_name, None)
+
+    def inject_failure(
+        self,
+        op: str,
+        adapter_name: Optional[bytes] = None,
+        result: int = DISP_RESULTS.DISP_CHANGE_FAILED,
+        times: int = 1,
+    ) -> None:
+        """
+        Make the next `times` calls of `op` (on `adapter_name`, or any) fail.
+        change_mode/apply_staged return `result`; other operations raise
+        RuntimeError like their Win32 counterparts.
+        """
+        with self._lock:
+            self._failures.append([op, adapter_name, result, times])
+
+    def _enter(self, op: str, adapter_name: Optional[bytes] = None) -> Optional[int]:
+        """Count the call, spend its latency, return an injected failure if any."""
+        latency = (
+            self.latency.get(op, 0.0)
+            if isinstance(self.latency, dict)
+            else self.latency
+        )
+        if latency:
+            time.sleep(latency)
+        with self._lock:
+            self.calls[op] += 1
+            for failure in self._failures:
+                f_op, f_adapter, result, times = failure
+                if f_op == op and f_adapter in (None, adapter_name) and times > 0:
+                    failure[3] -= 1
+                    return result
+        return None
+
+    def _display(self, adapter_name: bytes) -> SimulatedDisplay:
+        d = self.displays.get(adapter_name)
+        if d is None:
+            raise RuntimeError(f"no simulated display on {adapter_name!r}")
+        return d
+
+    def _set_current(self, d: SimulatedDisplay, mode: Mode) -> None:
+        if d.current != mode:
+            d.current = mode
+            self.mode_sets += 1
+
+    # --- DisplayBackend -----------------------------------------------
+
+    def get_active_displays(self) -> list:
+        if self._enter("get_active_displays") is not None:
+            raise RuntimeError("EnumDisplayDevicesA failed (injected)")
+        with self._lock:
+            return [
+                {
+                    "adapter_name": d.adapter_name,
+                    "monitor_id": d.monitor_id,
+                    "monitor_string": d.monitor_string,
+                }
+                for d in self.displays.values()
+            ]
+
+    def get_display_settings(self, adapter_name, mode: int) -> tuple:
+        if self._enter("get_display_settings", adapter_name) is not None:
+            raise RuntimeError(
+                f"EnumDisplaySettingsA failed for {adapter_name!r} mode {mode}"
+            )
+        with self._lock:
+            d = self._display(adapter_name)
+            if mode == ENUM_CURRENT_SETTINGS:
+                return d.current
+            if mode == ENUM_REGISTRY_SETTINGS:
+                return d.registry
+            return d.modes[mode]
+
+    def enum_display_modes(self, adapter_name) -> tuple:
+        if self._enter("enum_display_modes", adapter_name) is not None:
+            return ()
+        with self._lock:
+            return tuple(self._display(adapter_name).modes)
+
+    def change_mode(
+        self, width: int, height: int, freq: int, adapter_name, flags: int
+    ) -> int:
+        failure = self._enter("change_mode", adapter_name)
+        if failure is not None:
+            return failure
+        mode = (width, height, freq)
+        with self._lock:
+            d = self._display(adapter_name)
+            if mode not in d.modes:
+                return DISP_RESULTS.DISP_CHANGE_BADMODE
+            if flags & CDS_UPDATEREGISTRY:
+                d.registry = mode
+            if flags & CDS_NORESET:
+                d.pending = True
+            else:
+                d.pending = False
+                self._set_current(d, mode)
+        return DISP_RESULTS.DISP_CHANGE_SUCCESSFUL
+
+    def apply_staged(self) -> int:
+        failure = self._enter("apply_staged")
+        if failure is not None:
+            return failure
+        with self._lock:
+            self.applies += 1
+            for d in self.displays.values():
+                if d.pending:
+                    d.pending = False
+                    self._set_current(d, d.registry)
+        return DISP_RESULTS.DISP_CHANGE_SUCCESSFUL
+
+    def reset_defaults(self, adapter_names: list | None) -> None:
+        self._enter("reset_defaults")
+        with self._lock:
+            for name in adapter_names or list(self.displays):
+                d = self.displays.get(name)
+                if d is not None:
+                    d.pending = False
+                    self._set_current(d, d.registry)
+
+    def read_edid(self, monitor_id: str) -> bytes | None:
+        self._enter("read_edid")
+        with self._lock:
+            for d in self.displays.values():
+                if d.monitor_id == monitor_id:
+                    return d.edid
+        return None
+
+    def driver_identity(self, adapter_name) -> str | None:
+        self._enter("driver_identity", adapter_name)
+        with self._lock:
+            d = self.displays.get(adapter_name)
+            return d.driver if d is not None else None
@@ -0,0 +1,240 @@
+"""
+Battery drain telemetry per applied display mode.
+
+Samples (time, battery percent, time left, display, mode) live in a
+fixed-capacity ring of packed records backed by one bytearray, so memory is
+bounded regardless of uptime, and are persisted as a small binary file.
+
+    python telemetry.py [path/to/telemetry.bin]
+
+prints the estimated drain rate per display and mode.
+"""
+
+import dataclasses
+import logging
+import os
+import struct
+import sys
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+MAGIC = b"SRRT"
+VERSION = 1
+DEFAULT_CAPACITY = 8192  # records, ~170 KiB
+
+# magic, version, record size, capacity, head (next write slot), count
+_HEADER = struct.Struct("<4sHHIII")
+# unix time, percent * 100, seconds left (-1 unknown), monitor id crc32,
+# w, h, hz, plugged
+_RECORD = struct.Struct("<IHiIHHHB")
+
+# consecutive samples further apart than this (sleep, shutdown) are not
+# treated as continuous discharge
+MAX_GAP = 30 * 60  # seconds
+
+Mode = Tuple[int, int, int]
+
+
+def display_key(monitor_id: str) -> int:
+    return zlib.crc32(monitor_id.encode("utf-8", errors="replace"))
+
+
+@dataclasses.dataclass(frozen=True)
+class Sample:
+    time: int
+    percent: float
+    secsleft: Optional[int]
+    display: int  # display_key of the monitor id
+    mode: Mode
+    plugged: bool
+
+
+@dataclasses.dataclass
+class DrainStats:
+    display: int
+    mode: Mode
+    seconds: float = 0.0
+    percent: float = 0.0  # total percentage points drained
+    samples: int = 0
+
+    @property
+    def percent_per_hour(self) -> Optional[float]:
+        if self.seconds <= 0:
+            return None
+        return self.percent * 3600 / self.seconds
+
+
+class TelemetryRing:
+    """
+    Ring buffer of packed battery samples. Callers record discharge samples
+    plus one plugged sample per charge, which ends the discharge interval.
+    """
+
+    def __init__(self, path: Path, capacity: int = DEFAULT_CAPACITY):
+        self.path = path
+        self.capacity = capacity
+        self._buf = bytearray(capacity * _RECORD.size)
+        self._head = 0
+        self._count = 0
+        self.unsaved = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @classmethod
+    def load(cls, path: Path, capacity: int = DEFAULT_CAPACITY) -> "TelemetryRing":
+        """Missing, corrupt or other-version files give an empty ring."""
+        ring = cls(path, capacity)
+        try:
+            with open(path, "rb") as f:
+                header = f.read(_HEADER.size)
+                data = f.read()
+        except FileNotFoundError:
+            return ring
+        except OSError as e:
+            logging.warning(f"telemetry unreadable, starting over: {e}")
+            return ring
+        try:
+            magic, version, rsize, cap, head, count = _HEADER.unpack(header)
+        except struct.error:
+            logging.warning("telemetry header truncated, starting over")
+            return ring
+        if (magic, version, rsize) != (MAGIC, VERSION, _RECORD.size):
+            logging.info(f"telemetry format {version!r} ignored")
+            return ring
+        if len(data) != cap * rsize or count > cap or head >= max(cap, 1):
+            logging.warning("telemetry file inconsistent, starting over")
+            return ring
+        # re-append oldest first so a changed capacity keeps the newest records
+        old = cls(path, cap)
+        old._buf[:] = data
+        old._head, old._count = head, count
+        for raw in old._raw_records():
+            ring._append_raw(raw)
+        ring.unsaved = 0
+        return ring
+
+    def _raw_records(self) -> Iterator[bytes]:
+        start = (self._head - self._count) % self.capacity
+        size = _RECORD.size
+        for i in range(self._count):
+            off = ((start + i) % self.capacity) * size
+            yield bytes(self._buf[off:off + size])
+
+    def _advance(self) -> None:
+        self._head = (self._head + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+        self.unsaved += 1
+
+    def _append_raw(self, raw: bytes) -> None:
+        off = self._head * _RECORD.size
+        self._buf[off:off + _RECORD.size] = raw
+        self._advance()
+
+    def append(
+        self,
+        now: float,
+        percent: float,
+        secsleft: Optional[int],
+        plugged: bool,
+        monitor_id: str,
+        mode: Sequence[int],
+    ) -> None:
+        w, h, hz = mode
+        off = self._head * _RECORD.size
+        _RECORD.pack_into(
+            self._buf,
+            off,
+            int(now),
+            max(0, min(10000, round(percent * 100))),
+            -1 if secsleft is None else int(secsleft),
+            display_key(monitor_id),
+            w,
+            h,
+            hz,
+            plugged,
+        )
+        self._advance()
+
+    def samples(self) -> Iterator[Sample]:
+        """Oldest first."""
+        for raw in self._raw_records():
+            t, pct, secs, disp, w, h, hz, plugged = _RECORD.unpack(raw)
+            secsleft = None if secs < 0 else secs
+            yield Sample(t, pct / 100, secsleft, disp, (w, h, hz), bool(plugged))
+
+    def save(self) -> None:
+        header = _HEADER.pack(
+            MAGIC, VERSION, _RECORD.size, self.capacity, self._head, self._count
+        )
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        try:
+            with open(tmp, "wb") as f:
+                f.write(header)
+                f.write(self._buf)
+            os.replace(tmp, self.path)
+            self.unsaved = 0
+        except OSError as e:
+            logging.warning(f"failed to write telemetry: {e}")
+
+
+def drain_rates(samples: Iterator[Sample]) -> List[DrainStats]:
+    """
+    Drain per (display, mode) over consecutive samples of the same display
+    that kept the same mode. With several displays active the battery drain
+    is the whole system's, so compare modes of one display, not displays.
+    """
+    last: Dict[int, Sample] = {}
+    stats: Dict[Tuple[int, Mode], DrainStats] = {}
+    for s in samples:
+        prev = last.get(s.display)
+        last[s.display] = s
+        if prev is None or prev.plugged or s.plugged or prev.mode != s.mode:
+            continue
+        dt = s.time - prev.time
+        drop = prev.percent - s.percent
+        if dt <= 0 or dt > MAX_GAP or drop < 0:  # gap, clock jump or charging
+            continue
+        st = stats.get((s.display, s.mode))
+        if st is None:
+            st = stats[(s.display, s.mode)] = DrainStats(s.display, s.mode)
+        st.seconds += dt
+        st.percent += drop
+        st.samples += 1
+    return sorted(stats.values(), key=lambda st: (st.display, st.mode))
+
+
+def format_summary(
+    stats: List[DrainStats], names: Optional[Mapping[int, str]] = None
+) -> List[str]:
+    lines = []
+    for st in stats:
+        name = (names or {}).get(st.display, f"display {st.display:08x}")
+        w, h, hz = st.mode
+        rate = st.percent_per_hour
+        lines.append(
+            f"{name} {w}x{h} @ {hz} Hz: "
+            + (f"{rate:.1f} %/h" if rate is not None else "n/a")
+            + f" over {st.seconds / 3600:.1f} h ({st.samples} intervals)"
+        )
+    return lines
+
+
+def main(argv: List[str]) -> int:
+    if len(argv) > 1:
+        path = Path(argv[1])
+    else:
+        base = Path(os.environ.get("LOCALAPPDATA", Path.home()))
+        path = base / "SRR" / "telemetry.bin"
+    ring = TelemetryRing.load(path)
+    if not len(ring):
+        print(f"no telemetry in {path}")
+        return 1
+    for line in format_summary(drain_rates(ring.samples())):
+        print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
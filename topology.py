@@ -0,0 +1,282 @@
+"""Display topology watcher: emits added/removed/changed display events."""
+
+import asyncio
+import dataclasses
+import logging
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+import reschanger
+import scheduler
+import winmsg
+from asyncdisplay import AsyncDisplay
+
+ADDED = "added"
+REMOVED = "removed"
+CHANGED = "changed"
+
+DBT_DEVNODES_CHANGED = 0x0007
+
+# WM_DISPLAYCHANGE / WM_DEVICECHANGE arrive in bursts while a monitor is
+# plugged in; one rescan after the burst settles is enough.
+RESCAN_DELAY = 0.5  # seconds
+
+
+@dataclasses.dataclass(frozen=True)
+class DisplayInfo:
+    monitor_id: str
+    adapter_name: bytes
+    monitor_string: str
+
+
+@dataclasses.dataclass(frozen=True)
+class DisplayEvent:
+    kind: str  # ADDED, REMOVED or CHANGED
+    display: DisplayInfo
+    previous: Optional[DisplayInfo] = None
+
+
+Snapshot = Dict[str, DisplayInfo]  # monitor_id -> DisplayInfo, enumeration order
+
+
+def read_displays() -> Snapshot:
+    return {
+        d["monitor_id"]: DisplayInfo(
+            d["monitor_id"], d["adapter_name"], d["monitor_string"]
+        )
+        for d in reschanger.get_active_displays()
+    }
+
+
+def diff_displays(old: Snapshot, new: Snapshot) -> List[DisplayEvent]:
+    events = [
+        DisplayEvent(REMOVED, info) for mid, info in old.items() if mid not in new
+    ]
+    for mid, info in new.items():
+        prev = old.get(mid)
+        if prev is None:
+            events.append(DisplayEvent(ADDED, info))
+        elif prev != info:
+            events.append(DisplayEvent(CHANGED, info, prev))
+    return events
+
+
+class TopologySource:
+    """
+    Base class for topology sources. `start` takes the initial snapshot;
+    afterwards the callback receives a non-empty list of events on the
+    asyncio loop thread whenever a rescan finds a difference.
+    Subclasses implement `read` and call `request_rescan` from any thread.
+    Given a `display_io`, rescans enumerate displays on its global lane
+    instead of the loop thread.
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._callback: Optional[Callable[[List[DisplayEvent]], None]] = None
+        self._snapshot: Snapshot = {}
+        self._fingerprint: Optional[int] = None
+        self._pending: Optional[asyncio.TimerHandle] = None
+        self._io: Optional[AsyncDisplay] = None
+        self._scan_lock = asyncio.Lock()
+        self._scans: Set[asyncio.Task] = set()  # keeps in-flight rescans alive
+
+    def read(self) -> Snapshot:
+        raise NotImplementedError
+
+    def current(self) -> Snapshot:
+        return self._snapshot
+
+    def start(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        callback: Callable[[List[DisplayEvent]], None],
+        display_io: Optional[AsyncDisplay] = None,
+    ) -> None:
+        self._loop = loop
+        self._callback = callback
+        self._io = display_io
+        self._set_snapshot(self.read())
+        self._start()
+        logging.info(
+            f"topology source: {self.name}, {len(self._snapshot)} display(s)"
+        )
+
+    def stop(self) -> None:
+        if self._pending is not None:
+            self._pending.cancel()
+            self._pending = None
+        for task in list(self._scans):
+            task.cancel()
+
+    def _start(self) -> None:
+        pass
+
+    def request_rescan(self, delay: float = RESCAN_DELAY) -> None:
+        """Thread-safe; coalesces requests arriving within `delay`."""
+        if self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._schedule_rescan, delay)
+
+    def _schedule_rescan(self, delay: float) -> None:
+        assert self._loop is not None
+        if self._pending is not None:
+            self._pending.cancel()
+        self._pending = self._loop.call_later(delay, self._rescan_later)
+
+    def _rescan_later(self) -> None:
+        assert self._loop is not None
+        self._pending = None
+        if self._io is None:
+            self.rescan()
+        else:
+            self._spawn_rescan()
+
+    def _spawn_rescan(self, coro=None) -> None:
+        assert self._loop is not None
+        task = self._loop.create_task(coro or self.rescan_async())
+        self._scans.add(task)
+        task.add_done_callback(self._scans.discard)
+
+    def rescan(self) -> List[DisplayEvent]:
+        """Re-read the topology now, on this thread; delivers and returns changes."""
+        try:
+            new = self.read()
+        except Exception as e:
+            logging.warning(f"display enumeration failed: {e}")
+            return []
+        return self._update(new)
+
+    async def rescan_async(self) -> List[DisplayEvent]:
+        """rescan() with the enumeration on the display_io global lane."""
+        if self._io is None:
+            return self.rescan()
+        async with self._scan_lock:  # apply snapshots in the order they were read
+            try:
+                new = await self._io.call(None, self.read)
+            except Exception as e:
+                logging.warning(f"display enumeration failed: {e}")
+                return []
+            return self._update(new)
+
+    def _update(self, new: Snapshot) -> List[DisplayEvent]:
+        if hash(tuple(new.values())) == self._fingerprint:
+            return []
+        events = diff_displays(self._snapshot, new)
+        self._set_snapshot(new)
+        if events and self._callback is not None:
+            self._callback(events)
+        return events
+
+    def _set_snapshot(self, snapshot: Snapshot) -> None:
+        self._snapshot = snapshot
+        self._fingerprint = hash(tuple(snapshot.values()))
+
+
+class Win32TopologySource(TopologySource):
+    """Rescans on WM_DISPLAYCHANGE and WM_DEVICECHANGE/DBT_DEVNODES_CHANGED."""
+
+    name = "win32 display notifications"
+
+    def __init__(self, window: winmsg.MessageWindow):
+        super().__init__()
+        self._window = window
+
+    def read(self) -> Snapshot:
+        return read_displays()
+
+    def _start(self) -> None:
+        self._window.subscribe(winmsg.WM_DISPLAYCHANGE, self._on_message)
+        self._window.subscribe(winmsg.WM_DEVICECHANGE, self._on_device_change)
+
+    def stop(self) -> None:
+        self._window.unsubscribe(winmsg.WM_DISPLAYCHANGE, self._on_message)
+        self._window.unsubscribe(winmsg.WM_DEVICECHANGE, self._on_device_change)
+        super().stop()
+
+    def _on_message(self, wparam: int, lparam: int) -> None:
+        self.request_rescan()
+
+    def _on_device_change(self, wparam: int, lparam: int) -> None:
+        if wparam == DBT_DEVNODES_CHANGED:
+            self.request_rescan()
+
+
+class PollingTopologySource(TopologySource):
+    """
+    Fallback: rescans every `interval` seconds, slowing down to
+    `max_interval` while the topology stays the same.
+    """
+
+    name = "polling"
+
+    def __init__(self, interval: float, max_interval: Optional[float] = None):
+        super().__init__()
+        self.interval = interval
+        self.max_interval = max_interval
+        self._job: Optional[scheduler.Job] = None
+        self._changed = False  # set by a lane rescan, read by the next poll
+
+    def read(self) -> Snapshot:
+        return read_displays()
+
+    def _start(self) -> None:
+        assert self._loop is not None
+        self._job = scheduler.shared(self._loop).add(
+            "topology", self._poll, self.interval, self.max_interval
+        )
+
+    def stop(self) -> None:
+        if self._job is not None:
+            self._job.cancel()
+            self._job = None
+        super().stop()
+
+    def _poll(self) -> str:
+        if self._io is None:
+            return scheduler.CHANGED if self.rescan() else scheduler.UNCHANGED
+        # the enumeration runs on the display lane; the interval follows the
+        # result of the previous one
+        changed, self._changed = self._changed, False
+        self._spawn_rescan(self._poll_async())
+        return scheduler.CHANGED if changed else scheduler.UNCHANGED
+
+    async def _poll_async(self) -> None:
+        if await self.rescan_async():
+            self._changed = True
+
+
+class FakeTopologySource(TopologySource):
+    """Scriptable source for tests and simulations; never touches the OS."""
+
+    name = "fake"
+
+    def __init__(self, displays: Iterable[DisplayInfo] = ()):
+        super().__init__()
+        self._displays: Snapshot = {d.monitor_id: d for d in displays}
+
+    def read(self) -> Snapshot:
+        return dict(self._displays)
+
+    def set_displays(self, displays: Iterable[DisplayInfo]) -> None:
+        self._displays = {d.monitor_id: d for d in displays}
+        self.request_rescan(delay=0)
+
+    def plug(self, display: DisplayInfo) -> None:
+        self._displays[display.monitor_id] = display
+        self.request_rescan(delay=0)
+
+    def unplug(self, monitor_id: str) -> None:
+        self._displays.pop(monitor_id, None)
+        self.request_rescan(delay=0)
+
+
+def create_topology_source(
+    poll_interval: float, max_interval: Optional[float] = None
+) -> TopologySource:
+    """Display-change notification source where available, polling otherwise."""
+    window = winmsg.shared_window()
+    if window is not None:
+        return Win32TopologySource(window)
+    return PollingTopologySource(poll_interval, max_interval)
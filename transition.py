@@ -0,0 +1,103 @@
+"""Hysteresis/debounce filter between observed and committed power states."""
+
+import collections
+import dataclasses
+import logging
+from typing import Deque, Optional, Tuple
+
+
+@dataclasses.dataclass(frozen=True)
+class FilterSettings:
+    """
+    dwell_performance / dwell_powersave: seconds the new state must stay
+    stable before switching to it (0 = immediately).
+    max_switches per `window` seconds caps mode sets; 0 disables the cap.
+    """
+
+    dwell_performance: float = 0.0
+    dwell_powersave: float = 2.0
+    max_switches: int = 0
+    window: float = 300.0
+
+    @classmethod
+    def from_config(cls, raw: dict) -> "FilterSettings":
+        """Build from the config.json "power_filter" object; raises on bad input."""
+        if not isinstance(raw, dict):
+            raise TypeError("power_filter must be an object")
+        unknown = set(raw) - {f.name for f in dataclasses.fields(cls)}
+        if unknown:
+            raise KeyError(f"unknown power_filter keys: {sorted(unknown)}")
+        settings = cls(**raw)
+        for f in dataclasses.fields(cls):
+            value = getattr(settings, f.name)
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                raise TypeError(f"power_filter.{f.name} must be a number")
+            if value < 0:
+                raise ValueError(f"power_filter.{f.name} must be >= 0")
+        return settings
+
+
+class TransitionFilter:
+    """
+    Feed every observed state to observe(); poll() decides whether the
+    committed state changes now, or when to poll again. Counters in `stats`:
+      committed    - transitions let through
+      debounced    - transitions overtaken by another edge within their dwell
+      rate_limited - transitions held back by max_switches
+    Transitions to None (no battery info) commit immediately and uncounted
+    against the cap, since they change no display mode.
+    """
+
+    def __init__(self, settings: FilterSettings, initial: Optional[bool]):
+        self.settings = settings
+        self.committed = initial
+        self._observed = initial
+        self._since = 0.0
+        self._limited = False
+        self._commits: Deque[float] = collections.deque()
+        self.stats = {"committed": 0, "debounced": 0, "rate_limited": 0}
+
+    def observe(self, state: Optional[bool], now: float) -> None:
+        if state == self._observed:
+            return
+        if self._observed != self.committed:
+            self.stats["debounced"] += 1
+            logging.info(
+                f"power transition to {self._observed} debounced "
+                f"after {now - self._since:.1f}s"
+            )
+        self._observed = state
+        self._since = now
+        self._limited = False
+
+    def poll(self, now: float) -> Tuple[bool, Optional[float]]:
+        """(committed state changed, loop time to poll again or None)."""
+        target = self._observed
+        if target == self.committed:
+            return False, None
+
+        if target is not None:
+            s = self.settings
+            ready_at = self._since + (
+                s.dwell_performance if target else s.dwell_powersave
+            )
+            if now < ready_at:
+                return False, ready_at
+            if s.max_switches:
+                while self._commits and now - self._commits[0] >= s.window:
+                    self._commits.popleft()
+                if len(self._commits) >= s.max_switches:
+                    if not self._limited:
+                        self._limited = True
+                        self.stats["rate_limited"] += 1
+                        logging.info(
+                            f"power transition to {target} held back: "
+                            f"{s.max_switches} switches in {s.window:.0f}s"
+                        )
+                    return False, self._commits[0] + s.window
+                self._commits.append(now)
+
+        self.committed = target
+        self._limited = False
+        self.stats["committed"] += 1
+        return True, None
@@ -3,6 +3,7 @@
 import logging
 import os
 import threading
+import time
 from pathlib import Path
 from typing import TYPE_CHECKING, Callable, Optional
 
@@ -10,12 +11,21 @@ import pystray
 
 if TYPE_CHECKING:
     from pystray._base import Icon as _Icon
-from PIL import Image, ImageDraw
+from PIL import Image
 
 import autostart
 
+# at most one batch of menu/title/notification updates per interval
+UPDATE_INTERVAL = 0.5  # seconds
+
+# <icon>.rgba next to <icon>.png holds its pixels pre-rendered (build.bat), so
+# the common path skips PNG decoding and Pillow's image plugin registry
+ICON_SIZE = (32, 32)
+
 
 def _make_default_icon() -> Image.Image:
+    from PIL import ImageDraw
+
     img = Image.new("RGB", (64, 64), (30, 30, 30))
     d = ImageDraw.Draw(img)
     d.rectangle((8, 18, 56, 46), outline=(120, 200, 255), width=3)
@@ -24,7 +34,22 @@ def _make_default_icon() -> Image.Image:
     return img
 
 
+def _load_raw_icon(raw_path: Path) -> Optional[Image.Image]:
+    try:
+        data = raw_path.read_bytes()
+    except OSError:
+        return None
+    if len(data) != ICON_SIZE[0] * ICON_SIZE[1] * 4:
+        logging.warning(f"ignoring {raw_path}: unexpected size {len(data)}")
+        return None
+    return Image.frombytes("RGBA", ICON_SIZE, data)
+
+
 def _load_icon(icon_path: Optional[Path]) -> Image.Image:
+    if icon_path is not None:
+        img = _load_raw_icon(icon_path.with_suffix(".rgba"))
+        if img is not None:
+            return img
     if icon_path and icon_path.exists():
         try:
             return Image.open(str(icon_path)).convert("RGBA")
@@ -37,6 +62,11 @@ class TrayController:
     """
     Owns the pystray icon. The async loop reads `paused` and `state_text`,
     and triggers `reload_event` / `shutdown_event`.
+
+    set_displays / set_state_text / notify may be called from any thread.
+    They only queue a change (dropping it if nothing differs); the tray's
+    update thread applies queued changes, coalesced, at most once per
+    UPDATE_INTERVAL, so no other thread touches pystray.
     """
 
     def __init__(
@@ -47,6 +77,7 @@ class TrayController:
         log_path: Path,
         on_exit: Callable[[], None],
         on_reload: Callable[[], None],
+        on_pause_change: Optional[Callable[[bool], None]] = None,
         icon_path: Optional[Path] = None,
     ):
         self.project_name = project_name
@@ -55,6 +86,7 @@ class TrayController:
         self.log_path = log_path
         self._on_exit = on_exit
         self._on_reload = on_reload
+        self._on_pause_change = on_pause_change
 
         self.paused = False
         self.state_text = "starting…"
@@ -65,12 +97,23 @@ class TrayController:
         self._icon_image = _load_icon(icon_path)
         self._icon: Optional[_Icon] = None
         self._thread: Optional[threading.Thread] = None
+        self._update_thread: Optional[threading.Thread] = None  # pystray's
+
+        self._updates = threading.Condition()
+        self._pending_displays: Optional[list] = None
+        self._pending_state_text: Optional[str] = None
+        self._pending_notifications: list = []
+        self._pending_refresh = False
+        self._closing = False
+        self.menu_rebuilds = 0
 
     # --- menu actions -------------------------------------------------
 
     def _toggle_pause(self, icon, item):
         self.paused = not self.paused
         logging.info(f"tray: paused={self.paused}")
+        if self._on_pause_change is not None:
+            self._on_pause_change(self.paused)
         icon.update_menu()
 
     def _reload(self, icon, item):
@@ -99,7 +142,7 @@ class TrayController:
     def _exit(self, icon, item):
         logging.info("tray: exit requested")
         self._on_exit()
-        icon.stop()
+        self.stop()
 
     # --- public api ---------------------------------------------------
 
@@ -109,10 +152,19 @@ class TrayController:
         selected_id: Optional[str],
         on_select: Callable,
     ):
-        self._displays = [{"id": None, "name": "All displays"}] + displays
-        self._selected_display_id = selected_id
-        self._on_display_select = on_select
-        self._rebuild_menu()
+        new = [{"id": None, "name": "All displays"}] + displays
+        with self._updates:
+            self._on_display_select = on_select
+            latest = (
+                self._pending_displays
+                if self._pending_displays is not None
+                else self._displays
+            )
+            if new == latest and selected_id == self._selected_display_id:
+                return
+            self._selected_display_id = selected_id
+            self._pending_displays = new
+            self._updates.notify()
 
     def _make_display_selector(self, display_id: Optional[str]) -> Callable:
         def handler(icon, item):
@@ -125,27 +177,79 @@ class TrayController:
                 pass
         return handler
 
-    def _rebuild_menu(self):
-        if self._icon is not None:
-            try:
-                self._icon.menu = self._build_menu()
-                self._icon.update_menu()
-            except Exception as e:
-                logging.warning(f"tray menu rebuild failed: {e}")
-
     def set_state_text(self, text: str):
-        self.state_text = text
-        if self._icon is not None:
-            try:
-                self._icon.update_menu()
-                self._icon.title = f"SRR — {text}"
-            except Exception:
-                pass
+        with self._updates:
+            latest = (
+                self._pending_state_text
+                if self._pending_state_text is not None
+                else self.state_text
+            )
+            if text == latest:
+                return
+            self._pending_state_text = text
+            self._updates.notify()
+
+    def set_paused(self, paused: bool):
+        """Pause/resume from outside the menu (e.g. a control command)."""
+        with self._updates:
+            if paused == self.paused:
+                return
+            self.paused = paused
+            self._pending_refresh = True
+            self._updates.notify()
 
     def notify(self, message: str, title: str = "SRR"):
-        if self._icon is not None:
+        with self._updates:
+            self._pending_notifications.append((message, title))
+            self._updates.notify()
+
+    # --- update thread ------------------------------------------------
+
+    def _run_updates(self, icon):
+        """pystray `setup` callback: runs on its own thread once the icon exists."""
+        self._update_thread = threading.current_thread()
+        icon.visible = True
+        while True:
+            with self._updates:
+                while not self._closing and not self._has_pending():
+                    self._updates.wait()
+                if self._closing:
+                    return
+            # let a burst of changes accumulate into one batch
+            time.sleep(UPDATE_INTERVAL)
+            with self._updates:
+                if self._closing:  # stop() came in during the batching sleep
+                    return
+                displays, self._pending_displays = self._pending_displays, None
+                text, self._pending_state_text = self._pending_state_text, None
+                notes, self._pending_notifications = self._pending_notifications, []
+                refresh, self._pending_refresh = self._pending_refresh, False
+            self._apply_updates(icon, displays, text, notes, refresh)
+
+    def _has_pending(self) -> bool:
+        return (
+            self._pending_displays is not None
+            or self._pending_state_text is not None
+            or bool(self._pending_notifications)
+            or self._pending_refresh
+        )
+
+    def _apply_updates(self, icon, displays, text, notes, refresh=False):
+        try:
+            if displays is not None:
+                self._displays = displays
+                icon.menu = self._build_menu()
+                self.menu_rebuilds += 1
+            if text is not None:
+                self.state_text = text
+                icon.title = f"SRR — {text}"
+            if displays is not None or text is not None or refresh:
+                icon.update_menu()
+        except Exception as e:
+            logging.warning(f"tray menu update failed: {e}")
+        for message, title in notes:
             try:
-                self._icon.notify(message, title)
+                icon.notify(message, title)
             except Exception as e:
                 logging.warning(f"tray notify failed: {e}")
 
@@ -203,6 +307,23 @@ class TrayController:
             menu=self._build_menu(),
         )
         self._icon = icon
-        self._thread = threading.Thread(target=icon.run, daemon=True, name="srr-tray")
+        self._thread = threading.Thread(
+            target=icon.run, args=(self._run_updates,), daemon=True, name="srr-tray"
+        )
         self._thread.start()
         logging.info("tray icon started")
+
+    def stop(self, timeout: float = 2.0):
+        """Remove the icon and end the tray threads; safe from any thread."""
+        with self._updates:
+            self._closing = True
+            self._updates.notify()
+        icon, self._icon = self._icon, None
+        if icon is not None:
+            try:
+                icon.stop()
+            except Exception as e:
+                logging.warning(f"tray icon stop failed: {e}")
+        for thread in (self._thread, self._update_thread):
+            if thread is not None and thread is not threading.current_thread():
+                thread.join(timeout)
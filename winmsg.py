@@ -0,0 +1,168 @@
+"""Hidden window that forwards Windows broadcast messages to Python callbacks."""
+
+import ctypes
+import ctypes.wintypes
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+try:
+    user32 = ctypes.windll.user32
+    kernel32 = ctypes.windll.kernel32
+except AttributeError:  # not on Windows
+    user32 = None
+    kernel32 = None
+
+WM_DESTROY = 0x0002
+WM_CLOSE = 0x0010
+WM_QUERYENDSESSION = 0x0011
+WM_ENDSESSION = 0x0016
+WM_DISPLAYCHANGE = 0x007E
+WM_POWERBROADCAST = 0x0218
+WM_DEVICECHANGE = 0x0219
+
+PBT_APMPOWERSTATUSCHANGE = 0x000A
+PBT_APMRESUMEAUTOMATIC = 0x0012
+
+# (wparam, lparam) -> None, called on the window thread
+Handler = Callable[[int, int], None]
+
+if user32 is not None:
+    LRESULT = ctypes.c_ssize_t
+    WNDPROC = ctypes.WINFUNCTYPE(
+        LRESULT,
+        ctypes.wintypes.HWND,
+        ctypes.wintypes.UINT,
+        ctypes.wintypes.WPARAM,
+        ctypes.wintypes.LPARAM,
+    )
+
+    class WNDCLASSW(ctypes.Structure):
+        _fields_ = [
+            ("style", ctypes.wintypes.UINT),
+            ("lpfnWndProc", WNDPROC),
+            ("cbClsExtra", ctypes.c_int),
+            ("cbWndExtra", ctypes.c_int),
+            ("hInstance", ctypes.wintypes.HINSTANCE),
+            ("hIcon", ctypes.wintypes.HICON),
+            ("hCursor", ctypes.wintypes.HANDLE),
+            ("hbrBackground", ctypes.wintypes.HBRUSH),
+            ("lpszMenuName", ctypes.wintypes.LPCWSTR),
+            ("lpszClassName", ctypes.wintypes.LPCWSTR),
+        ]
+
+    user32.DefWindowProcW.argtypes = [
+        ctypes.wintypes.HWND,
+        ctypes.wintypes.UINT,
+        ctypes.wintypes.WPARAM,
+        ctypes.wintypes.LPARAM,
+    ]
+    user32.DefWindowProcW.restype = LRESULT
+    user32.CreateWindowExW.restype = ctypes.wintypes.HWND
+    kernel32.GetModuleHandleW.restype = ctypes.wintypes.HMODULE
+
+
+def available() -> bool:
+    return user32 is not None
+
+
+class MessageWindow:
+    """
+    Runs a hidden top-level window and its message pump on a daemon thread.
+    Top-level windows (unlike HWND_MESSAGE ones) receive WM_POWERBROADCAST and
+    WM_DISPLAYCHANGE broadcasts. Handlers run on the window thread and must
+    hand work over to asyncio with loop.call_soon_threadsafe.
+    """
+
+    def __init__(self, class_name: str = "SRRMessageWindow"):
+        self.class_name = class_name
+        self._handlers: Dict[int, List[Handler]] = {}
+        self._lock = threading.Lock()
+        self._hwnd: Optional[int] = None
+        self._wndproc = None  # keeps the ctypes callback alive
+        self._ready = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, msg: int, handler: Handler) -> None:
+        with self._lock:
+            self._handlers.setdefault(msg, []).append(handler)
+
+    def unsubscribe(self, msg: int, handler: Handler) -> None:
+        with self._lock:
+            handlers = self._handlers.get(msg, [])
+            if handler in handlers:
+                handlers.remove(handler)
+
+    @property
+    def running(self) -> bool:
+        return self._hwnd is not None
+
+    def start(self) -> bool:
+        """Create the window; returns False if unavailable on this platform."""
+        if not available():
+            return False
+        if self._thread is not None:
+            return self.running
+        self._thread = threading.Thread(
+            target=self._run, daemon=True, name="srr-msgwindow"
+        )
+        self._thread.start()
+        self._ready.wait(timeout=5)
+        return self.running
+
+    def stop(self) -> None:
+        if self._hwnd is not None:
+            user32.PostMessageW(self._hwnd, WM_CLOSE, 0, 0)
+
+    def _dispatch(self, hwnd, msg, wparam, lparam):
+        with self._lock:
+            handlers = list(self._handlers.get(msg, ()))
+        for handler in handlers:
+            try:
+                handler(wparam, lparam)
+            except Exception as e:
+                logging.warning(f"message window handler for {msg:#x} failed: {e}")
+        if msg == WM_DESTROY:
+            user32.PostQuitMessage(0)
+            return 0
+        return user32.DefWindowProcW(hwnd, msg, wparam, lparam)
+
+    def _run(self) -> None:
+        try:
+            self._wndproc = WNDPROC(self._dispatch)
+            hinstance = kernel32.GetModuleHandleW(None)
+            wc = WNDCLASSW()
+            wc.lpfnWndProc = self._wndproc
+            wc.hInstance = hinstance
+            wc.lpszClassName = self.class_name
+            if not user32.RegisterClassW(ctypes.byref(wc)):
+                logging.warning(f"RegisterClassW failed: {ctypes.GetLastError()}")
+                return
+            hwnd = user32.CreateWindowExW(
+                0, self.class_name, self.class_name, 0,
+                0, 0, 0, 0, None, None, hinstance, None,
+            )
+            if not hwnd:
+                logging.warning(f"CreateWindowExW failed: {ctypes.GetLastError()}")
+                return
+            self._hwnd = hwnd
+        finally:
+            self._ready.set()
+
+        msg = ctypes.wintypes.MSG()
+        while user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+            user32.TranslateMessage(ctypes.byref(msg))
+            user32.DispatchMessageW(ctypes.byref(msg))
+        self._hwnd = None
+        logging.info("message window stopped")
+
+
+_shared: Optional[MessageWindow] = None
+
+
+def shared_window() -> Optional[MessageWindow]:
+    """Process-wide message window, started on first use. None if unavailable."""
+    global _shared
+    if _shared is None:
+        _shared = MessageWindow()
+    return _shared if _shared.start() else None